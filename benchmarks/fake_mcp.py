@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+import io
+import json
+import os
+import socket
+import subprocess
+import tarfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import uvicorn
+from mcp.server.fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+
+
+FIXTURE_OWNER = "bench-org"
+
+BUGGY_LINE = "    return a - b"
+FIXED_LINE = "    return a + b"
+
+
+def fixture_repo_name(file_lines: int) -> str:
+    return f"bench-repo-{file_lines}"
+
+
+def fixture_issue_number(file_lines: int, index: int) -> int:
+    return file_lines * 100000 + index + 1
+
+
+def build_fixture_files(file_count: int, file_lines: int) -> Dict[str, str]:
+    """Python modules of roughly `file_lines` lines, each with one bug in `add_numbers`."""
+    files = {}
+    for module in range(file_count):
+        lines = ["import math", "", ""]
+        helper = 0
+        while len(lines) < file_lines - 4:
+            lines += [f"def helper_{helper}(value):", f"    return math.floor(value * {helper + 2})", "", ""]
+            helper += 1
+        lines += ["def add_numbers(a, b):", BUGGY_LINE, ""]
+        files[f"src/module_{module}.py"] = "\n".join(lines)
+    return files
+
+
+def build_fixture_issues(issue_count: int, file_count: int, file_lines: int) -> List[dict]:
+    issues = []
+    for index in range(issue_count):
+        path = f"src/module_{index % file_count}.py"
+        issues.append({
+            "number": fixture_issue_number(file_lines, index),
+            "title": f"add_numbers returns the wrong result in {path}",
+            "body": (
+                "Calling add_numbers(2, 3) returns -1.\n\n"
+                "```\nTraceback (most recent call last):\n"
+                f'  File "{path}", line {file_lines - 2}, in add_numbers\n'
+                "AssertionError: expected 5, got -1\n```"
+            ),
+            "state": "OPEN",
+        })
+    return issues
+
+
+class FixtureStore:
+    """Fixture repositories served by the fake MCP server, one per file size."""
+
+    def __init__(self):
+        self.files: Dict[Tuple[str, str], Dict[str, str]] = {}
+        self.issues: Dict[Tuple[str, str], List[dict]] = {}
+
+    def add_repo(self, repo: str, files: Dict[str, str], issues: List[dict]) -> None:
+        self.files[(FIXTURE_OWNER, repo)] = files
+        self.issues[(FIXTURE_OWNER, repo)] = issues
+
+    def head_sha(self, owner: str, repo: str) -> str:
+        return hashlib.sha1(f"{owner}/{repo}".encode("utf-8")).hexdigest()
+
+
+def create_fake_mcp_server(store: FixtureStore) -> FastMCP:
+    """A stand-in for the GitHub MCP server exposing the read-only tools the chain uses, plus the REST issue route."""
+    server = FastMCP("fake-github", stateless_http=True, json_response=True, log_level="WARNING")
+
+    @server.tool()
+    def get_me() -> str:
+        return json.dumps({"login": FIXTURE_OWNER})
+
+    @server.tool()
+    def search_repositories(query: str, page: int = 1, perPage: int = 30) -> str:
+        repos = [{"full_name": f"{owner}/{repo}"} for owner, repo in store.files if query.lower() in repo]
+        return json.dumps({"total_count": len(repos), "items": repos})
+
+    @server.tool()
+    def list_issues(owner: str, repo: str, state: str = "OPEN", perPage: int = 30, after: Optional[str] = None) -> str:
+        issues = store.issues.get((owner, repo), [])
+        return json.dumps({"issues": issues, "pageInfo": {"hasNextPage": False, "endCursor": None}})
+
+    @server.tool()
+    def get_file_contents(owner: str, repo: str, path: str = "/", ref: Optional[str] = None, sha: Optional[str] = None) -> str:
+        files = store.files.get((owner, repo), {})
+        if path in files:
+            return files[path]
+        directory = path.strip("/")
+        entries = sorted({name for name in files if name.startswith(directory)})
+        return json.dumps([{"path": name, "type": "file"} for name in entries])
+
+    @server.tool()
+    def list_commits(owner: str, repo: str, sha: Optional[str] = None, page: int = 1, perPage: int = 30) -> str:
+        return json.dumps([{"sha": store.head_sha(owner, repo), "commit": {"message": "Initial commit"}}])
+
+    @server.tool()
+    def get_commit(owner: str, repo: str, sha: str) -> str:
+        return json.dumps({"sha": sha, "commit": {"message": "Initial commit"}, "files": []})
+
+    # REST endpoint used by the issue pre-parser (GITHUB_API_URL points here)
+    @server.custom_route("/repos/{owner}/{repo}/issues/{number}", methods=["GET"])
+    async def get_issue(request: Request) -> JSONResponse:
+        params = request.path_params
+        number = int(params["number"])
+        for issue in store.issues.get((params["owner"], params["repo"]), []):
+            if issue["number"] == number:
+                return JSONResponse(issue)
+        return JSONResponse({"message": "Not Found"}, status_code=404)
+
+    # REST endpoints used by the local code index and the navigator's candidate prefetch
+    @server.custom_route("/repos/{owner}/{repo}/commits/{ref}", methods=["GET"])
+    async def get_commit_sha(request: Request) -> Response:
+        params = request.path_params
+        if (params["owner"], params["repo"]) not in store.files:
+            return JSONResponse({"message": "Not Found"}, status_code=404)
+        return PlainTextResponse(store.head_sha(params["owner"], params["repo"]))
+
+    @server.custom_route("/repos/{owner}/{repo}/tarball/{sha}", methods=["GET"])
+    async def get_tarball(request: Request) -> Response:
+        params = request.path_params
+        files = store.files.get((params["owner"], params["repo"]))
+        if files is None:
+            return JSONResponse({"message": "Not Found"}, status_code=404)
+        buffer = io.BytesIO()
+        prefix = f"{params['owner']}-{params['repo']}-{params['sha'][:7]}"
+        with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+            for name, content in sorted(files.items()):
+                data = content.encode("utf-8")
+                member = tarfile.TarInfo(f"{prefix}/{name}")
+                member.size = len(data)
+                tar.addfile(member, io.BytesIO(data))
+        return Response(buffer.getvalue(), media_type="application/x-gzip")
+
+    @server.custom_route("/repos/{owner}/{repo}/commits", methods=["GET"])
+    async def list_path_commits(request: Request) -> JSONResponse:
+        params = request.path_params
+        files = store.files.get((params["owner"], params["repo"]), {})
+        if request.query_params.get("path") not in files:
+            return JSONResponse([])
+        return JSONResponse([{
+            "sha": store.head_sha(params["owner"], params["repo"]),
+            "commit": {"message": "Initial commit", "committer": {"date": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}},
+        }])
+
+    return server
+
+
+def create_fixture_git_repos(store: FixtureStore, root: str) -> str:
+    """
+    Commit every fixture repository into a plain git repo under `root`, for
+    the git mirror backend to clone. Returns the GIT_MIRROR_REMOTE template.
+    """
+    env = {
+        **os.environ,
+        "GIT_AUTHOR_NAME": "bench", "GIT_AUTHOR_EMAIL": "bench@example.com",
+        "GIT_COMMITTER_NAME": "bench", "GIT_COMMITTER_EMAIL": "bench@example.com",
+    }
+    for (owner, repo), files in store.files.items():
+        path = os.path.join(root, owner, repo)
+        for name, content in files.items():
+            os.makedirs(os.path.dirname(os.path.join(path, name)), exist_ok=True)
+            with open(os.path.join(path, name), "w", encoding="utf-8") as f:
+                f.write(content)
+        for command in (["init", "--quiet", "--initial-branch=main"], ["add", "."], ["commit", "--quiet", "-m", "Initial commit"]):
+            subprocess.run(["git", *command], cwd=path, env=env, check=True)
+    return os.path.join(root, "{owner}", "{repo}")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def start_fake_mcp_server(store: FixtureStore, port: int) -> uvicorn.Server:
+    """Serve the fake MCP server over streamable HTTP on localhost."""
+    app = create_fake_mcp_server(store).streamable_http_app()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    server.serve_task = asyncio.create_task(server.serve())
+    while not server.started:
+        if server.serve_task.done():
+            server.serve_task.result()
+        await asyncio.sleep(0.01)
+    return server
+
+
+async def stop_fake_mcp_server(server: uvicorn.Server) -> None:
+    server.should_exit = True
+    await server.serve_task
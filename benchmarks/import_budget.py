@@ -0,0 +1,88 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Optional, Tuple
+
+
+# Cold-start budget per entry point, in milliseconds of cumulative import time
+DEFAULT_BUDGETS_MS = {
+    "github_agent": 400,
+    "github_agent.agent": 400,
+    "github_agent.batch": 400,
+}
+
+# Heavy packages that must only load when the app is built or a model is called
+DEFERRED_PACKAGES = ("google.adk", "google.genai", "litellm", "vertexai", "sqlalchemy")
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def measure_import(module: str) -> Tuple[float, List[Tuple[str, float, float]]]:
+    """
+    Import `module` in a fresh interpreter under -X importtime. Returns the
+    cumulative milliseconds of the top-level import and (name, self ms,
+    cumulative ms) for every module that was loaded.
+    """
+    env = dict(os.environ)
+    # Make sure nothing at import time depends on configuration
+    env.pop("GITHUB_PERSONAL_ACCESS_TOKEN", None)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    modules = []
+    total_ms = 0.0
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, _, name = match.groups()
+        modules.append((name, int(self_us) / 1000, int(cumulative_us) / 1000))
+        if name == module:
+            total_ms = int(cumulative_us) / 1000
+    return total_ms, modules
+
+
+def check_budgets(budgets: Dict[str, float], top: int = 10) -> bool:
+    ok = True
+    for module, budget_ms in budgets.items():
+        total_ms, modules = measure_import(module)
+        deferred = sorted({
+            name for name, _, _ in modules
+            if any(name == package or name.startswith(package + ".") for package in DEFERRED_PACKAGES)
+        })
+        within = total_ms <= budget_ms and not deferred
+        ok = ok and within
+
+        print(f"{'✓' if within else '❌'} import {module}: {total_ms:.0f} ms (budget {budget_ms:.0f} ms)")
+        if deferred:
+            print(f"   loads deferred packages: {', '.join(deferred[:5])}{' …' if len(deferred) > 5 else ''}")
+        for name, self_ms, _ in sorted(modules, key=lambda item: item[1], reverse=True)[:top]:
+            print(f"   {self_ms:8.1f} ms  {name}")
+    return ok
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check cold-start import time against a budget using python -X importtime.")
+    parser.add_argument("modules", nargs="*", help="Modules to check (default: the package entry points)")
+    parser.add_argument("--budget-ms", type=float, help="Budget for every module instead of the defaults")
+    parser.add_argument("--top", type=int, default=5, help="Slowest modules (self time) to list per entry point")
+    args = parser.parse_args(argv)
+
+    modules = args.modules or list(DEFAULT_BUDGETS_MS)
+    budgets = {
+        module: args.budget_ms if args.budget_ms is not None else DEFAULT_BUDGETS_MS.get(module, 400)
+        for module in modules
+    }
+    return 0 if check_budgets(budgets, top=args.top) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import List, Optional
+
+from benchmarks.fake_mcp import (
+    FIXED_LINE,
+    FIXTURE_OWNER,
+    FixtureStore,
+    build_fixture_files,
+    build_fixture_issues,
+    create_fixture_git_repos,
+    fixture_issue_number,
+    fixture_repo_name,
+    free_port,
+    start_fake_mcp_server,
+    stop_fake_mcp_server,
+)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+async def run_configuration(runner, issue_count: int, file_lines: int, concurrency: int, timeout: float) -> dict:
+    """Triage `issue_count` fixture issues against files of `file_lines` lines."""
+    from github_agent.batch.main import triage_issue
+    from github_agent.metrics import metrics
+    from github_agent.tools import tool_cache
+
+    tool_cache.clear()
+    metrics.reset()
+
+    repo = fixture_repo_name(file_lines)
+    refs = [
+        {"owner": FIXTURE_OWNER, "repo": repo, "issue_number": str(fixture_issue_number(file_lines, index))}
+        for index in range(issue_count)
+    ]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def worker(ref: dict) -> dict:
+        async with semaphore:
+            return await triage_issue(runner, ref, timeout)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    started = time.perf_counter()
+    records = await asyncio.gather(*(worker(ref) for ref in refs))
+    wall = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = [record["elapsed_s"] for record in records]
+    fixed = sum(
+        1 for record in records
+        if record["status"] == "ok" and FIXED_LINE in json.loads(record["state"]["code_fix"]).get("updated_file", "")
+    )
+
+    input_tokens = {
+        entry["labels"]["stage"]: entry["value"]
+        for entry in metrics.to_dict()["counters"].get("llm_input_tokens_total", [])
+    }
+    prefix_cache: dict = {}
+    for entry in metrics.to_dict()["counters"].get("llm_prefix_cache_total", []):
+        prefix_cache.setdefault(entry["labels"]["stage"], {})[entry["labels"]["outcome"]] = entry["value"]
+
+    return {
+        "issues": issue_count,
+        "file_lines": file_lines,
+        "concurrency": concurrency,
+        "ok": sum(1 for record in records if record["status"] == "ok"),
+        "fixed": fixed,
+        "wall_s": round(wall, 4),
+        "throughput_per_s": round(issue_count / wall, 2) if wall else 0.0,
+        "p50_s": round(percentile(latencies, 0.50), 4),
+        "p95_s": round(percentile(latencies, 0.95), 4),
+        "peak_alloc_kib": round(peak / 1024, 1),
+        "input_tokens_per_issue": {stage: round(total / issue_count) for stage, total in sorted(input_tokens.items())},
+        "prefix_cache_hit_rate": {
+            stage: round(counts.get("hit", 0) / sum(counts.values()), 3) for stage, counts in sorted(prefix_cache.items())
+        },
+        "route_calls": {
+            f"{entry['labels']['stage']}:{entry['labels']['model']}": entry["value"]
+            for entry in metrics.to_dict()["counters"].get("route_calls_total", [])
+        },
+        "git_mirror_reads": {
+            f"{entry['labels']['tool']}:{entry['labels']['outcome']}": entry["value"]
+            for entry in metrics.to_dict()["counters"].get("git_mirror_reads_total", [])
+        },
+        "errors": sorted({record.get("error") or record["status"] for record in records if record["status"] != "ok"}),
+    }
+
+
+def print_report(results: List[dict]) -> None:
+    header = f"{'issues':>6} {'lines':>6} {'conc':>5} {'ok':>5} {'wall s':>8} {'issue/s':>8} {'p50 s':>8} {'p95 s':>8} {'peak KiB':>10}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        print(
+            f"{result['issues']:>6} {result['file_lines']:>6} {result['concurrency']:>5} "
+            f"{result['ok']:>5} {result['wall_s']:>8.3f} {result['throughput_per_s']:>8.2f} "
+            f"{result['p50_s']:>8.4f} {result['p95_s']:>8.4f} {result['peak_alloc_kib']:>10.1f}"
+        )
+        for error in result["errors"]:
+            print(f"       ! {error}")
+
+
+async def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark chain_agent offline against a fake MCP server and a scripted model.")
+    parser.add_argument("--issues", default="1,10,50", help="Comma separated issue counts")
+    parser.add_argument("--file-lines", default="100,2000", help="Comma separated fixture file sizes in lines")
+    parser.add_argument("--files", type=int, default=5, help="Fixture modules per repository")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated seconds per model call")
+    parser.add_argument("--replay", help="Replay model responses recorded with RecordingLlm instead of the scripted model")
+    parser.add_argument("--git-mirror", action="store_true", help="Serve file and commit reads from local mirrors of fixture git repos")
+    parser.add_argument("--output", help="Write the results as JSON")
+    args = parser.parse_args(argv)
+
+    issue_counts = [int(value) for value in args.issues.split(",")]
+    file_sizes = [int(value) for value in args.file_lines.split(",")]
+
+    store = FixtureStore()
+    for file_lines in file_sizes:
+        store.add_repo(
+            fixture_repo_name(file_lines),
+            build_fixture_files(args.files, file_lines),
+            build_fixture_issues(max(issue_counts), args.files, file_lines),
+        )
+
+    port = free_port()
+    # Read when the app is first built, see github_agent.agent.get_app
+    os.environ["GITHUB_MCP_URL"] = f"http://127.0.0.1:{port}/mcp"
+    os.environ["GITHUB_API_URL"] = f"http://127.0.0.1:{port}"
+    os.environ.setdefault("GITHUB_PERSONAL_ACCESS_TOKEN", "benchmark")
+    os.environ["SESSION_DB_URL"] = "memory"
+    os.environ["CODE_FIX_MODE"] = "patch"
+    if args.git_mirror:
+        workdir = tempfile.mkdtemp(prefix="github_agent_bench_")
+        os.environ["GIT_MIRROR_REMOTE"] = create_fixture_git_repos(store, os.path.join(workdir, "remotes"))
+        os.environ["GIT_MIRROR_DIR"] = os.path.join(workdir, "mirrors")
+
+    from benchmarks.scripted_llm import ReplayLlm, ScriptedLlm
+    from github_agent.agent import create_runner, get_app
+    from github_agent.routing import main as routing
+    from github_agent.tools import close_github_mcp
+
+    app = get_app()
+    chain_agent = app.chain_agent
+
+    model = ReplayLlm(model="replay", path=args.replay, latency=args.llm_latency) if args.replay \
+        else ScriptedLlm(model="scripted", latency=args.llm_latency)
+    # Script the clients underneath each stage's RoutedLlm, so routing, escalation,
+    # rate limiting and the response cache run as they do against a real provider
+    for agent in chain_agent.sub_agents:
+        for name in routing.escalation_chain(agent.model.model):
+            routing._models[name] = model
+
+    runner = create_runner(chain_agent)
+    server = await start_fake_mcp_server(store, port)
+    results = []
+    try:
+        # Warm up imports and the MCP session so they do not skew the first configuration
+        await run_configuration(runner, 1, file_sizes[0], 1, args.timeout)
+        for file_lines in file_sizes:
+            for issue_count in issue_counts:
+                results.append(await run_configuration(runner, issue_count, file_lines, args.concurrency, args.timeout))
+    finally:
+        await close_github_mcp()
+        await stop_fake_mcp_server(server)
+
+    print_report(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    # Every call of a stage must send the same static prefix, or the provider cannot reuse it
+    if isinstance(model, ScriptedLlm):
+        variants = model.prefix_variants()
+        print(f"Static prompt prefixes per stage: {variants}")
+        unstable = sorted(stage for stage, count in variants.items() if count > 1)
+        if unstable:
+            print(f"❌ Prompt prefix not byte-stable for: {', '.join(unstable)}")
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
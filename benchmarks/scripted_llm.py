@@ -0,0 +1,235 @@
+import asyncio
+import hashlib
+import json
+import math
+import re
+from typing import AsyncGenerator, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from benchmarks.fake_mcp import BUGGY_LINE, FIXED_LINE
+
+
+ISSUE_NUMBER_PATTERN = re.compile(r"#(\d+)")
+OWNER_REPO_PATTERN = re.compile(r"owner:\s*([\w.-]+),\s*repo:\s*([\w.-]+)")
+FIXTURE_PATH_PATTERN = re.compile(r"src/module_\d+\.py")
+# ADK appends the agent's name to every system instruction
+AGENT_NAME_PATTERN = re.compile(r'Your internal name is "([\w-]+)"')
+
+
+def _system_text(llm_request: LlmRequest) -> str:
+    instruction = llm_request.config.system_instruction if llm_request.config else None
+    if isinstance(instruction, str):
+        return instruction
+    if isinstance(instruction, types.Content):
+        return "".join(part.text or "" for part in instruction.parts or [])
+    return ""
+
+
+def _user_text(llm_request: LlmRequest) -> str:
+    """The request the chain was started with; State messages and handoffs come before or after it."""
+    texts = [
+        "".join(part.text or "" for part in content.parts or [])
+        for content in llm_request.contents
+        if content.role == "user"
+    ]
+    return next((text for text in texts if OWNER_REPO_PATTERN.search(text)), next((text for text in texts if text), ""))
+
+
+def _request_text(llm_request: LlmRequest) -> str:
+    """System instruction and every text part, where the State message may put what a stage looks for."""
+    texts = [_system_text(llm_request)]
+    for content in llm_request.contents:
+        texts.extend(part.text or "" for part in content.parts or [])
+    return "\n".join(texts)
+
+
+def static_prefix(llm_request: LlmRequest) -> str:
+    """What a provider can cache across calls: the system instruction followed by the tool declarations."""
+    tools = [
+        declaration.model_dump(mode="json", exclude_none=True)
+        for tool in (llm_request.config.tools or [] if llm_request.config else [])
+        for declaration in getattr(tool, "function_declarations", None) or []
+    ]
+    return _system_text(llm_request) + "\x00" + json.dumps(tools, sort_keys=True)
+
+
+def _last_tool_text(llm_request: LlmRequest) -> Optional[str]:
+    """Text of a function response since the model's last turn, if any; the State message may follow it."""
+    for content in reversed(llm_request.contents):
+        if content.role == "model":
+            return None
+        for part in content.parts or []:
+            if part.function_response is not None:
+                response = part.function_response.response or {}
+                return "".join(item.get("text", "") for item in response.get("content", []))
+    return None
+
+
+def _estimate_tokens(llm_request: LlmRequest) -> int:
+    text = _system_text(llm_request)
+    for content in llm_request.contents:
+        for part in content.parts or []:
+            text += part.text or ""
+            if part.function_response is not None:
+                text += json.dumps(part.function_response.response, default=str)
+    return math.ceil(len(text) / 4)
+
+
+def _call(name: str, **args) -> types.Part:
+    return types.Part(function_call=types.FunctionCall(name=name, args=args))
+
+
+class ScriptedLlm(BaseLlm):
+    """
+    Deterministic stand-in for Gemini that plays each chain stage against the
+    fixture repository: reader and navigator make one MCP call each, the fixer
+    returns a one-hunk patch and the summary a short overview paragraph.
+
+    Like Gemini's implicit caching, a request whose static prefix was seen
+    before reports that prefix's tokens as cached; `prefix_variants()` tells
+    how many different prefixes each stage sent.
+    """
+
+    latency: float = 0.0
+    _prefixes: Optional[dict] = None
+
+    def _cached_tokens(self, llm_request: LlmRequest, stage: str) -> int:
+        if self._prefixes is None:
+            self._prefixes = {}
+        prefix = static_prefix(llm_request)
+        digests = self._prefixes.setdefault(stage, set())
+        digest = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+        seen = digest in digests
+        digests.add(digest)
+        return math.ceil(len(prefix) / 4) if seen else 0
+
+    def prefix_variants(self) -> dict:
+        """Distinct static prefixes per stage; more than one means a stage's prefix is not byte-stable."""
+        return {stage: len(digests) for stage, digests in sorted((self._prefixes or {}).items())}
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        system = _system_text(llm_request)
+        # Prompts mention each other's agents, so match on how they open
+        opening = system.lstrip()[:80]
+        user = _user_text(llm_request)
+        text = _request_text(llm_request)
+        tool_text = _last_tool_text(llm_request)
+        owner, repo = OWNER_REPO_PATTERN.search(user).groups()
+
+        if "Issue Reader Agent" in opening:
+            if tool_text is None:
+                part = _call("list_issues", owner=owner, repo=repo, state="OPEN")
+            else:
+                number = int(ISSUE_NUMBER_PATTERN.search(user).group(1))
+                issue = next(item for item in json.loads(tool_text)["issues"] if item["number"] == number)
+                part = types.Part(text=json.dumps({
+                    "title": issue["title"],
+                    "body": issue["body"],
+                    "issue_number": str(number),
+                    "referenced_files": FIXTURE_PATH_PATTERN.findall(issue["body"]),
+                    "error_messages": ["AssertionError: expected 5, got -1"],
+                    "problem_summary": "add_numbers subtracts instead of adding",
+                }))
+        elif "Repository Navigator Agent" in opening:
+            path = FIXTURE_PATH_PATTERN.search(text).group(0)
+            if tool_text is None:
+                part = _call("get_file_contents", owner=owner, repo=repo, path=path)
+            else:
+                part = types.Part(text=json.dumps({
+                    "target_file": path,
+                    "target_function": "add_numbers",
+                    "reasoning": "add_numbers subtracts its arguments.",
+                    "code_snippet": f"def add_numbers(a, b):\n{BUGGY_LINE}",
+                    "full_file": tool_text,
+                }))
+        elif "Code Fix Agent" in opening:
+            if "updated_file" in system and "hunks" not in system:
+                raise ValueError("The benchmark model only supports CODE_FIX_MODE=patch")
+            part = types.Part(text=json.dumps({
+                "hunks": [{"search": BUGGY_LINE, "replace": FIXED_LINE}],
+                "code_fix_summary": "add_numbers now adds its arguments.",
+            }))
+        elif "Summary Agent" in opening:
+            part = types.Part(text="add_numbers subtracted its arguments instead of adding them; the fix makes it return their sum.")
+        else:
+            part = types.Part(text="OK")
+
+        name = AGENT_NAME_PATTERN.search(system)
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[part]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=_estimate_tokens(llm_request),
+                cached_content_token_count=self._cached_tokens(llm_request, name.group(1) if name else opening),
+                candidates_token_count=math.ceil(len(part.text or json.dumps(part.function_call.args)) / 4),
+            ),
+        )
+
+
+def request_key(llm_request: LlmRequest) -> str:
+    """Stable key for a request; function call ids are random, so only names and payloads count."""
+    parts = [_system_text(llm_request)]
+    for content in llm_request.contents:
+        for part in content.parts or []:
+            if part.text:
+                parts.append(part.text)
+            if part.function_call is not None:
+                parts.append(json.dumps([part.function_call.name, part.function_call.args], sort_keys=True, default=str))
+            if part.function_response is not None:
+                parts.append(json.dumps([part.function_response.name, part.function_response.response], sort_keys=True, default=str))
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+class RecordingLlm(BaseLlm):
+    """Wraps a real model and appends every (request key, response) pair to a JSONL file."""
+
+    inner: BaseLlm
+    path: str
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        async for response in self.inner.generate_content_async(llm_request, stream=stream):
+            if not response.partial:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({
+                        "key": request_key(llm_request),
+                        "response": response.model_dump(mode="json", exclude_none=True),
+                    }) + "\n")
+            yield response
+
+
+class ReplayLlm(BaseLlm):
+    """Replays responses captured by RecordingLlm, failing on requests it has not seen."""
+
+    path: str
+    latency: float = 0.0
+    _responses: Optional[dict] = None
+
+    def _load(self) -> dict:
+        if self._responses is None:
+            self._responses = {}
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    self._responses[record["key"]] = record["response"]
+        return self._responses
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        response = self._load().get(request_key(llm_request))
+        if response is None:
+            raise KeyError(f"No recorded response for request {request_key(llm_request)[:12]}")
+        yield LlmResponse.model_validate(response)
@@ -1,49 +1,32 @@
+import asyncio
+import json
+import os
 import uuid
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any
 
-from google.adk.agents import LlmAgent, SequentialAgent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
 from dotenv import load_dotenv
-from google.genai import types
-from google.adk.models.google_llm import Gemini
-
-from google.adk.models.lite_llm import LiteLlm
 
-from github_agent.system_prompts import issue_reader_agent_prompt, orchestrator_agent_prompt, repo_navigator_agent_prompt, code_fix_agent_prompt, summary_agent_prompt
-from github_agent.functions import call_agent
-from github_agent.tools import github_mcp, get_github_owner
-from github_agent.schemas import IssueReaderAgentOutput, RepoNavigatorAgentOutput, CodeFixAgentOutput
+from github_agent.functions import parse_agent_json, stream_agent, render_stream
+from github_agent.patch import PatchApplyError, apply_hunks, parse_patch_output
+from github_agent.github_api import fetch_authenticated_user
+from github_agent.metrics import metrics, dump_metrics
+from github_agent.slicing import slice_navigation
 
-from google.adk.agents.callback_context import CallbackContext
-from google.adk.models import LlmRequest
+if TYPE_CHECKING:
+    from google.adk.agents.callback_context import CallbackContext
 
 
-import httpx
-import os
-import asyncio
-
 load_dotenv()
 
-github_token = os.getenv("GITHUB_PERSONAL_ACCESS_TOKEN")
-openrouter_api_key = os.getenv("OPENROUTER_API_KEY")
-
 
 APP_NAME = "GitHub Agent"
 USER_ID = "agent_user"
 
-retry_config = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],
-)
-
-model = Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config)
-
-# model = LiteLlm(
-#     model="openrouter/z-ai/glm-4.5-air:free",
-#     api_key=openrouter_api_key
-# )
+# Each stage gets its own model (see github_agent/routing, MODEL_ROUTES to override),
+# escalating to a larger one when its answer fails validation or looks unsure.
+# Routes like "openrouter/z-ai/glm-4.5-air:free" go through LiteLLM.
 
 
 # def repo_nav_before_model_callback(callback_context: CallbackContext, llm_request: LlmRequest):
@@ -64,78 +47,299 @@ model = Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config)
 #         raise ValueError(error_message)
 
 
-# Issue Reader Agent
-issue_reader_agent = LlmAgent(
-    model=model,
-    name="issue_reader_agent",
-    instruction=issue_reader_agent_prompt,
-    tools=[github_mcp],
-    # output_schema=IssueReaderAgentOutput,
-    output_key="issue"
-)
-
-# Repo Navigator Agent
-repo_navigator_agent = LlmAgent(
-    model=model,
-    name="repo_navigator_agent",
-    instruction=repo_navigator_agent_prompt,
-    tools=[github_mcp],
-    # input_schema=IssueReaderAgentOutput,
-    # output_schema=RepoNavigatorAgentOutput,
-    output_key="repo_navigation",
-)
-
-
-code_fix_agent = LlmAgent(
-    model=model,
-    name="code_fix_agent",
-    instruction=code_fix_agent_prompt,
-    tools=[github_mcp],
-    # output_schema=CodeFixAgentOutput,
-    output_key="code_fix"
-)
-summary_agent = LlmAgent(
-    model=model,
-    name="summary_agent_agent",
-    instruction=summary_agent_prompt,
-    tools=[github_mcp],
-    output_key="summary",
-)
-
-
-chain_agent = SequentialAgent(
-    name="chain_agent",
-    description="Chain of agents",
-    sub_agents=[issue_reader_agent, repo_navigator_agent, code_fix_agent,summary_agent],
-)
-
-# Orchestrator Agent
-orchestrator_agent = LlmAgent(
-    model=model,
-    name="orchestrator_agent",
-    instruction=orchestrator_agent_prompt,
-    tools=[get_github_owner],
-    sub_agents=[chain_agent],
-    output_key="response"
-)
-
-service = InMemorySessionService()
-root_agent = orchestrator_agent
+def code_fix_after_agent_callback(callback_context: "CallbackContext"):
+    """
+    Applies the Code Fix Agent's hunks to `full_file` and stores the rebuilt
+    file in 'code_fix', so later stages see the same shape as in full mode.
+    When the fixer was shown a slice, the hunks are applied to the slice and
+    the result is spliced back into the full file.
+    """
+    state = callback_context.state
+    code_fix = state.get("code_fix")
+    if not code_fix:
+        return None
+
+    try:
+        patch = parse_patch_output(code_fix)
+        repo_nav = parse_agent_json(state.get("repo_navigation") or state.get("repo_navigator")) or {}
+        if "full_file" not in repo_nav:
+            raise PatchApplyError("Missing 'full_file' in repo navigation state")
+
+        code_slice = slice_navigation(repo_nav)
+        if code_slice is not None:
+            updated_file = code_slice.splice(apply_hunks(code_slice.text, patch.hunks))
+            _record_slice(code_slice)
+        else:
+            updated_file = apply_hunks(repo_nav["full_file"], patch.hunks)
+    except ValueError as e:
+        print(f"❌ Could not apply code fix patch: {e}")
+        state["code_fix"] = json.dumps({
+            "code_fix_summary": "Not available",
+            "patch_error": str(e),
+            "raw_output": str(code_fix),
+        })
+        return None
+
+    state["code_fix"] = json.dumps({
+        "updated_file": updated_file,
+        "code_fix_summary": patch.code_fix_summary,
+        "hunks": [hunk.model_dump() for hunk in patch.hunks],
+    })
+    return None
+
+
+def code_fix_splice_callback(callback_context: "CallbackContext"):
+    """
+    Full mode: when the Code Fix Agent was shown a slice of `full_file`, put
+    its updated slice back into the full file.
+    """
+    state = callback_context.state
+    try:
+        code_fix = parse_agent_json(state.get("code_fix"))
+    except ValueError:
+        return None
+    code_slice = slice_navigation(state.get("repo_navigation") or state.get("repo_navigator"))
+    if code_slice is None or not isinstance(code_fix, dict) or not isinstance(code_fix.get("updated_file"), str):
+        return None
+
+    try:
+        updated_file = code_slice.splice(code_fix["updated_file"])
+    except ValueError as e:
+        print(f"❌ Could not splice the fixed slice into the file: {e}")
+        state["code_fix"] = json.dumps({
+            "code_fix_summary": code_fix.get("code_fix_summary", "Not available"),
+            "patch_error": str(e),
+            "raw_output": code_fix["updated_file"],
+        })
+        return None
+
+    _record_slice(code_slice)
+    state["code_fix"] = json.dumps({**code_fix, "updated_file": updated_file})
+    return None
+
+
+def _record_slice(code_slice) -> None:
+    metrics.increment("code_slice_total")
+    metrics.increment("code_slice_lines_omitted_total", code_slice.total_lines - code_slice.kept_lines)
+
+
+@dataclass
+class AgentApp:
+    """The agents and session service, built together on first use."""
+
+    orchestrator_agent: Any
+    chain_agent: Any
+    issue_reader_agent: Any
+    repo_navigator_agent: Any
+    code_fix_agent: Any
+    summary_agent: Any
+    service: Any
+
+
+@lru_cache(maxsize=None)
+def get_app() -> AgentApp:
+    """
+    Build the model routes, agents, MCP toolset and session service.
+
+    Nothing here runs at import time: ADK and google-genai take seconds to
+    import, and environment variables (GITHUB_MCP_URL, CODE_FIX_MODE,
+    SESSION_DB_URL, ...) are read when the app is first needed.
+    """
+    from google.adk.agents import LlmAgent, SequentialAgent
+
+    from github_agent.agent_output import validate_stage_output
+    from github_agent.candidates import prefetch_candidates_callback
+    from github_agent.code_index import search_code_local
+    from github_agent.issue_parser import preparse_issue_callback
+    from github_agent.metrics import instrumentation_callbacks, start_stage_timer, stop_stage_timer
+    from github_agent.prompt_assembly import replace_handoff_contents
+    from github_agent.report import add_report_prose_callback, render_report_callback
+    from github_agent.resolutions import record_resolution_callback, resolution_prior_callback
+    from github_agent.routing import route_model
+    from github_agent.schemas import IssueReaderAgentOutput, RepoNavigatorAgentOutput, CodeFixAgentOutput, CodeFixPatchOutput
+    from github_agent.sessions import create_session_service, skip_completed_stage, record_completed_stage
+    from github_agent.system_prompts import (
+        issue_reader_agent_static_prompt, issue_reader_agent_prompt, orchestrator_agent_prompt,
+        repo_navigator_agent_static_prompt, repo_navigator_agent_prompt,
+        code_fix_agent_static_prompt, code_fix_agent_prompt, code_fix_agent_patch_static_prompt, code_fix_agent_patch_prompt,
+        summary_agent_static_prompt, summary_agent_prompt,
+    )
+    from github_agent.tools import get_github_owner, get_github_tools
+
+    # "patch": the Code Fix Agent emits search/replace hunks that are applied locally
+    # "full": the Code Fix Agent re-emits the entire updated file
+    code_fix_mode = os.getenv("CODE_FIX_MODE", "patch")
+
+    # "template": the report is rendered from session state without a model call
+    # "prose": the model writes an overview paragraph that heads the rendered report
+    summary_mode = os.getenv("SUMMARY_MODE", "template")
+
+    # Each agent's static_instruction is the same on every call and forms the cached prompt
+    # prefix; instruction only renders the per-request state (see github_agent/system_prompts)
+
+    # Issue Reader Agent
+    issue_reader_agent = LlmAgent(
+        model=route_model("issue_reader_agent", IssueReaderAgentOutput),
+        name="issue_reader_agent",
+        static_instruction=issue_reader_agent_static_prompt,
+        instruction=issue_reader_agent_prompt,
+        tools=get_github_tools("issue_reader_agent"),
+        # output_schema=IssueReaderAgentOutput,
+        output_key="issue",
+        before_agent_callback=[start_stage_timer, skip_completed_stage, preparse_issue_callback],
+        after_agent_callback=[validate_stage_output, record_completed_stage, stop_stage_timer],
+        **instrumentation_callbacks,
+    )
+
+    # Repo Navigator Agent
+    repo_navigator_agent = LlmAgent(
+        model=route_model("repo_navigator_agent", RepoNavigatorAgentOutput),
+        name="repo_navigator_agent",
+        static_instruction=repo_navigator_agent_static_prompt,
+        instruction=repo_navigator_agent_prompt,
+        tools=[*get_github_tools("repo_navigator_agent"), search_code_local],
+        # input_schema=IssueReaderAgentOutput,
+        # output_schema=RepoNavigatorAgentOutput,
+        output_key="repo_navigation",
+        before_agent_callback=[start_stage_timer, skip_completed_stage, resolution_prior_callback, prefetch_candidates_callback],
+        after_agent_callback=[validate_stage_output, record_completed_stage, stop_stage_timer],
+        **instrumentation_callbacks,
+    )
+
+    code_fix_agent = LlmAgent(
+        model=route_model("code_fix_agent", CodeFixPatchOutput if code_fix_mode == "patch" else CodeFixAgentOutput),
+        name="code_fix_agent",
+        static_instruction=code_fix_agent_patch_static_prompt if code_fix_mode == "patch" else code_fix_agent_static_prompt,
+        instruction=code_fix_agent_patch_prompt if code_fix_mode == "patch" else code_fix_agent_prompt,
+        # Everything the fixer needs is in its instruction
+        tools=get_github_tools("code_fix_agent"),
+        # output_schema=CodeFixAgentOutput,
+        output_key="code_fix",
+        # The issue and the (sliced) file come through the State message; the navigator's
+        # reply with the whole file is not sent again
+        include_contents="none",
+        before_agent_callback=[start_stage_timer, skip_completed_stage],
+        after_agent_callback=(
+            [code_fix_after_agent_callback, validate_stage_output, record_resolution_callback, record_completed_stage, stop_stage_timer]
+            if code_fix_mode == "patch"
+            else [code_fix_splice_callback, validate_stage_output, record_resolution_callback, record_completed_stage, stop_stage_timer]
+        ),
+        **{
+            **instrumentation_callbacks,
+            "before_model_callback": [replace_handoff_contents, instrumentation_callbacks["before_model_callback"]],
+        },
+    )
+    summary_agent = LlmAgent(
+        model=route_model("summary_agent_agent"),
+        name="summary_agent_agent",
+        static_instruction=summary_agent_static_prompt,
+        instruction=summary_agent_prompt,
+        tools=get_github_tools("summary_agent_agent"),
+        output_key="summary",
+        before_agent_callback=(
+            [start_stage_timer, skip_completed_stage]
+            if summary_mode == "prose"
+            else [start_stage_timer, skip_completed_stage, render_report_callback]
+        ),
+        # add_report_prose_callback answers with the report, so it runs last
+        after_agent_callback=(
+            [record_completed_stage, stop_stage_timer, add_report_prose_callback]
+            if summary_mode == "prose"
+            else [record_completed_stage, stop_stage_timer]
+        ),
+        **instrumentation_callbacks,
+    )
+
+    chain_agent = SequentialAgent(
+        name="chain_agent",
+        description="Chain of agents",
+        sub_agents=[issue_reader_agent, repo_navigator_agent, code_fix_agent,summary_agent],
+    )
+
+    # Orchestrator Agent
+    orchestrator_agent = LlmAgent(
+        model=route_model("orchestrator_agent"),
+        name="orchestrator_agent",
+        static_instruction=orchestrator_agent_prompt,
+        tools=[get_github_owner],
+        sub_agents=[chain_agent],
+        output_key="response",
+        before_agent_callback=start_stage_timer,
+        after_agent_callback=stop_stage_timer,
+        **instrumentation_callbacks,
+    )
+
+    return AgentApp(
+        orchestrator_agent=orchestrator_agent,
+        chain_agent=chain_agent,
+        issue_reader_agent=issue_reader_agent,
+        repo_navigator_agent=repo_navigator_agent,
+        code_fix_agent=code_fix_agent,
+        summary_agent=summary_agent,
+        # SQLite by default, so completed stages survive crashes; SESSION_DB_URL=memory to opt out
+        service=create_session_service(os.getenv("SESSION_DB_URL")),
+    )
+
+
+# Module attributes served from the lazily built app; `adk web`/`adk run` look up root_agent
+_APP_ATTRIBUTES = {
+    "root_agent": "orchestrator_agent",
+    "orchestrator_agent": "orchestrator_agent",
+    "chain_agent": "chain_agent",
+    "issue_reader_agent": "issue_reader_agent",
+    "repo_navigator_agent": "repo_navigator_agent",
+    "code_fix_agent": "code_fix_agent",
+    "summary_agent": "summary_agent",
+    "service": "service",
+}
+
+
+def __getattr__(name: str):
+    if name in _APP_ATTRIBUTES:
+        return getattr(get_app(), _APP_ATTRIBUTES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 async def fetch_github_owner() -> str:
     """Fetch GitHub username from API (for initial session setup)"""
-    async with httpx.AsyncClient() as client:
-        r = await client.get(
-            "https://api.github.com/user",
-            headers={"Authorization": f"Bearer {github_token}"}
-        )
-        r.raise_for_status()
-        user = r.json()["login"]
-        return user
+    from github_agent.tools import get_github_token
+
+    return await fetch_authenticated_user(get_github_token())
+
+
+def create_runner(agent: Any) -> Any:
+    """
+    Runner for `agent` on the app's session service. With LLM_CONTEXT_CACHE=1,
+    Gemini stages also keep an explicit context cache of their static prompt
+    prefix and tools; implicit prefix caching needs no setup.
+    """
+    from google.adk.runners import Runner
+
+    from github_agent.metrics import metrics_plugin
+
+    service = get_app().service
+    plugins = [metrics_plugin()]
+    if os.getenv("LLM_CONTEXT_CACHE", "").lower() not in ("1", "true", "yes"):
+        return Runner(agent=agent, session_service=service, app_name=APP_NAME, plugins=plugins)
+
+    from google.adk.agents.context_cache_config import ContextCacheConfig
+    from google.adk.apps import App
+
+    context_cache_config = ContextCacheConfig(
+        cache_intervals=int(os.getenv("LLM_CONTEXT_CACHE_INTERVALS", "10")),
+        ttl_seconds=int(os.getenv("LLM_CONTEXT_CACHE_TTL", "1800")),
+        # Gemini refuses to cache shorter requests
+        min_tokens=int(os.getenv("LLM_CONTEXT_CACHE_MIN_TOKENS", "2048")),
+    )
+    return Runner(
+        app=App(name=APP_NAME, root_agent=agent, plugins=plugins, context_cache_config=context_cache_config),
+        session_service=service,
+    )
 
 
 async def run_session():
+    app = get_app()
+    service = app.service
     result = await service.list_sessions(app_name=APP_NAME, user_id=USER_ID)
 
     if result.sessions:
@@ -163,26 +367,29 @@ async def run_session():
         )
         print(f"✓ GitHub user initialized: {github_user}")
 
-    runner = Runner(
-        agent=root_agent,
-        session_service=service,
-        app_name=APP_NAME,
-    )
+    runner = create_runner(app.orchestrator_agent)
 
     while True:
         user_input = input("\nYou: ").strip()
         if user_input.lower() in ["exit", "quit"]:
             break
+        if user_input.lower() == "metrics":
+            print(metrics.to_prometheus())
+            continue
 
-        await call_agent(
+        await render_stream(stream_agent(
             runner=runner,
             session_id=session_id,
             user_id=USER_ID,
             query=user_input,
-        )
+        ))
 
 
 if __name__ == "__main__":
-    asyncio.run(run_session())
+    try:
+        asyncio.run(run_session())
+    finally:
+        if os.getenv("METRICS_PATH"):
+            dump_metrics(os.getenv("METRICS_PATH"))
 
 # I have some error in my repo Agent-Testing-Capstone-GenAI.. Please use appropriate tools and check the error
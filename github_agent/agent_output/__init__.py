@@ -0,0 +1 @@
+from .main import STAGE_SCHEMAS, JSON_OUTPUT_AGENTS, repair_json, loads_agent_json, parse_agent_output, IncrementalJSONParser, stage_output_error, validate_stage_output
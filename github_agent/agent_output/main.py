@@ -0,0 +1,309 @@
+import json
+import re
+from typing import TYPE_CHECKING, Any, Dict, Optional, Type
+
+from pydantic import BaseModel, ValidationError
+
+from github_agent.metrics import metrics
+from github_agent.schemas import IssueReaderAgentOutput, RepoNavigatorAgentOutput, CodeFixAgentOutput
+
+if TYPE_CHECKING:
+    from google.adk.agents.callback_context import CallbackContext
+
+
+# Schema each chain stage's output_key is validated against
+STAGE_SCHEMAS: Dict[str, Type[BaseModel]] = {
+    "issue": IssueReaderAgentOutput,
+    "repo_navigation": RepoNavigatorAgentOutput,
+    "code_fix": CodeFixAgentOutput,
+}
+
+# Agents whose streamed text is a JSON object, parsed field by field as it arrives
+JSON_OUTPUT_AGENTS = {"issue_reader_agent", "repo_navigator_agent", "code_fix_agent"}
+
+FENCED_JSON = re.compile(r"```[\w-]*\s*\n?(.*?)(?:\n?\s*```|$)", re.DOTALL)
+
+VALID_ESCAPES = set('"\\/bfnrtu')
+CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t", "\b": "\\b", "\f": "\\f"}
+PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+def _strip_fence(text: str) -> str:
+    """Prefer the first fenced block that holds an object over the text around it."""
+    for match in FENCED_JSON.finditer(text):
+        if "{" in match.group(1):
+            return match.group(1)
+    return text
+
+
+def _closes_string(text: str, index: int) -> bool:
+    """Is the quote at `index` the end of a string, judged by what follows it?"""
+    rest = text[index + 1:].lstrip()
+    return not rest or rest[0] in ",:}]"
+
+
+def repair_json(text: str) -> str:
+    """
+    Rewrite model output into strict JSON: drop code fences and any prose
+    around the first object, escape raw newlines/control characters and
+    stray quotes inside strings, double invalid backslash escapes, turn
+    triple-quoted blocks into strings, drop trailing commas, map Python
+    literals, and close whatever a truncated response left open.
+    """
+    text = _strip_fence(str(text))
+    start = text.find("{")
+    if start == -1:
+        raise ValueError("Agent output does not contain a JSON object")
+
+    out = []
+    stack = []
+    in_string = False
+    i = start
+    n = len(text)
+
+    while i < n:
+        c = text[i]
+
+        if in_string:
+            if c == "\\":
+                following = text[i + 1] if i + 1 < n else ""
+                if following in VALID_ESCAPES and following:
+                    out.append(c + following)
+                    i += 2
+                    continue
+                out.append("\\\\")
+            elif c == '"':
+                if _closes_string(text, i):
+                    in_string = False
+                    out.append(c)
+                else:
+                    out.append('\\"')
+            elif c in CONTROL_ESCAPES:
+                out.append(CONTROL_ESCAPES[c])
+            elif ord(c) < 0x20:
+                out.append(f"\\u{ord(c):04x}")
+            else:
+                out.append(c)
+            i += 1
+            continue
+
+        if text.startswith('"""', i):
+            end = text.find('"""', i + 3)
+            end = n if end == -1 else end
+            out.append(json.dumps(text[i + 3:end]))
+            i = end + 3
+            continue
+
+        if c == '"':
+            in_string = True
+            out.append(c)
+        elif c in "{[":
+            stack.append("}" if c == "{" else "]")
+            out.append(c)
+        elif c in "}]":
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if stack:
+                out.append(stack.pop())
+            if not stack:
+                # Anything after the outermost object is prose
+                break
+        elif c.isalpha():
+            word = re.match(r"[A-Za-z]+", text[i:]).group(0)
+            out.append(PYTHON_LITERALS.get(word, word))
+            i += len(word)
+            continue
+        else:
+            out.append(c)
+        i += 1
+
+    if in_string:
+        out.append('"')
+    while out and (out[-1].isspace() or out[-1] in ",:"):
+        out.pop()
+    while stack:
+        out.append(stack.pop())
+    return "".join(out)
+
+
+def loads_agent_json(value: Any) -> Any:
+    """json.loads for model output: strict parse first, repaired parse if that fails."""
+    if value is None or isinstance(value, (dict, list)):
+        return value
+
+    text = _strip_fence(str(value).strip())
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        try:
+            return json.loads(text[start:end + 1])
+        except json.JSONDecodeError:
+            pass
+
+    try:
+        return json.loads(repair_json(text))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Agent output is not repairable JSON: {e}") from e
+
+
+def parse_agent_output(value: Any, schema: Type[BaseModel]) -> BaseModel:
+    """Parse (repairing if needed) and validate an agent's output against `schema`."""
+    return schema.model_validate(loads_agent_json(value))
+
+
+class IncrementalJSONParser:
+    """
+    Consume a streamed JSON object chunk by chunk and report each top-level
+    field as soon as its value is complete, e.g. `target_file` long before
+    `full_file` has finished streaming.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields: Dict[str, Any] = {}
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._triple = False
+        self._escape = False
+        self._key_start: Optional[int] = None
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        """Add a chunk; return the fields completed by it."""
+        self.buffer += chunk
+        completed = {}
+        text = self.buffer
+        n = len(text)
+        i = self._pos
+
+        while i < n:
+            c = text[i]
+
+            if self._in_string:
+                if self._triple:
+                    if text.startswith('"""', i):
+                        self._in_string = self._triple = False
+                        i += 3
+                        self._string_closed(text, i, completed)
+                        continue
+                    if c == '"' and text[i:].strip('"') == "":
+                        # Might be the start of the closing quotes
+                        break
+                elif self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    rest = text[i + 1:].lstrip()
+                    if not rest:
+                        # Closing quote or a stray one; the next chunk decides
+                        break
+                    if rest[0] in ",:}]":
+                        self._in_string = False
+                        self._string_closed(text, i + 1, completed)
+                i += 1
+                continue
+
+            if c == '"':
+                if len(text) - i < 3 and text[i:].strip('"') == "":
+                    break
+                self._in_string = True
+                self._triple = text.startswith('"""', i)
+                if self._depth == 1 and self._key is None:
+                    self._key_start = i
+                i += 3 if self._triple else 1
+                continue
+
+            if c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                if self._depth == 1 and self._value_start is not None:
+                    self._complete(text[self._value_start:i], completed)
+                self._depth = max(0, self._depth - 1)
+                if self._depth == 1 and self._value_start is not None:
+                    self._complete(text[self._value_start:i + 1], completed)
+            elif self._depth == 1 and c == ":" and self._key is not None:
+                self._value_start = i + 1
+            elif self._depth == 1 and c == ",":
+                if self._value_start is not None:
+                    self._complete(text[self._value_start:i], completed)
+                self._key = None
+            i += 1
+
+        self._pos = i
+        return completed
+
+    def _string_closed(self, text: str, end: int, completed: dict) -> None:
+        if self._depth != 1:
+            return
+        if self._key is None and self._key_start is not None:
+            self._key = self._loads(text[self._key_start:end])
+            self._key_start = None
+        elif self._value_start is not None:
+            self._complete(text[self._value_start:end], completed)
+
+    def _complete(self, raw: str, completed: dict) -> None:
+        raw = raw.strip()
+        if not raw or self._key is None:
+            return
+        try:
+            value = self._loads(raw)
+        except ValueError:
+            return
+        self.fields[self._key] = completed[self._key] = value
+        self._value_start = None
+
+    @staticmethod
+    def _loads(raw: str) -> Any:
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return loads_agent_json('{"value": ' + raw + "}")["value"]
+
+    def result(self) -> Any:
+        """The whole object parsed from everything fed so far (repaired if truncated)."""
+        return loads_agent_json(self.buffer)
+
+
+def stage_output_error(output_key: str, value: Any) -> Optional[str]:
+    """Why a stage's stored output cannot be built on (schema mismatch or a fix that did not apply), or None."""
+    schema = STAGE_SCHEMAS.get(output_key)
+    if schema is None:
+        return None
+    try:
+        data = loads_agent_json(value)
+        schema.model_validate(data)
+    except (ValueError, ValidationError) as e:
+        return f"'{output_key}' does not match {schema.__name__}: {str(e).splitlines()[0]}"
+    if isinstance(data, dict) and data.get("patch_error"):
+        return f"'{output_key}' could not be applied: {data['patch_error']}"
+    return None
+
+
+def validate_stage_output(callback_context: "CallbackContext") -> None:
+    """
+    after_agent_callback for chain stages: repair the stage's JSON output and
+    validate it against its schema, storing it back as strict JSON so later
+    stages and parse_agent_json never see a malformed escape.
+    """
+    agent = callback_context._invocation_context.agent
+    schema = STAGE_SCHEMAS.get(agent.output_key)
+    state = callback_context.state
+    value = state.get(agent.output_key) if agent.output_key else None
+    if schema is None or value is None:
+        return None
+
+    try:
+        data = loads_agent_json(value)
+        model = schema.model_validate(data)
+    except (ValueError, ValidationError) as e:
+        metrics.increment("agent_output_invalid_total", stage=agent.name)
+        print(f"⚠️ {agent.name} output does not match {schema.__name__}: {str(e).splitlines()[0]}")
+        return None
+
+    # Keep extra keys such as the applied hunks alongside the validated fields
+    state[agent.output_key] = json.dumps({**data, **model.model_dump()})
+    return None
@@ -0,0 +1 @@
+from .main import run_batch, triage_issue, parse_issue_ref, dedupe_issue_refs, list_open_issues
@@ -0,0 +1,231 @@
+import argparse
+import asyncio
+import json
+import re
+import time
+import uuid
+from typing import TYPE_CHECKING, List, Optional
+
+from github_agent.agent import APP_NAME, create_runner, get_app
+from github_agent.agent_output import STAGE_SCHEMAS, stage_output_error
+from github_agent.functions.main import process_event
+from github_agent.github_api import close_http_client
+from github_agent.metrics import dump_metrics
+
+if TYPE_CHECKING:
+    from google.adk.runners import Runner
+
+
+ISSUE_REF_PATTERN = re.compile(r"^\s*([\w.-]+)/([\w.-]+)#(\d+)\s*$")
+
+# Kept apart from the interactive user so run_session() never picks up a batch session
+USER_ID = "batch_user"
+
+# Session state written by the chain that is worth keeping in the results file
+RESULT_STATE_KEYS = ["issue", "repo_navigation", "code_fix", "summary"]
+
+
+def parse_issue_ref(value) -> dict:
+    """Parse an `owner/repo#42` string or a JSON object into an issue reference."""
+    if isinstance(value, dict):
+        ref = value
+    else:
+        value = value.strip()
+        if value.startswith("{"):
+            ref = json.loads(value)
+        else:
+            match = ISSUE_REF_PATTERN.match(value)
+            if not match:
+                raise ValueError(f"Invalid issue reference '{value}', expected owner/repo#number")
+            ref = {"owner": match.group(1), "repo": match.group(2), "issue_number": match.group(3)}
+
+    return {
+        "owner": ref["owner"],
+        "repo": ref["repo"],
+        "issue_number": str(ref["issue_number"]),
+    }
+
+
+def issue_key(ref: dict) -> str:
+    """Case-insensitive identity of an issue reference; the batch session id is derived from it."""
+    return f"{ref['owner']}/{ref['repo']}#{ref['issue_number']}".lower()
+
+
+def dedupe_issue_refs(refs: List[dict]) -> List[dict]:
+    """Drop repeated references to the same issue, keeping the first, so no two workers share a session."""
+    unique = {}
+    for ref in refs:
+        unique.setdefault(issue_key(ref), ref)
+    return list(unique.values())
+
+
+async def list_open_issues(owner: str, repo: str, limit: int = 100) -> List[dict]:
+    """Use the MCP `list_issues` tool to collect open issues of a repo."""
+    from github_agent.tools import get_github_mcp
+
+    tools = await get_github_mcp().get_tools()
+    list_issues = next((tool for tool in tools if tool.name == "list_issues"), None)
+    if list_issues is None:
+        raise ValueError("list_issues tool is not available on the GitHub MCP server")
+
+    refs = []
+    after = None
+    while len(refs) < limit:
+        args = {"owner": owner, "repo": repo, "state": "OPEN", "perPage": min(limit, 100)}
+        if after:
+            args["after"] = after
+
+        result = await list_issues.run_async(args=args, tool_context=None)
+        if result.get("isError"):
+            raise ValueError(f"list_issues failed for {owner}/{repo}: {result.get('content')}")
+
+        payload = json.loads(result["content"][0]["text"])
+        # Newer servers wrap the page in {"issues": [...], "pageInfo": {...}}
+        issues = payload.get("issues", []) if isinstance(payload, dict) else payload
+        for issue in issues:
+            refs.append({"owner": owner, "repo": repo, "issue_number": str(issue["number"])})
+
+        page_info = payload.get("pageInfo", {}) if isinstance(payload, dict) else {}
+        after = page_info.get("endCursor")
+        if not page_info.get("hasNextPage") or not issues:
+            break
+
+    return refs[:limit]
+
+
+async def triage_issue(runner: "Runner", ref: dict, timeout: float) -> dict:
+    """
+    Run chain_agent on one issue in its own session and collect the outcome.
+
+    The session id is derived from the issue, so rerunning an issue whose
+    previous run failed resumes it and skips the stages that completed.
+    """
+    from google.genai import types
+
+    service = runner.session_service
+    session_id = str(uuid.uuid5(uuid.NAMESPACE_URL, issue_key(ref)))
+    session = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+    if session is None:
+        await service.create_session(
+            session_id=session_id,
+            app_name=APP_NAME,
+            user_id=USER_ID,
+            state={"github_user": ref["owner"]},
+        )
+
+    query = f"owner: {ref['owner']}, repo: {ref['repo']}, task: fetch issue #{ref['issue_number']} and resolve it"
+    content = types.Content(role="user", parts=[types.Part(text=query)])
+    record = dict(ref, session_id=session_id, resumed=session is not None)
+    started = time.monotonic()
+
+    async def drain() -> Optional[str]:
+        final_response = None
+        async for event in runner.run_async(user_id=USER_ID, session_id=session_id, new_message=content):
+            resp = await process_event(event)
+            if resp:
+                final_response = resp
+        return final_response
+
+    try:
+        record["response"] = await asyncio.wait_for(drain(), timeout=timeout)
+        record["status"] = "ok"
+    except asyncio.TimeoutError:
+        record["status"] = "timeout"
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = str(e)
+
+    record["elapsed_s"] = round(time.monotonic() - started, 3)
+
+    session = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+    if session is not None:
+        record["state"] = {key: session.state.get(key) for key in RESULT_STATE_KEYS if key in session.state}
+    if record["status"] == "ok" and session is not None:
+        # A chain that ran to the end can still have produced no usable fix
+        errors = [stage_output_error(key, session.state.get(key)) for key in STAGE_SCHEMAS]
+        errors = [error for error in errors if error]
+        if errors:
+            record["status"] = "failed"
+            record["error"] = "; ".join(errors)
+    # Unfinished and failed sessions are kept so the next run can resume them
+    if record["status"] == "ok":
+        await service.delete_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+
+    return record
+
+
+async def run_batch(
+    refs: List[dict],
+    output_path: str = "batch_results.jsonl",
+    concurrency: int = 4,
+    timeout: float = 600.0,
+) -> List[dict]:
+    """
+    Triage many issues concurrently, one session per issue.
+
+    At most `concurrency` chains run at once and each is cancelled after
+    `timeout` seconds. Every outcome is appended to `output_path` as soon as
+    it finishes, so a partial run still leaves usable results behind. An
+    issue given more than once is triaged once.
+    """
+    unique = dedupe_issue_refs(refs)
+    if len(unique) < len(refs):
+        print(f"↷ Skipping {len(refs) - len(unique)} duplicate issue reference(s)")
+    refs = unique
+
+    runner = create_runner(get_app().chain_agent)
+    semaphore = asyncio.Semaphore(concurrency)
+    records = []
+
+    with open(output_path, "a", encoding="utf-8") as output:
+        async def worker(ref: dict):
+            async with semaphore:
+                record = await triage_issue(runner, ref, timeout)
+            output.write(json.dumps(record, default=str) + "\n")
+            output.flush()
+            records.append(record)
+            print(f"[{record['status']}] {ref['owner']}/{ref['repo']}#{ref['issue_number']} ({record['elapsed_s']}s)")
+
+        await asyncio.gather(*(worker(ref) for ref in refs))
+
+    ok = sum(1 for record in records if record["status"] == "ok")
+    print(f"✓ Batch finished: {ok}/{len(records)} issues resolved, results in {output_path}")
+    return records
+
+
+async def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Triage many GitHub issues concurrently.")
+    parser.add_argument("issues", nargs="*", help="Issue references like owner/repo#42")
+    parser.add_argument("--issues-file", help="File with one owner/repo#42 or JSON object per line")
+    parser.add_argument("--list-issues", metavar="OWNER/REPO", help="Triage the open issues of a repo")
+    parser.add_argument("--limit", type=int, default=100, help="Max issues taken from --list-issues")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=600.0, help="Per-issue timeout in seconds")
+    parser.add_argument("--output", default="batch_results.jsonl")
+    parser.add_argument("--metrics-output", help="Write latency/token metrics here (.prom for Prometheus text, else JSON)")
+    args = parser.parse_args(argv)
+
+    refs = [parse_issue_ref(value) for value in args.issues]
+    if args.issues_file:
+        with open(args.issues_file, encoding="utf-8") as f:
+            refs.extend(parse_issue_ref(line) for line in f if line.strip())
+    if args.list_issues:
+        owner, repo = args.list_issues.split("/", 1)
+        refs.extend(await list_open_issues(owner, repo, limit=args.limit))
+
+    if not refs:
+        parser.error("no issues given")
+
+    from github_agent.tools import close_github_mcp
+
+    try:
+        await run_batch(refs, output_path=args.output, concurrency=args.concurrency, timeout=args.timeout)
+    finally:
+        await close_github_mcp()
+        await close_http_client()
+        if args.metrics_output:
+            dump_metrics(args.metrics_output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1 @@
+from .main import ToolResultCache, CACHEABLE_TOOLS, LlmResponseCache, llm_request_key
@@ -0,0 +1,361 @@
+import hashlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+
+# Read-only MCP tools whose results can be safely reused between calls
+CACHEABLE_TOOLS = {"get_file_contents", "list_commits", "get_commit"}
+
+COMMIT_SHA_PATTERN = re.compile(r"^[0-9a-fA-F]{40}$")
+
+
+def _is_commit_sha(value: Optional[str]) -> bool:
+    return bool(value) and bool(COMMIT_SHA_PATTERN.match(value))
+
+
+def _extract_head_sha(result: Any) -> Optional[str]:
+    """Pull the newest commit SHA out of a `list_commits` MCP response."""
+    if not isinstance(result, dict):
+        return None
+
+    for part in result.get("content") or []:
+        text = part.get("text") if isinstance(part, dict) else None
+        if not text:
+            continue
+        try:
+            commits = json.loads(text)
+        except ValueError:
+            continue
+        if isinstance(commits, list) and commits and isinstance(commits[0], dict):
+            sha = commits[0].get("sha")
+            if _is_commit_sha(sha):
+                return sha
+    return None
+
+
+class ToolResultCache:
+    """
+    Two-tier cache for read-only MCP tool results.
+
+    Entries are keyed by tool name, repo, ref and the commit SHA the ref
+    resolved to. Results for a pinned commit SHA never go stale; results for a
+    branch are tied to the branch head last seen in a `list_commits` response
+    and are dropped as soon as that head moves.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        cache_dir: Optional[str] = None,
+        branch_ttl: float = 300.0,
+    ):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.branch_ttl = branch_ttl
+        self.hits = 0
+        self.misses = 0
+
+        # key -> (payload, scope, stored_at); scope is None for pinned entries
+        self._entries: "OrderedDict[str, Tuple[bytes, Optional[tuple], float]]" = OrderedDict()
+        self._size = 0
+        self._heads: dict = {}
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def is_cacheable(self, tool_name: str) -> bool:
+        return tool_name in CACHEABLE_TOOLS
+
+    def _resolve(self, tool_name: str, args: dict) -> Tuple[str, Optional[tuple], Optional[str]]:
+        """Return the cache key, the branch scope and the commit SHA for a call."""
+        owner = str(args.get("owner", "")).lower()
+        repo = str(args.get("repo", "")).lower()
+
+        if tool_name == "get_file_contents":
+            ref = args.get("sha") or args.get("ref") or ""
+        else:
+            ref = args.get("sha") or ""
+
+        if _is_commit_sha(ref):
+            scope = None
+            sha = ref.lower()
+        else:
+            scope = (owner, repo, ref)
+            sha = self._heads.get(scope)
+
+        canonical = json.dumps(
+            [tool_name, owner, repo, ref, sha, args],
+            sort_keys=True,
+            default=str,
+        )
+        key = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+        return key, scope, sha
+
+    def _expires(self, tool_name: str, scope: Optional[tuple], sha: Optional[str]) -> bool:
+        # Branch listings are how head moves are noticed, so they always age out
+        return scope is not None and (sha is None or tool_name == "list_commits")
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, tool_name: str, args: dict) -> Any:
+        """Return the cached result for a tool call, or None on a miss."""
+        key, scope, sha = self._resolve(tool_name, args)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            payload, _, stored_at = entry
+            expires = self._expires(tool_name, scope, sha)
+            if expires and time.monotonic() - stored_at > self.branch_ttl:
+                self._drop(key)
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(payload)
+
+        # Only entries addressed by a concrete commit SHA live on disk
+        if self.cache_dir and not self._expires(tool_name, scope, sha):
+            try:
+                with open(self._disk_path(key), "rb") as f:
+                    payload = f.read()
+            except OSError:
+                payload = None
+            if payload is not None:
+                self._store(key, payload, scope)
+                self.hits += 1
+                return json.loads(payload)
+
+        self.misses += 1
+        return None
+
+    def put(self, tool_name: str, args: dict, result: Any) -> None:
+        """Store a successful tool result."""
+        if not isinstance(result, dict) or result.get("isError"):
+            return
+
+        if tool_name == "list_commits" and args.get("page") in (None, 1):
+            ref = args.get("sha") or ""
+            head = _extract_head_sha(result)
+            if head and not _is_commit_sha(ref):
+                self.note_head(args.get("owner", ""), args.get("repo", ""), ref, head)
+
+        key, scope, sha = self._resolve(tool_name, args)
+        payload = json.dumps(result).encode("utf-8")
+        self._store(key, payload, scope)
+
+        if self.cache_dir and not self._expires(tool_name, scope, sha):
+            tmp_path = self._disk_path(key) + ".tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp_path, self._disk_path(key))
+            except OSError as e:
+                print(f"Warning: could not write tool cache entry: {e}")
+
+    def note_head(self, owner: str, repo: str, ref: str, sha: str) -> None:
+        """Record the current head of a branch, dropping entries for an older head."""
+        scope = (str(owner).lower(), str(repo).lower(), ref)
+        if self._heads.get(scope) == sha.lower():
+            return
+
+        self._heads[scope] = sha.lower()
+        self.invalidate(owner, repo, ref)
+
+    def invalidate(self, owner: str, repo: str, ref: Optional[str] = None) -> None:
+        """Drop in-memory branch entries for a repo, or for one ref of it."""
+        owner, repo = str(owner).lower(), str(repo).lower()
+        stale = [
+            key for key, (_, scope, _) in self._entries.items()
+            if scope is not None and scope[:2] == (owner, repo) and (ref is None or scope[2] == ref)
+        ]
+        for key in stale:
+            self._drop(key)
+
+    def _store(self, key: str, payload: bytes, scope: Optional[tuple]) -> None:
+        if len(payload) > self.max_bytes:
+            return
+
+        self._drop(key)
+        self._entries[key] = (payload, scope, time.monotonic())
+        self._size += len(payload)
+
+        while self._size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[0])
+
+    def clear(self) -> None:
+        """Drop every in-memory entry and known branch head."""
+        self._entries.clear()
+        self._heads.clear()
+        self._size = 0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self._size,
+        }
+
+
+def llm_request_key(model: str, llm_request: Any) -> str:
+    """
+    Hash of everything that determines a model answer: the model, the
+    rendered system instruction and generation config (including tool
+    declarations), and the conversation contents with tool calls and tool
+    results. Function call ids are random per run, so they are left out.
+    """
+    config = llm_request.config
+    parts = [
+        model,
+        json.dumps(
+            config.model_dump(mode="json", exclude_none=True, exclude={"http_options"}) if config else None,
+            sort_keys=True,
+            default=str,
+        ),
+    ]
+    for content in llm_request.contents or []:
+        parts.append(content.role or "")
+        for part in content.parts or []:
+            if part.text:
+                parts.append(part.text)
+            if part.function_call is not None:
+                parts.append(json.dumps([part.function_call.name, part.function_call.args], sort_keys=True, default=str))
+            if part.function_response is not None:
+                parts.append(json.dumps([part.function_response.name, part.function_response.response], sort_keys=True, default=str))
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+class LlmResponseCache:
+    """
+    Two-tier cache of final model responses keyed by llm_request_key.
+
+    The in-memory tier is an LRU bounded by max_bytes; the optional disk tier
+    under cache_dir is pruned oldest-first past max_disk_bytes. Every entry
+    expires ttl seconds after it was stored.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 32 * 1024 * 1024,
+        cache_dir: Optional[str] = None,
+        ttl: float = 24 * 3600.0,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+
+        # key -> (payload, stored_at as wall-clock time, so disk entries age across runs)
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._size = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the cached response (as a dict) for a request key, or None on a miss."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            payload, stored_at = entry
+            if time.time() - stored_at <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(payload)
+            self._drop(key)
+
+        if self.cache_dir:
+            path = self._disk_path(key)
+            try:
+                stored_at = os.path.getmtime(path)
+                with open(path, "rb") as f:
+                    payload = f.read()
+            except OSError:
+                payload = None
+            if payload is not None:
+                if time.time() - stored_at <= self.ttl:
+                    self._store(key, payload, stored_at)
+                    self.hits += 1
+                    return json.loads(payload)
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, response: dict) -> None:
+        payload = json.dumps(response).encode("utf-8")
+        self._store(key, payload, time.time())
+
+        if self.cache_dir and len(payload) <= self.max_disk_bytes:
+            tmp_path = self._disk_path(key) + ".tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp_path, self._disk_path(key))
+                self._prune_disk()
+            except OSError as e:
+                print(f"Warning: could not write LLM cache entry: {e}")
+
+    def _prune_disk(self) -> None:
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".json"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def _store(self, key: str, payload: bytes, stored_at: float) -> None:
+        if len(payload) > self.max_bytes:
+            return
+
+        self._drop(key)
+        self._entries[key] = (payload, stored_at)
+        self._size += len(payload)
+
+        while self._size > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[0])
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._size = 0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self._size,
+        }
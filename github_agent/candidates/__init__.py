@@ -0,0 +1 @@
+from .main import rank_candidates, score_candidate, resolve_referenced, result_text, prefetch_candidates_callback
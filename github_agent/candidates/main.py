@@ -0,0 +1,277 @@
+import asyncio
+import json
+import math
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from github_agent.code_index import SYMBOL_PATTERNS, code_indexes, query_terms
+from github_agent.functions import parse_agent_json
+from github_agent.git_mirror import GitMirrorError, get_git_mirror
+from github_agent.github_api import fetch_path_commits
+from github_agent.issue_parser import parse_issue_request
+from github_agent.metrics import metrics
+from github_agent.rate_limit import stage_priority
+
+if TYPE_CHECKING:
+    from google.adk.agents.callback_context import CallbackContext
+    from google.adk.tools import BaseTool
+
+
+# Files fetched and scored before the navigator runs; the best two reach its prompt
+TOP_K = int(os.getenv("NAVIGATOR_CANDIDATES", "5"))
+PROMPT_CANDIDATES = 2
+
+# The whole fan-out (search, fetches, history) gives up after this many seconds
+PREFETCH_TIMEOUT = float(os.getenv("NAVIGATOR_PREFETCH_TIMEOUT", "20"))
+
+# Commits touching a file within this window count as churn
+CHURN_DAYS = int(os.getenv("NAVIGATOR_CHURN_DAYS", "90"))
+CHURN_MAX_COMMITS = 30
+
+# How much each signal counts towards a candidate's score
+REFERENCED_WEIGHT = 3.0
+SEARCH_WEIGHT = 2.0
+ERROR_PHRASE_WEIGHT = 3.0
+ERROR_TERM_WEIGHT = 1.5
+DEFINITION_WEIGHT = 2.0
+MAX_DEFINITIONS = 3
+CHURN_WEIGHT = 0.5
+
+# Matching lines shown per candidate in the navigator prompt
+MAX_CANDIDATE_LINES = 6
+
+# State key the navigator prompt reads the candidates from
+CANDIDATES_STATE_KEY = "navigation_candidates"
+
+
+def _parse(value: Any) -> dict:
+    try:
+        parsed = parse_agent_json(value)
+    except ValueError:
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def result_text(result: Any) -> Optional[str]:
+    """The text of an MCP tool result: an embedded resource's text when there is one, else the text parts."""
+    if not isinstance(result, dict) or result.get("isError"):
+        return None
+    texts = []
+    for item in result.get("content") or []:
+        resource = item.get("resource") if isinstance(item, dict) else None
+        if isinstance(resource, dict) and isinstance(resource.get("text"), str):
+            return resource["text"]
+        if isinstance(item, dict) and isinstance(item.get("text"), str):
+            texts.append(item["text"])
+    return "\n".join(texts) if texts else None
+
+
+def _error_phrase(message: str) -> str:
+    """'ValueError: bad input' -> 'bad input': the part of an error that would appear in the source."""
+    head, _, tail = message.partition(": ")
+    return (tail if tail and " " not in head else message).strip()
+
+
+def resolve_referenced(paths: List[str], known: Optional[List[str]] = None) -> List[str]:
+    """
+    Map paths from tracebacks and prose ('/app/src/auth.py', './auth.py')
+    onto repository paths, by the longest matching suffix when the file list
+    is known. A suffix must keep at least a directory and the file name, so
+    '/app/src/auth.py' never lands on an unrelated 'lib/auth.py'; a bare
+    file name only resolves when one file in the repository has it.
+    """
+    resolved = []
+    for path in paths:
+        path = path.strip().replace("\\", "/")
+        while path.startswith("./"):
+            path = path[2:]
+        path = path.lstrip("/")
+        if not path:
+            continue
+        if known is not None:
+            parts = path.split("/")
+            match = None
+            for start in range(len(parts) - min(2, len(parts)) + 1):
+                suffix = "/".join(parts[start:])
+                hits = [candidate for candidate in known if candidate == suffix or candidate.endswith("/" + suffix)]
+                if len(parts) == 1 and len(hits) > 1:
+                    break
+                if hits:
+                    match = min(hits, key=len)
+                    break
+            if match is None:
+                continue
+            path = match
+        if path not in resolved:
+            resolved.append(path)
+    return resolved
+
+
+def score_candidate(path: str, text: str, issue: dict, terms: List[str], referenced: bool, search_score: float, churn: int) -> dict:
+    """Score one fetched file against the issue; returns {"path", "score", "signals", "lines"}."""
+    lines = text.splitlines()
+    signals: Dict[str, float] = {}
+    matched_lines: Dict[int, str] = {}
+
+    if referenced:
+        signals["referenced"] = REFERENCED_WEIGHT
+    if search_score:
+        signals["search"] = round(SEARCH_WEIGHT * search_score, 3)
+
+    error_score = 0.0
+    for message in issue.get("error_messages") or []:
+        phrase = _error_phrase(str(message))
+        if len(phrase) >= 4 and phrase in text:
+            error_score += ERROR_PHRASE_WEIGHT
+            matched_lines.update((number, line) for number, line in enumerate(lines, start=1) if phrase in line)
+            continue
+        words = [term for term in query_terms(phrase) if " " not in term]
+        if words:
+            error_score += ERROR_TERM_WEIGHT * sum(1 for word in words if word in text) / len(words)
+    if error_score:
+        signals["error_match"] = round(error_score, 3)
+
+    wanted = {term.lower() for term in terms}
+    definitions = set()
+    for number, line in enumerate(lines, start=1):
+        for pattern in SYMBOL_PATTERNS:
+            match = pattern.match(line)
+            if match:
+                if match.group(1).lower() in wanted:
+                    definitions.add(match.group(1))
+                    matched_lines[number] = line
+                break
+    if definitions:
+        signals["definitions"] = DEFINITION_WEIGHT * min(len(definitions), MAX_DEFINITIONS)
+
+    if churn:
+        signals["churn"] = round(CHURN_WEIGHT * math.log1p(churn), 3)
+
+    return {
+        "path": path,
+        "score": round(sum(signals.values()), 3),
+        "signals": signals,
+        "definitions": sorted(definitions),
+        "lines": [
+            {"line": number, "text": matched_lines[number].strip()[:200]}
+            for number in sorted(matched_lines)[:MAX_CANDIDATE_LINES]
+        ],
+    }
+
+
+async def _churn(owner: str, repo: str, path: str, priority: int) -> int:
+    """Commits touching `path` in the last CHURN_DAYS days, from the git mirror or the REST API."""
+    since = datetime.now(timezone.utc) - timedelta(days=CHURN_DAYS)
+    mirror = get_git_mirror()
+    commits = None
+    if mirror is not None:
+        try:
+            commits = json.loads(await mirror.list_commits(owner, repo, path=path, perPage=CHURN_MAX_COMMITS))
+        except GitMirrorError:
+            commits = None
+    if commits is None:
+        from github_agent.tools import get_github_token
+
+        commits = await fetch_path_commits(
+            get_github_token(), owner, repo, path,
+            since=since.strftime("%Y-%m-%dT%H:%M:%SZ"), per_page=CHURN_MAX_COMMITS, priority=priority,
+        )
+
+    count = 0
+    for commit in commits:
+        date = ((commit.get("commit") or {}).get("committer") or {}).get("date")
+        try:
+            if date and datetime.fromisoformat(date.replace("Z", "+00:00")) >= since:
+                count += 1
+        except ValueError:
+            continue
+    return count
+
+
+async def _fetch_and_score(
+    get_file: "BaseTool", owner: str, repo: str, path: str, issue: dict, terms: List[str],
+    referenced: bool, search_score: float, priority: int,
+) -> Optional[dict]:
+    # Same arguments as the navigator's own call, so that call is a cache hit
+    fetch = get_file.run_async(args={"owner": owner, "repo": repo, "path": path}, tool_context=None)
+    result, churn = await asyncio.gather(fetch, _churn(owner, repo, path, priority), return_exceptions=True)
+    text = result_text(result) if not isinstance(result, BaseException) else None
+    if text is None:
+        return None
+    return score_candidate(path, text, issue, terms, referenced, search_score, churn if isinstance(churn, int) else 0)
+
+
+async def rank_candidates(owner: str, repo: str, issue: dict, priority: int = 0, k: int = TOP_K) -> List[dict]:
+    """
+    Collect up to `k` candidate files (the issue's referenced files, then
+    local code search hits), fetch them and their recent history
+    concurrently and return them scored, best first.
+    """
+    terms = query_terms(" ".join(
+        [str(issue.get("title") or ""), str(issue.get("problem_summary") or "")]
+        + [str(message) for message in issue.get("error_messages") or []]
+    ))
+    referenced_paths = [str(path) for path in issue.get("referenced_files") or []]
+
+    search_scores: Dict[str, float] = {}
+    known = None
+    try:
+        index = await code_indexes.get(owner, repo, None, priority=priority)
+        known = list(index.files)
+        hits = index.search(terms + [os.path.basename(path) for path in referenced_paths], limit=k) if terms or referenced_paths else []
+        top = hits[0]["score"] if hits else 0
+        search_scores = {hit["path"]: hit["score"] / top for hit in hits if top}
+    except Exception as e:
+        # Without the index only the referenced files are candidates
+        print(f"⚠️ Candidate search skipped: {e}")
+
+    referenced = resolve_referenced(referenced_paths, known)
+    paths = list(dict.fromkeys(referenced + list(search_scores)))[:k]
+    if not paths:
+        return []
+
+    from github_agent.tools import get_github_mcp
+
+    tools = await get_github_mcp().get_tools()
+    get_file = next((tool for tool in tools if tool.name == "get_file_contents"), None)
+    if get_file is None:
+        return []
+
+    scored = await asyncio.gather(*(
+        _fetch_and_score(get_file, owner, repo, path, issue, terms, path in referenced, search_scores.get(path, 0.0), priority)
+        for path in paths
+    ))
+    return sorted((candidate for candidate in scored if candidate), key=lambda candidate: -candidate["score"])
+
+
+async def prefetch_candidates_callback(callback_context: "CallbackContext") -> None:
+    """
+    before_agent_callback for repo_navigator_agent: fan out over the top-k
+    candidate files in parallel and leave the winner and runner-up in state
+    for the navigator prompt. Their contents are then already in the tool
+    cache when the navigator fetches them.
+    """
+    state = callback_context.state
+    issue = _parse(state.get("issue"))
+    content = callback_context.user_content
+    text = "".join(part.text or "" for part in content.parts or []) if content else ""
+    request = parse_issue_request(text, state.get("github_user"))
+    if not issue or request is None:
+        return None
+
+    started = time.monotonic()
+    try:
+        candidates = await asyncio.wait_for(
+            rank_candidates(request["owner"], request["repo"], issue, priority=stage_priority(callback_context.agent_name)),
+            timeout=PREFETCH_TIMEOUT,
+        )
+    except Exception as e:
+        print(f"⚠️ Candidate prefetch skipped: {e}")
+        candidates = []
+
+    metrics.observe("navigator_prefetch_seconds", time.monotonic() - started)
+    metrics.increment("navigator_prefetch_total", outcome="ranked" if candidates else "empty")
+    state[CANDIDATES_STATE_KEY] = json.dumps(candidates[:PROMPT_CANDIDATES]) if candidates else None
+    return None
@@ -0,0 +1 @@
+from .main import COALESCABLE_TOOLS, SingleFlight, coalesce_key
@@ -0,0 +1,79 @@
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+# Read-only MCP tools; identical concurrent calls to these can share one request.
+# Write tools (create_or_update_file, create_branch, delete_file,
+# create_pull_request, update_pull_request) are never coalesced.
+COALESCABLE_TOOLS = {
+    "get_file_contents",
+    "list_commits",
+    "get_commit",
+    "search_repositories",
+    "list_issues",
+    "list_pull_requests",
+    "get_me",
+}
+
+
+def coalesce_key(tool_name: str, args: dict) -> str:
+    return json.dumps([tool_name, args], sort_keys=True, default=str)
+
+
+class SingleFlight:
+    """
+    Share one in-flight call among concurrent identical requests.
+
+    The first caller for a key runs the call in its own task; callers that
+    arrive while it is running wait on a future that receives the same
+    result or exception. Running the call in the caller's task keeps
+    context-bound resources (MCP sessions, their cancel scopes) in one task.
+    If the first caller is cancelled, a waiting caller runs the call again.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.started = 0
+        self.shared = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        future = self._inflight.get(key)
+        return future is not None and future.get_loop() is asyncio.get_running_loop()
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        while self.in_flight(key):
+            future = self._inflight[key]
+            self.shared += 1
+            try:
+                # Shielded: a waiter being cancelled must not cancel the shared future
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Only the first caller was cancelled, not this one: take over the call
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+        return await self._lead(key, call)
+
+    async def _lead(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.started += 1
+        try:
+            result = await call()
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody may be waiting for a failed call; mark the error as seen
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def stats(self) -> dict:
+        return {"started": self.started, "shared": self.shared, "in_flight": len(self._inflight)}
@@ -0,0 +1 @@
+from .main import RepoIndex, CodeIndexStore, SYMBOL_PATTERNS, code_indexes, query_terms, search_code_local
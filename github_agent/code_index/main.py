@@ -0,0 +1,349 @@
+import asyncio
+import hashlib
+import io
+import math
+import os
+import re
+import tarfile
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+
+from github_agent.git_mirror import GitMirrorError, get_git_mirror
+from github_agent.github_api import fetch_commit_sha, fetch_tarball
+from github_agent.metrics import metrics
+from github_agent.rate_limit import stage_priority
+
+if TYPE_CHECKING:
+    from google.adk.tools.tool_context import ToolContext
+
+
+# Files larger than this, binaries and vendored directories are not indexed
+MAX_FILE_BYTES = int(os.getenv("CODE_INDEX_MAX_FILE_BYTES", "524288"))
+MAX_FILES = int(os.getenv("CODE_INDEX_MAX_FILES", "20000"))
+SKIPPED_DIRECTORIES = {".git", "node_modules", "vendor", "dist", "build", "__pycache__", ".venv", "venv", "site-packages"}
+
+# Repositories kept in memory at once (least recently searched is dropped)
+MAX_REPOS = int(os.getenv("CODE_INDEX_MAX_REPOS", "8"))
+
+# Definitions across the languages the agents are asked about; group 1 is the name
+SYMBOL_PATTERNS = [
+    re.compile(r"^\s*(?:async\s+)?def\s+(\w+)"),                                     # Python, Ruby
+    re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?(?:data\s+)?(?:class|interface|struct|enum|trait|module|object|type)\s+(\w+)"),
+    re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\*?\s+(\w+)"),  # JS/TS
+    re.compile(r"^\s*(?:export\s+)?(?:const|let|var)\s+(\w+)\s*=\s*(?:async\s+)?(?:function|\([^)]*\)\s*=>|\w+\s*=>)"),
+    re.compile(r"^\s*func\s+(?:\([^)]*\)\s*)?(\w+)"),                               # Go
+    re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?fn\s+(\w+)"),            # Rust
+    re.compile(r"^\s*(?:(?:public|private|protected|internal|static|final|abstract|override|suspend|synchronized)\s+)+[\w<>\[\],?]+\s+(\w+)\s*\("),  # Java/C#/Kotlin
+    re.compile(r"^\s*fun\s+(?:<[^>]*>\s*)?(?:[\w.]+\.)?(\w+)\s*\("),                  # Kotlin
+]
+
+IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]{2,}")
+QUOTED = re.compile(r"\"([^\"]{3,})\"|'([^']{3,})'|`([^`]{3,})`")
+CAMEL_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+# Words too common in issue text to be worth a query term
+STOP_WORDS = {
+    "the", "and", "for", "with", "this", "that", "from", "when", "error", "line", "file", "not",
+    "are", "was", "but", "have", "has", "after", "into", "returns", "return", "none", "null", "true", "false",
+    "self", "def", "class", "import", "function", "const", "var", "let", "traceback", "most", "recent", "call", "last",
+}
+
+# How much each kind of hit counts towards a file's score
+DEFINITION_WEIGHT = 5.0
+PATH_WEIGHT = 3.0
+TEXT_WEIGHT = 1.0
+MAX_LINE_HITS = 3
+
+
+def trigrams(text: str) -> Set[str]:
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def path_tokens(path: str) -> Set[str]:
+    """'src/authService/jwt_utils.py' -> {'src', 'authservice', 'auth', 'service', 'jwt', 'utils', 'py', ...}"""
+    tokens = set()
+    for part in re.split(r"[/._\-\s]+", path):
+        if not part:
+            continue
+        tokens.add(part.lower())
+        tokens.update(piece.lower() for piece in CAMEL_BOUNDARY.split(part) if piece)
+    return tokens
+
+
+def blob_sha(content: bytes) -> str:
+    """Git's object id for a blob, so tarball contents compare with mirror tree entries."""
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+def _skipped(path: str) -> bool:
+    return any(part in SKIPPED_DIRECTORIES for part in path.split("/")[:-1])
+
+
+def query_terms(query: str) -> List[str]:
+    """Quoted phrases and identifiers from an issue excerpt, error string or keyword list."""
+    terms = []
+    for match in QUOTED.finditer(query):
+        phrase = next(group for group in match.groups() if group)
+        if phrase.strip() and phrase not in terms:
+            terms.append(phrase.strip())
+    for identifier in IDENTIFIER.findall(QUOTED.sub(" ", query)):
+        if identifier.lower() not in STOP_WORDS and identifier not in terms:
+            terms.append(identifier)
+    return terms
+
+
+@dataclass
+class IndexedFile:
+    blob_sha: str
+    lines: List[str]
+    trigrams: Set[str]
+    symbols: List[Tuple[str, int]]
+    tokens: Set[str]
+
+
+@dataclass
+class RepoIndex:
+    """
+    Search index of one repository at one commit: trigram postings over file
+    contents, symbol definitions and path tokens. Files are keyed by blob
+    SHA, so moving to a new commit only re-reads the files that changed.
+    """
+
+    commit: Optional[str] = None
+    files: Dict[str, IndexedFile] = field(default_factory=dict)
+    trigram_postings: Dict[str, Set[str]] = field(default_factory=lambda: defaultdict(set))
+    symbol_postings: Dict[str, Set[str]] = field(default_factory=lambda: defaultdict(set))
+    token_postings: Dict[str, Set[str]] = field(default_factory=lambda: defaultdict(set))
+
+    def add(self, path: str, sha: str, content: bytes) -> None:
+        if b"\0" in content[:8192]:
+            return
+        text = content.decode("utf-8", "replace")
+        lines = text.splitlines()
+        symbols = []
+        for number, line in enumerate(lines, start=1):
+            for pattern in SYMBOL_PATTERNS:
+                match = pattern.match(line)
+                if match:
+                    symbols.append((match.group(1), number))
+                    break
+        self._insert(path, IndexedFile(blob_sha=sha, lines=lines, trigrams=trigrams(text), symbols=symbols, tokens=path_tokens(path)))
+
+    def _insert(self, path: str, entry: IndexedFile) -> None:
+        self.remove(path)
+        self.files[path] = entry
+        for gram in entry.trigrams:
+            self.trigram_postings[gram].add(path)
+        for name, _ in entry.symbols:
+            self.symbol_postings[name.lower()].add(path)
+        for token in entry.tokens:
+            self.token_postings[token].add(path)
+
+    def remove(self, path: str) -> None:
+        entry = self.files.pop(path, None)
+        if entry is None:
+            return
+        for postings, keys in (
+            (self.trigram_postings, entry.trigrams),
+            (self.symbol_postings, {name.lower() for name, _ in entry.symbols}),
+            (self.token_postings, entry.tokens),
+        ):
+            for key in keys:
+                postings[key].discard(path)
+                if not postings[key]:
+                    del postings[key]
+
+    def apply(self, commit: str, tree: Dict[str, str], read: Dict[str, bytes]) -> Tuple[int, int]:
+        """
+        Move the index to `commit`: `tree` maps every path to its blob SHA,
+        `read` holds the content of the blobs that were not indexed yet.
+        Returns (files added or changed, files removed).
+        """
+        # Renamed or copied files reuse the entry of the blob they already had
+        by_blob = {entry.blob_sha: entry for entry in self.files.values()}
+        removed = [path for path in self.files if path not in tree]
+        for path in removed:
+            self.remove(path)
+        changed = 0
+        for path, sha in tree.items():
+            if path in self.files and self.files[path].blob_sha == sha:
+                continue
+            if sha in read:
+                self.add(path, sha, read[sha])
+            elif sha in by_blob:
+                entry = by_blob[sha]
+                self._insert(path, IndexedFile(sha, entry.lines, entry.trigrams, entry.symbols, path_tokens(path)))
+            else:
+                continue
+            changed += 1
+        self.commit = commit
+        return changed, len(removed)
+
+    def _candidates(self, term: str) -> Set[str]:
+        grams = trigrams(term)
+        if not grams:
+            return set()
+        postings = sorted((self.trigram_postings.get(gram, set()) for gram in grams), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                break
+        return candidates
+
+    def search(self, terms: Iterable[str], limit: int = 10) -> List[dict]:
+        """
+        Rank files for `terms`: a definition of a term counts most, then a
+        term in the path, then occurrences in the text, each weighted by how
+        rare the term is across the repository.
+        """
+        total = max(1, len(self.files))
+        scores: Dict[str, float] = defaultdict(float)
+        hits: Dict[str, List[dict]] = defaultdict(list)
+
+        for term in terms:
+            lowered = term.lower()
+            text_files = self._candidates(lowered)
+            idf = math.log(1 + total / (1 + len(text_files)))
+
+            for path in self.symbol_postings.get(lowered, ()):
+                for name, number in self.files[path].symbols:
+                    if name.lower() == lowered:
+                        scores[path] += DEFINITION_WEIGHT * idf
+                        hits[path].append({"line": number, "kind": "definition", "term": term})
+
+            for path in self.token_postings.get(lowered, ()):
+                scores[path] += PATH_WEIGHT * idf
+
+            for path in text_files:
+                lines = self.files[path].lines
+                matched = [number for number, line in enumerate(lines, start=1) if lowered in line.lower()]
+                if not matched:
+                    continue
+                # Diminishing returns for a term repeated all over one file
+                scores[path] += TEXT_WEIGHT * idf * (1 + math.log(len(matched)))
+                hits[path].extend({"line": number, "kind": "match", "term": term} for number in matched[:MAX_LINE_HITS])
+
+        results = []
+        for path, score in sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]:
+            lines = self.files[path].lines
+            seen = set()
+            file_hits = []
+            # Definitions first, then the earliest matches
+            for hit in sorted(hits[path], key=lambda hit: (hit["kind"] != "definition", hit["line"])):
+                if hit["line"] in seen or len(file_hits) >= MAX_LINE_HITS:
+                    continue
+                seen.add(hit["line"])
+                file_hits.append(dict(hit, text=lines[hit["line"] - 1].strip()[:200]))
+            results.append({"path": path, "score": round(score, 2), "hits": file_hits})
+        return results
+
+
+class CodeIndexStore:
+    """Per-repository indexes, brought up to date with the requested commit before each search."""
+
+    def __init__(self, max_repos: int = MAX_REPOS):
+        self.max_repos = max_repos
+        self._indexes: "OrderedDict[Tuple[str, str], RepoIndex]" = OrderedDict()
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    async def _update_from_mirror(self, index: RepoIndex, owner: str, repo: str, ref: Optional[str]) -> None:
+        mirror = get_git_mirror()
+        commit = await mirror.resolve(owner, repo, ref)
+        if commit == index.commit:
+            return
+        tree = {
+            path: sha for path, sha, size in (await mirror.list_tree(owner, repo, commit))[:MAX_FILES]
+            if size <= MAX_FILE_BYTES and not _skipped(path)
+        }
+        known = {entry.blob_sha for entry in index.files.values()}
+        read = {sha: await mirror.read_blob(owner, repo, sha) for sha in set(tree.values()) - known}
+        self._record(index.apply(commit, tree, read))
+
+    async def _update_from_tarball(self, index: RepoIndex, owner: str, repo: str, ref: Optional[str], priority: int) -> None:
+        from github_agent.tools import get_github_token
+
+        token = get_github_token()
+        commit = await fetch_commit_sha(token, owner, repo, ref, priority=priority)
+        if commit == index.commit:
+            return
+        archive = await fetch_tarball(token, owner, repo, commit, priority=priority)
+
+        tree, read = {}, {}
+        with tarfile.open(fileobj=io.BytesIO(archive), mode="r:gz") as tar:
+            for member in tar:
+                if not member.isfile() or member.size > MAX_FILE_BYTES or len(tree) >= MAX_FILES:
+                    continue
+                # Members are prefixed with "<owner>-<repo>-<sha>/"
+                path = member.name.split("/", 1)[-1]
+                if _skipped(path):
+                    continue
+                content = tar.extractfile(member).read()
+                sha = blob_sha(content)
+                tree[path] = sha
+                read[sha] = content
+        self._record(index.apply(commit, tree, read))
+
+    @staticmethod
+    def _record(counts: Tuple[int, int]) -> None:
+        changed, removed = counts
+        metrics.increment("code_index_files_indexed_total", changed)
+        metrics.increment("code_index_files_removed_total", removed)
+
+    async def get(self, owner: str, repo: str, ref: Optional[str] = None, priority: int = 0) -> RepoIndex:
+        """The repository's index at `ref`, updated incrementally if the commit moved."""
+        key = (owner.lower(), repo.lower())
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            index = self._indexes.get(key) or RepoIndex()
+            self._indexes[key] = index
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_repos:
+                self._indexes.popitem(last=False)
+
+            mirror = get_git_mirror()
+            if mirror is not None:
+                try:
+                    await self._update_from_mirror(index, owner, repo, ref)
+                    return index
+                except GitMirrorError as e:
+                    print(f"⚠️ git mirror could not index {owner}/{repo}, downloading the tarball: {e}")
+            await self._update_from_tarball(index, owner, repo, ref, priority)
+            return index
+
+
+code_indexes = CodeIndexStore()
+
+
+async def search_code_local(owner: str, repo: str, query: str, tool_context: "ToolContext", ref: Optional[str] = None, limit: int = 10) -> dict:
+    """
+    Search the code of a repository for the identifiers and error strings of an issue.
+
+    Ranks files by where the query terms are defined (functions, classes),
+    whether they appear in the file path, and how often they occur in the
+    text, and returns the best files with the matching line numbers.
+
+    Args:
+        owner: Repository owner.
+        repo: Repository name.
+        query: Identifiers, file names and error strings from the issue; quote exact phrases, e.g. verify_token "Invalid token".
+        ref: Branch, tag or commit SHA to search (default branch if omitted).
+        limit: Maximum number of files to return.
+
+    Returns:
+        {"commit": sha, "terms": [...], "results": [{"path", "score", "hits": [{"line", "kind", "term", "text"}]}]}
+    """
+    terms = query_terms(query)
+    if not terms:
+        return {"error": "The query has no identifiers or quoted phrases to search for"}
+
+    priority = stage_priority(tool_context.agent_name if tool_context is not None else None)
+    try:
+        index = await code_indexes.get(owner, repo, ref, priority=priority)
+    except Exception as e:
+        return {"error": f"Could not index {owner}/{repo}: {e}"}
+
+    results = index.search(terms, limit=max(1, min(int(limit), 50)))
+    metrics.increment("code_search_total", outcome="hit" if results else "empty")
+    return {"commit": index.commit, "terms": terms, "results": results}
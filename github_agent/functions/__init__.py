@@ -1 +1 @@
-from .main import call_agent
+from .main import call_agent, process_event, parse_agent_json, stream_agent, render_stream
@@ -1,14 +1,31 @@
-from google.adk.runners import Runner
-from google.adk.events import Event
-from google.genai import types
+import json
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Optional
 
+from github_agent.agent_output import JSON_OUTPUT_AGENTS, IncrementalJSONParser, loads_agent_json
+from github_agent.schemas import AgentStreamEvent
 
-from google.adk.runners import Runner
-from google.adk.events import Event
-from google.genai import types
+if TYPE_CHECKING:
+    from google.adk.runners import Runner
+    from google.adk.events import Event
 
 
-async def process_event(event: Event):
+# Short labels for the pipeline stages shown while streaming
+STAGE_LABELS = {
+    "orchestrator_agent": "orchestrator",
+    "chain_agent": "chain",
+    "issue_reader_agent": "reader",
+    "repo_navigator_agent": "navigator",
+    "code_fix_agent": "fixer",
+    "summary_agent_agent": "summary",
+}
+
+def parse_agent_json(value):
+    """Turn an agent's JSON output stored in session state into a dict, repairing common model mistakes."""
+    return loads_agent_json(value)
+
+
+async def process_event(event: "Event"):
     # Handle None content
     if event.content is None:
         return None
@@ -30,7 +47,9 @@ async def process_event(event: Event):
     return None
 
 
-async def call_agent(runner: Runner, user_id: str, session_id: str, query: str):
+async def call_agent(runner: "Runner", user_id: str, session_id: str, query: str):
+    from google.genai import types
+
     content = types.Content(role="user", parts=[types.Part(text=query)])
     final_response = None
 
@@ -50,3 +69,102 @@ async def call_agent(runner: Runner, user_id: str, session_id: str, query: str):
         final_response = f"Error: {str(e)}"
 
     return final_response
+
+
+async def stream_agent(runner: "Runner", user_id: str, session_id: str, query: str) -> AsyncIterator[AgentStreamEvent]:
+    """
+    Run the agent and yield progress as it happens: stage transitions,
+    partial model text, output fields as soon as they are complete, tool
+    call start/end and the final response of each stage.
+    """
+    from google.adk.agents.run_config import RunConfig, StreamingMode
+    from google.genai import types
+
+    content = types.Content(role="user", parts=[types.Part(text=query)])
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE)
+    started = time.monotonic()
+    tool_started = {}
+    current_author = None
+    parsers = {}
+
+    async for event in runner.run_async(
+        user_id=user_id, session_id=session_id, new_message=content, run_config=run_config
+    ):
+        author = event.author
+        stage = STAGE_LABELS.get(author, author)
+
+        if author != "user" and author != current_author:
+            current_author = author
+            yield AgentStreamEvent(type="stage", author=author, stage=stage, elapsed=time.monotonic() - started)
+
+        for call in event.get_function_calls():
+            tool_started[call.id or call.name] = time.monotonic()
+            yield AgentStreamEvent(type="tool_start", author=author, stage=stage, tool_name=call.name, tool_args=call.args)
+
+        for response in event.get_function_responses():
+            call_started = tool_started.pop(response.id or response.name, None)
+            yield AgentStreamEvent(
+                type="tool_end",
+                author=author,
+                stage=stage,
+                tool_name=response.name,
+                elapsed=time.monotonic() - call_started if call_started else None,
+            )
+
+        if event.partial:
+            if event.content and event.content.parts:
+                text = "".join(part.text or "" for part in event.content.parts if not part.thought)
+                if text:
+                    yield AgentStreamEvent(type="text", author=author, stage=stage, text=text)
+                    if author in JSON_OUTPUT_AGENTS:
+                        parser = parsers.setdefault(author, IncrementalJSONParser())
+                        for field, value in parser.feed(text).items():
+                            yield AgentStreamEvent(type="field", author=author, stage=stage, field=field, value=value)
+            continue
+
+        # The aggregated response ends this model turn
+        parsers.pop(author, None)
+
+        resp = await process_event(event)
+        if resp:
+            yield AgentStreamEvent(type="final", author=author, stage=stage, text=resp, elapsed=time.monotonic() - started)
+
+
+async def render_stream(events: AsyncIterator[AgentStreamEvent]) -> Optional[str]:
+    """Print streamed agent events to the terminal and return the last final response."""
+    final_response = None
+    streamed_text = False
+
+    try:
+        async for event in events:
+            if event.type == "stage":
+                if streamed_text:
+                    print()
+                    streamed_text = False
+                print(f"\n▶ {event.stage} [{event.elapsed:.1f}s]")
+            elif event.type == "tool_start":
+                args = json.dumps(event.tool_args or {}, default=str)
+                print(f"  🔧 {event.tool_name}({args[:120]}{'…' if len(args) > 120 else ''})")
+            elif event.type == "tool_end":
+                took = f" ({event.elapsed:.2f}s)" if event.elapsed is not None else ""
+                print(f"  ✓ {event.tool_name}{took}")
+            elif event.type == "text":
+                print(event.text, end="", flush=True)
+                streamed_text = True
+            elif event.type == "field" and isinstance(event.value, (str, int, float)) and len(str(event.value)) <= 80:
+                # Short fields (target_file, issue_number, ...) as soon as they are known
+                print(f"\n  • {event.field}: {event.value}", flush=True)
+            elif event.type == "final":
+                # Text already streamed in chunks is not printed twice
+                if not streamed_text:
+                    print(event.text)
+                else:
+                    print()
+                streamed_text = False
+                final_response = event.text
+
+    except Exception as e:
+        print(f"\nError during agent execution: {e}")
+        final_response = f"Error: {str(e)}"
+
+    return final_response
@@ -0,0 +1 @@
+from .main import GitMirror, GitMirrorError, MIRROR_TOOLS, get_git_mirror, close_git_mirror
@@ -0,0 +1,361 @@
+import asyncio
+import base64
+import inspect
+import json
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from github_agent.metrics import metrics
+
+
+# Repository tools the mirror can answer from local disk
+MIRROR_TOOLS = {"get_file_contents", "list_commits", "get_commit"}
+
+DEFAULT_REMOTE = "https://github.com/{owner}/{repo}.git"
+
+# A mirror is fetched again when a branch read finds it older than this (seconds)
+DEFAULT_FETCH_INTERVAL = 60.0
+
+COMMIT_SHA_PATTERN = re.compile(r"^[0-9a-fA-F]{7,40}$")
+NAME_PATTERN = re.compile(r"^[\w.-]+$")
+
+# git log fields, separated by unit separators, one record per record separator
+LOG_FORMAT = "%H%x1f%an%x1f%ae%x1f%aI%x1f%cn%x1f%ce%x1f%cI%x1f%P%x1f%B%x1e"
+
+NAME_STATUS = {"A": "added", "M": "modified", "D": "removed", "R": "renamed", "C": "copied", "T": "changed"}
+
+
+class GitMirrorError(Exception):
+    """Raised when a mirror cannot be cloned, fetched or read."""
+
+
+class ObjectNotFound(GitMirrorError):
+    """Raised when a ref, commit or path does not exist in the mirror."""
+
+
+async def _git(*args: str, cwd: Optional[str] = None, auth_header: Optional[str] = None) -> bytes:
+    command = ["git"]
+    if auth_header:
+        # Passed per command so the token is never written to the mirror's config
+        command += ["-c", f"http.extraHeader={auth_header}"]
+    process = await asyncio.create_subprocess_exec(
+        *command, *args,
+        cwd=cwd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+    )
+    stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise GitMirrorError(f"git {args[0]} failed: {stderr.decode('utf-8', 'replace').strip()}")
+    return stdout
+
+
+class _CatFile:
+    """A long-running `git cat-file --batch` process: object reads without a process spawn each."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._lock = asyncio.Lock()
+
+    async def read(self, name: str) -> Tuple[str, str, bytes]:
+        """Return (object sha, type, content) for `name` ("<rev>:<path>", a sha, ...)."""
+        async with self._lock:
+            if self._process is None or self._process.returncode is not None:
+                self._process = await asyncio.create_subprocess_exec(
+                    "git", "cat-file", "--batch",
+                    cwd=self.path,
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.DEVNULL,
+                )
+            process = self._process
+            try:
+                process.stdin.write(name.encode("utf-8") + b"\n")
+                await process.stdin.drain()
+
+                header = (await process.stdout.readline()).decode("utf-8").split()
+                content = await process.stdout.readexactly(int(header[2]) + 1) if len(header) == 3 else None
+            except BaseException:
+                # A read cut short (cancelled by a timeout, or failed) leaves output in the
+                # pipe that the next read would take for its header; start over instead
+                self._discard()
+                raise
+
+            if content is None:
+                raise ObjectNotFound(f"{name} not found")
+            return header[0], header[1], content[:-1]
+
+    def _discard(self) -> None:
+        if self._process is not None and self._process.returncode is None:
+            self._process.kill()
+        self._process = None
+
+    async def close(self) -> None:
+        async with self._lock:
+            if self._process is not None and self._process.returncode is None:
+                self._process.stdin.close()
+                await self._process.wait()
+            self._process = None
+
+
+class GitMirror:
+    """
+    Bare mirror clones of GitHub repositories under `cache_dir`, used to
+    answer repository reads from local disk.
+
+    A repo is cloned with `git clone --mirror` on first use and brought up to
+    date with an incremental `git fetch` when a branch read finds it older
+    than `fetch_interval`, or when a requested commit is not there yet.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        remote: str = DEFAULT_REMOTE,
+        fetch_interval: float = DEFAULT_FETCH_INTERVAL,
+        token: Optional[str] = None,
+    ):
+        self.cache_dir = cache_dir
+        self.remote = remote
+        self.fetch_interval = fetch_interval
+        self.token = token
+        self._fetched_at: Dict[Tuple[str, str], float] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._cat_files: Dict[Tuple[str, str], _CatFile] = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, owner: str, repo: str) -> str:
+        if not NAME_PATTERN.match(owner) or not NAME_PATTERN.match(repo) or ".." in (owner + repo):
+            raise GitMirrorError(f"Invalid repository name {owner}/{repo}")
+        return os.path.join(self.cache_dir, owner.lower(), f"{repo.lower()}.git")
+
+    def _auth_header(self) -> Optional[str]:
+        if not self.token or not self.remote.startswith("https://"):
+            return None
+        credentials = base64.b64encode(f"x-access-token:{self.token}".encode("utf-8")).decode("ascii")
+        return f"Authorization: Basic {credentials}"
+
+    async def sync(self, owner: str, repo: str, force: bool = False) -> str:
+        """Clone or fetch the mirror if it is missing or stale; returns its path."""
+        key = (owner.lower(), repo.lower())
+        path = self._path(owner, repo)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+
+        async with lock:
+            fetched_at = self._fetched_at.get(key)
+            if not force and fetched_at is not None and time.monotonic() - fetched_at < self.fetch_interval:
+                return path
+
+            started = time.monotonic()
+            if os.path.isdir(path):
+                await _git("fetch", "--prune", "--quiet", "origin", cwd=path, auth_header=self._auth_header())
+                operation = "fetch"
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                remote = self.remote.format(owner=owner, repo=repo)
+                await _git("clone", "--mirror", "--quiet", remote, path, auth_header=self._auth_header())
+                operation = "clone"
+
+            self._fetched_at[key] = time.monotonic()
+            metrics.observe("git_mirror_sync_seconds", time.monotonic() - started, operation=operation)
+            # Refs moved; a fresh cat-file process sees them
+            cat_file = self._cat_files.pop(key, None)
+            if cat_file is not None:
+                await cat_file.close()
+            return path
+
+    async def _read(self, owner: str, repo: str, name: str, pinned: bool) -> Tuple[str, str, bytes]:
+        path = await self.sync(owner, repo)
+        key = (owner.lower(), repo.lower())
+        try:
+            return await self._cat_files.setdefault(key, _CatFile(path)).read(name)
+        except ObjectNotFound:
+            if not pinned:
+                raise
+        # A commit newer than the last fetch
+        path = await self.sync(owner, repo, force=True)
+        return await self._cat_files.setdefault(key, _CatFile(path)).read(name)
+
+    @staticmethod
+    def _rev(ref: Optional[str]) -> str:
+        # Refs come from the model; one starting with "-" would be parsed as a git option
+        if ref and ref.startswith("-"):
+            raise GitMirrorError(f"Invalid ref {ref!r}")
+        return ref or "HEAD"
+
+    async def get_file_contents(self, owner: str, repo: str, path: str = "/", ref: Optional[str] = None, sha: Optional[str] = None) -> str:
+        """File content as text, or a JSON directory listing, as the MCP tool returns them."""
+        rev = self._rev(sha or ref)
+        relative = path.strip("/")
+        pinned = bool(COMMIT_SHA_PATTERN.match(rev))
+        object_sha, object_type, content = await self._read(owner, repo, f"{rev}:{relative}", pinned)
+
+        if object_type == "blob":
+            return content.decode("utf-8", "replace")
+
+        listing = await _git("ls-tree", "-l", object_sha, cwd=self._path(owner, repo))
+        entries = []
+        for line in listing.decode("utf-8", "replace").splitlines():
+            meta, name = line.split("\t", 1)
+            _, entry_type, entry_sha, size = meta.split()
+            entries.append({
+                "type": "dir" if entry_type == "tree" else "file",
+                "name": name,
+                "path": f"{relative}/{name}" if relative else name,
+                "sha": entry_sha,
+                "size": int(size) if size.isdigit() else 0,
+            })
+        return json.dumps(entries)
+
+    async def list_commits(
+        self,
+        owner: str,
+        repo: str,
+        sha: Optional[str] = None,
+        author: Optional[str] = None,
+        page: int = 1,
+        perPage: int = 30,
+        path: Optional[str] = None,
+    ) -> str:
+        rev = self._rev(sha)
+        mirror = await self.sync(owner, repo)
+        args = ["log", f"--format={LOG_FORMAT}", f"--skip={(max(page, 1) - 1) * perPage}", f"--max-count={perPage}"]
+        if author:
+            args.append(f"--author={author}")
+        args += [rev, "--"]
+        if path:
+            args.append(path)
+
+        try:
+            output = await _git(*args, cwd=mirror)
+        except GitMirrorError as e:
+            raise ObjectNotFound(str(e)) from e
+        return json.dumps([self._commit(record) for record in output.decode("utf-8", "replace").split("\x1e") if record.strip()])
+
+    @staticmethod
+    def _commit(record: str) -> dict:
+        sha, author, author_email, author_date, committer, committer_email, committer_date, parents, message = \
+            record.strip("\n").split("\x1f", 8)
+        return {
+            "sha": sha,
+            "commit": {
+                "message": message.strip(),
+                "author": {"name": author, "email": author_email, "date": author_date},
+                "committer": {"name": committer, "email": committer_email, "date": committer_date},
+            },
+            "parents": [{"sha": parent} for parent in parents.split()],
+        }
+
+    async def get_commit(self, owner: str, repo: str, sha: str, include_diff: bool = True) -> str:
+        # Resolve first so a commit pushed after the last fetch triggers one
+        commit_sha, object_type, _ = await self._read(owner, repo, sha, pinned=bool(COMMIT_SHA_PATTERN.match(sha)))
+        if object_type != "commit":
+            raise ObjectNotFound(f"{sha} is not a commit")
+        mirror = self._path(owner, repo)
+
+        record = await _git("show", "-s", f"--format={LOG_FORMAT}", commit_sha, cwd=mirror)
+        commit = self._commit(record.decode("utf-8", "replace").split("\x1e")[0])
+
+        statuses = await _git("diff-tree", "--root", "-r", "-M", "--no-commit-id", "--name-status", commit_sha, cwd=mirror)
+        numstat = await _git("diff-tree", "--root", "-r", "-M", "--no-commit-id", "--numstat", commit_sha, cwd=mirror)
+        files: List[dict] = []
+        for status_line, count_line in zip(
+            statuses.decode("utf-8", "replace").splitlines(), numstat.decode("utf-8", "replace").splitlines()
+        ):
+            status, *names = status_line.split("\t")
+            additions, deletions, _ = count_line.split("\t", 2)
+            additions = int(additions) if additions.isdigit() else 0
+            deletions = int(deletions) if deletions.isdigit() else 0
+            entry = {
+                "filename": names[-1],
+                "status": NAME_STATUS.get(status[0], "modified"),
+                "additions": additions,
+                "deletions": deletions,
+                "changes": additions + deletions,
+            }
+            if len(names) > 1:
+                entry["previous_filename"] = names[0]
+            files.append(entry)
+
+        if include_diff and files:
+            patch = await _git("diff-tree", "--root", "-r", "-M", "--no-commit-id", "-p", commit_sha, cwd=mirror)
+            chunks = re.split(r"^diff --git .*$\n", patch.decode("utf-8", "replace"), flags=re.M)[1:]
+            for entry, chunk in zip(files, chunks):
+                # Drop the index/---/+++ header lines, keep the hunks
+                hunk_start = chunk.find("@@")
+                if hunk_start != -1:
+                    entry["patch"] = chunk[hunk_start:]
+
+        commit["files"] = files
+        commit["stats"] = {
+            "additions": sum(entry["additions"] for entry in files),
+            "deletions": sum(entry["deletions"] for entry in files),
+            "total": sum(entry["changes"] for entry in files),
+        }
+        return json.dumps(commit)
+
+    async def resolve(self, owner: str, repo: str, ref: Optional[str] = None) -> str:
+        """Commit SHA that `ref` (default: HEAD) points to in the mirror."""
+        rev = self._rev(ref)
+        sha, _, _ = await self._read(owner, repo, f"{rev}^{{commit}}", pinned=bool(COMMIT_SHA_PATTERN.match(rev)))
+        return sha
+
+    async def list_tree(self, owner: str, repo: str, sha: str) -> List[Tuple[str, str, int]]:
+        """(path, blob sha, size) of every file in commit `sha`."""
+        output = await _git("ls-tree", "-r", "-l", "--full-tree", sha, cwd=await self.sync(owner, repo))
+        files = []
+        for line in output.decode("utf-8", "replace").splitlines():
+            meta, path = line.split("\t", 1)
+            _, entry_type, blob_sha, size = meta.split()
+            if entry_type == "blob":
+                files.append((path, blob_sha, int(size) if size.isdigit() else 0))
+        return files
+
+    async def read_blob(self, owner: str, repo: str, blob_sha: str) -> bytes:
+        _, _, content = await self._read(owner, repo, blob_sha, pinned=True)
+        return content
+
+    async def call(self, tool_name: str, args: dict) -> str:
+        """Run one of MIRROR_TOOLS with MCP-style arguments."""
+        if tool_name not in MIRROR_TOOLS:
+            raise GitMirrorError(f"{tool_name} is not served by the git mirror")
+        method = getattr(self, tool_name)
+        parameters = inspect.signature(method).parameters
+        unsupported = set(args) - set(parameters)
+        if unsupported:
+            raise GitMirrorError(f"{tool_name} arguments not supported by the git mirror: {sorted(unsupported)}")
+        return await method(**args)
+
+    async def close(self) -> None:
+        for cat_file in self._cat_files.values():
+            await cat_file.close()
+        self._cat_files = {}
+
+
+_mirror: Optional[GitMirror] = None
+
+
+def get_git_mirror() -> Optional[GitMirror]:
+    """The process-wide mirror backend, or None unless GIT_MIRROR_DIR is set."""
+    global _mirror
+    cache_dir = os.getenv("GIT_MIRROR_DIR")
+    if not cache_dir:
+        return None
+    if _mirror is None or _mirror.cache_dir != cache_dir:
+        _mirror = GitMirror(
+            cache_dir,
+            remote=os.getenv("GIT_MIRROR_REMOTE", DEFAULT_REMOTE),
+            fetch_interval=float(os.getenv("GIT_MIRROR_FETCH_INTERVAL", DEFAULT_FETCH_INTERVAL)),
+            token=os.getenv("GITHUB_PERSONAL_ACCESS_TOKEN"),
+        )
+    return _mirror
+
+
+async def close_git_mirror() -> None:
+    """Stop the mirror's cat-file processes, if the backend was ever used."""
+    if _mirror is not None:
+        await _mirror.close()
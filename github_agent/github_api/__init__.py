@@ -0,0 +1 @@
+from .main import get_http_client, close_http_client, github_request, fetch_authenticated_user, fetch_issue, fetch_commit_sha, fetch_tarball, fetch_path_commits
@@ -0,0 +1,199 @@
+import asyncio
+import importlib.util
+import os
+import time
+from typing import Optional
+
+import httpx
+
+from github_agent.metrics import metrics
+from github_agent.rate_limit import backoff_delay, get_limiter, RETRYABLE_STATUS_CODES
+
+
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+
+# How long a /user lookup is trusted before it is revalidated with its ETag
+OWNER_CACHE_TTL = 600.0
+
+# Attempts per REST request before the last response is returned as is
+GITHUB_MAX_ATTEMPTS = 5
+
+# HTTP/2 needs the optional `h2` package (pip install "httpx[http2]")
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# token -> {"login", "etag", "fetched_at"}
+_owner_cache: dict = {}
+_owner_lock: Optional[asyncio.Lock] = None
+_owner_lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Process-wide pooled client for api.github.com, with keep-alive and HTTP/2."""
+    global _client, _client_loop
+
+    loop = asyncio.get_running_loop()
+    # Pooled connections belong to the loop that opened them
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            base_url=GITHUB_API_URL,
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(30.0, connect=10.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0),
+            headers={"Accept": "application/vnd.github+json"},
+        )
+        _client_loop = loop
+    return _client
+
+
+def _get_owner_lock() -> asyncio.Lock:
+    """Lock serializing /user lookups, recreated for each event loop like the client."""
+    global _owner_lock, _owner_lock_loop
+
+    loop = asyncio.get_running_loop()
+    if _owner_lock is None or _owner_lock_loop is not loop:
+        _owner_lock = asyncio.Lock()
+        _owner_lock_loop = loop
+    return _owner_lock
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+
+def _is_rate_limited(response: httpx.Response) -> bool:
+    """Primary (403 with no remaining quota) or secondary (429, or 403 with Retry-After or a rate limit message) limit."""
+    if response.status_code == 429:
+        return True
+    if response.status_code != 403:
+        return False
+    if response.headers.get("x-ratelimit-remaining") == "0" or "retry-after" in response.headers:
+        return True
+    return "rate limit" in response.text.lower()
+
+
+async def github_request(method: str, url: str, priority: int = 0, **kwargs) -> httpx.Response:
+    """
+    Send a REST request through the shared "github" rate limiter.
+
+    Every response feeds its X-RateLimit-* / Retry-After headers back into the
+    limiter (which MCP calls share). Rate-limited answers also slow the
+    limiter down. Rate-limited and 5xx answers are retried after the
+    server-announced pause, or with capped, jittered backoff when there is
+    none.
+    """
+    client = get_http_client()
+    limiter = get_limiter("github")
+
+    for attempt in range(GITHUB_MAX_ATTEMPTS):
+        await limiter.acquire(priority)
+        response = await client.request(method, url, **kwargs)
+        paused = limiter.update_from_headers(response.headers)
+
+        rate_limited = _is_rate_limited(response)
+        if not rate_limited and response.status_code not in RETRYABLE_STATUS_CODES:
+            limiter.reward()
+            return response
+        if rate_limited:
+            limiter.penalize()
+        if attempt == GITHUB_MAX_ATTEMPTS - 1:
+            break
+
+        reason = "rate_limited" if rate_limited else str(response.status_code)
+        metrics.increment("rate_limit_retries_total", resource="github", reason=reason)
+        # Headers that paused the limiter already delay the next acquire; otherwise back off
+        if not paused:
+            await asyncio.sleep(backoff_delay(attempt))
+
+    return response
+
+
+async def fetch_authenticated_user(token: str) -> str:
+    """
+    Return the login of the user owning `token`.
+
+    The result is memoized for OWNER_CACHE_TTL seconds; after that it is
+    revalidated with If-None-Match, and a 304 answer (which GitHub does not
+    count against the rate limit) keeps the cached login.
+    """
+    async with _get_owner_lock():
+        cached = _owner_cache.get(token)
+        if cached and time.monotonic() - cached["fetched_at"] < OWNER_CACHE_TTL:
+            return cached["login"]
+
+        headers = {"Authorization": f"Bearer {token}"}
+        if cached and cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+
+        r = await github_request("GET", "/user", headers=headers)
+        if r.status_code == 304 and cached:
+            cached["fetched_at"] = time.monotonic()
+            return cached["login"]
+
+        r.raise_for_status()
+        login = r.json()["login"]
+        _owner_cache[token] = {
+            "login": login,
+            "etag": r.headers.get("ETag"),
+            "fetched_at": time.monotonic(),
+        }
+        return login
+
+
+async def fetch_issue(token: str, owner: str, repo: str, issue_number: str, priority: int = 0) -> dict:
+    """Fetch a single issue (title, body, labels, ...) from the REST API."""
+    r = await github_request(
+        "GET",
+        f"/repos/{owner}/{repo}/issues/{issue_number}",
+        priority=priority,
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    r.raise_for_status()
+    return r.json()
+
+
+async def fetch_commit_sha(token: str, owner: str, repo: str, ref: Optional[str] = None, priority: int = 0) -> str:
+    """Resolve a branch, tag or short SHA (default: the default branch) to a commit SHA."""
+    r = await github_request(
+        "GET",
+        f"/repos/{owner}/{repo}/commits/{ref or 'HEAD'}",
+        priority=priority,
+        headers={"Authorization": f"Bearer {token}", "Accept": "application/vnd.github.sha"},
+    )
+    r.raise_for_status()
+    return r.text.strip()
+
+
+async def fetch_tarball(token: str, owner: str, repo: str, sha: str, priority: int = 0) -> bytes:
+    """The whole tree of commit `sha` as a gzipped tarball, in one request."""
+    r = await github_request(
+        "GET",
+        f"/repos/{owner}/{repo}/tarball/{sha}",
+        priority=priority,
+        headers={"Authorization": f"Bearer {token}"},
+        follow_redirects=True,
+        timeout=httpx.Timeout(120.0, connect=10.0),
+    )
+    r.raise_for_status()
+    return r.content
+
+
+async def fetch_path_commits(token: str, owner: str, repo: str, path: str, since: Optional[str] = None, per_page: int = 30, priority: int = 0) -> list:
+    """Commits on the default branch that touched `path`, newest first (since an ISO 8601 time, if given)."""
+    params = {"path": path, "per_page": per_page}
+    if since:
+        params["since"] = since
+    r = await github_request(
+        "GET",
+        f"/repos/{owner}/{repo}/commits",
+        priority=priority,
+        headers={"Authorization": f"Bearer {token}"},
+        params=params,
+    )
+    r.raise_for_status()
+    return r.json()
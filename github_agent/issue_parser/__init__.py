@@ -0,0 +1 @@
+from .main import extract_issue_details, parse_issue_request, preparse_issue_callback
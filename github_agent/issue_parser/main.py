@@ -0,0 +1,235 @@
+import os
+import re
+from typing import TYPE_CHECKING, List, Optional
+
+from github_agent.github_api import fetch_issue
+from github_agent.metrics import metrics, stop_stage_timer
+from github_agent.rate_limit import stage_priority
+from github_agent.schemas import IssueReaderAgentOutput
+from github_agent.sessions import record_completed_stage
+
+if TYPE_CHECKING:
+    from google.adk.agents.callback_context import CallbackContext
+    from google.genai import types
+
+
+# Below this score the issue is handed to issue_reader_agent as before
+MIN_CONFIDENCE = float(os.getenv("ISSUE_PREPARSE_MIN_CONFIDENCE", "0.8"))
+
+SOURCE_EXTENSIONS = (
+    "py", "js", "jsx", "mjs", "cjs", "ts", "tsx", "java", "kt", "go", "rb", "rs",
+    "c", "cc", "cpp", "h", "hpp", "cs", "php", "swift", "scala",
+)
+
+# File "app/auth.py", line 42, in login
+PYTHON_FRAME = re.compile(r'^\s*File "(?P<path>[^"]+)", line (?P<line>\d+)(?:, in (?P<func>\S+))?', re.M)
+# at login (src/auth.js:42:7)   /   at src/auth.js:42:7
+JS_FRAME = re.compile(r"^\s*at (?:(?P<func>[^\s(]+) \()?(?P<path>[^\s()]+?\.[cm]?[jt]sx?):(?P<line>\d+)(?::\d+)?\)?\s*$", re.M)
+# at com.example.auth.Login.check(Login.java:42)   /   at java.base/java.lang.Thread.run(Thread.java:833)
+JAVA_FRAME = re.compile(r"^\s*at (?:[\w.]+/)?(?P<qualified>[\w$.]+)\.(?P<func>[\w$<>]+)\((?P<file>\w+\.(?:java|kt|scala)):(?P<line>\d+)\)", re.M)
+
+# Bare references in prose such as `src/auth.py:42` or `see utils/date.ts line 7`
+FILE_LINE_REF = re.compile(
+    r"(?<![\w/.-])(?P<path>(?:[\w.-]+/)*[\w.-]+\.(?:" + "|".join(SOURCE_EXTENSIONS) + r"))"
+    r"(?::(?P<line>\d+)|,? line (?P<line2>\d+))?(?![\w/])"
+)
+
+# ValueError: bad input / java.lang.NullPointerException: x / TypeError: y is undefined
+ERROR_LINE = re.compile(
+    r"^\s*(?:Exception in thread \"[^\"]*\" )?"
+    r"(?P<error>(?:[a-z_][\w]*\.)*[A-Z]\w*(?:Error|Exception|Fault|Warning)(?::[^\n]*)?)\s*$",
+    re.M,
+)
+FENCED_BLOCK = re.compile(r"```[\w+-]*\n(.*?)```", re.S)
+
+# Frames from installed packages and runtimes are never the file to fix
+VENDOR_MARKERS = ("site-packages/", "dist-packages/", "node_modules/", "/lib/python", "node:internal", "<")
+VENDOR_JAVA_PACKAGES = ("java.", "javax.", "jdk.", "sun.", "kotlin.", "scala.", "org.junit.")
+
+# /home/alice/proj/app.py, ~/proj/app.py, C:/proj/app.py (backslashes already turned into /), file:///proj/app.js
+ABSOLUTE_PATH = re.compile(r"^(?:file://)?(?:[A-Za-z]:/|/|~/)")
+
+ISSUE_REF = re.compile(r"(?P<owner>[\w.-]+)/(?P<repo>[\w.-]+)#(?P<number>\d+)")
+OWNER_FIELD = re.compile(r"\bowner:\s*(?P<owner>[\w.-]+)", re.I)
+REPO_FIELD = re.compile(r"\brepo(?:sitory)?[:\s]+(?:(?P<owner>[\w.-]+)/)?(?P<repo>[\w.-]+)", re.I)
+ISSUE_NUMBER = re.compile(r"(?:#|\bissue\s+(?:number\s+)?#?)(?P<number>\d+)", re.I)
+
+
+def _is_vendor_path(path: str) -> bool:
+    return any(marker in path.replace("\\", "/") for marker in VENDOR_MARKERS)
+
+
+def _repo_relative(path: str, repo: Optional[str]) -> Optional[str]:
+    """
+    A frame's path relative to the repository root. Absolute paths from the
+    reporter's machine are cut after the last directory named like the
+    repository; without one they cannot be placed in the repo and give None.
+    """
+    path = path.replace("\\", "/")
+    if not ABSOLUTE_PATH.match(path):
+        return path[2:] if path.startswith("./") else path
+    directories = [part.lower() for part in path.split("/")[:-1]]
+    if not repo or repo.lower() not in directories:
+        return None
+    root = len(directories) - 1 - directories[::-1].index(repo.lower())
+    return "/".join(path.split("/")[root + 1:])
+
+
+def _add(items: List[str], value: str) -> None:
+    value = value.strip()
+    if value and value not in items:
+        items.append(value)
+
+
+def extract_issue_details(title: str, body: str, repo: Optional[str] = None) -> dict:
+    """
+    Deterministically pull referenced files and error messages out of an
+    issue, from Python/JS/Java stack traces, file:line references and fenced
+    error blocks. Absolute frame paths are made relative to `repo`, the
+    repository name, or dropped when they do not contain it.
+
+    Returns {"referenced_files", "error_messages", "frames", "confidence"}.
+    Confidence is high only when the issue carries both an error and an
+    in-repo stack frame, which is what the navigator needs.
+    """
+    text = f"{title}\n{body or ''}"
+    files: List[str] = []
+    errors: List[str] = []
+    frames = 0
+
+    for pattern in (PYTHON_FRAME, JS_FRAME):
+        for match in pattern.finditer(text):
+            path = None if _is_vendor_path(match["path"]) else _repo_relative(match["path"], repo)
+            if path:
+                _add(files, path)
+                frames += 1
+
+    for match in JAVA_FRAME.finditer(text):
+        qualified = match["qualified"]
+        if qualified.startswith(VENDOR_JAVA_PACKAGES):
+            continue
+        # com.example.auth.Login -> com/example/auth/Login.java
+        package = qualified.rsplit(".", 1)[0] if "." in qualified else ""
+        path = (package.replace(".", "/") + "/" if package else "") + match["file"]
+        _add(files, path)
+        frames += 1
+
+    # Frames were handled above; vendor frames must not come back as bare references
+    prose = text
+    for pattern in (PYTHON_FRAME, JS_FRAME, JAVA_FRAME):
+        prose = pattern.sub("", prose)
+
+    for match in FILE_LINE_REF.finditer(prose):
+        path = match["path"]
+        if _is_vendor_path(path) or any(existing.endswith(path) for existing in files):
+            continue
+        # A bare name like "setup.py" only counts with a line number or a directory
+        if "/" in path or match["line"] or match["line2"]:
+            _add(files, path)
+
+    fenced_errors = 0
+    for block in FENCED_BLOCK.findall(text):
+        for match in ERROR_LINE.finditer(block):
+            _add(errors, match["error"])
+            fenced_errors += 1
+    for match in ERROR_LINE.finditer(text):
+        _add(errors, match["error"])
+
+    # Only a stack trace locates the error in the repository; files named in prose
+    # plus an error line stay below MIN_CONFIDENCE and go to the model
+    confidence = 0.0
+    if frames:
+        confidence += 0.6
+    elif files:
+        confidence += 0.3
+    if errors:
+        confidence += 0.3
+    if fenced_errors:
+        confidence += 0.1
+    confidence = min(confidence, 1.0)
+
+    return {
+        "referenced_files": files,
+        "error_messages": errors,
+        "frames": frames,
+        "confidence": round(confidence, 2),
+    }
+
+
+def parse_issue_request(text: str, default_owner: Optional[str] = None) -> Optional[dict]:
+    """
+    Find owner, repo and issue number in a chain request such as
+    "owner: X, repo: Y, task: fix issue #3" or "X/Y#3". Returns None if any is missing.
+    """
+    match = ISSUE_REF.search(text)
+    if match:
+        return match.groupdict()
+
+    repo_match = REPO_FIELD.search(text)
+    number_match = ISSUE_NUMBER.search(text)
+    if not repo_match or not number_match:
+        return None
+
+    owner_match = OWNER_FIELD.search(text)
+    owner = repo_match["owner"] or (owner_match["owner"] if owner_match else default_owner)
+    if not owner:
+        return None
+    return {"owner": owner, "repo": repo_match["repo"], "number": number_match["number"]}
+
+
+def _problem_summary(title: str, details: dict) -> str:
+    summary = title.strip()
+    if details["error_messages"]:
+        summary += f" ({details['error_messages'][-1]})"
+    if details["referenced_files"]:
+        summary += f" in {details['referenced_files'][0]}"
+    return summary
+
+
+async def preparse_issue_callback(callback_context: "CallbackContext") -> Optional["types.Content"]:
+    """
+    before_agent_callback for issue_reader_agent: fetch the issue over REST
+    and, when its traceback/file references are parsed with high confidence,
+    write the `issue` state directly and skip the model call.
+    """
+    content = callback_context.user_content
+    text = "".join(part.text or "" for part in content.parts or []) if content else ""
+    request = parse_issue_request(text, callback_context.state.get("github_user"))
+    token = os.getenv("GITHUB_PERSONAL_ACCESS_TOKEN")
+    if request is None or not token:
+        return None
+
+    try:
+        issue = await fetch_issue(
+            token, request["owner"], request["repo"], request["number"],
+            priority=stage_priority(callback_context.agent_name),
+        )
+    except Exception as e:
+        # Any failure here just means the LLM reads the issue instead
+        print(f"⚠️ Issue pre-parse skipped: {e}")
+        return None
+
+    title = issue.get("title") or ""
+    body = issue.get("body") or ""
+    details = extract_issue_details(title, body, request["repo"])
+    if details["confidence"] < MIN_CONFIDENCE:
+        metrics.increment("issue_preparse_total", outcome="fallback")
+        return None
+
+    output = IssueReaderAgentOutput(
+        title=title,
+        body=body,
+        issue_number=str(request["number"]),
+        referenced_files=details["referenced_files"],
+        error_messages=details["error_messages"],
+        problem_summary=_problem_summary(title, details),
+    )
+    callback_context.state["issue"] = output.model_dump_json()
+    metrics.increment("issue_preparse_total", outcome="hit")
+    # Returning content skips the after-agent callbacks, so run them here
+    record_completed_stage(callback_context)
+    stop_stage_timer(callback_context)
+    from google.genai import types
+
+    print(f"⚡ Parsed issue #{request['number']} without the model (confidence {details['confidence']})")
+    return types.Content(role="model", parts=[types.Part(text=output.model_dump_json())])
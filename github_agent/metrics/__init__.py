@@ -0,0 +1 @@
+from .main import metrics, MetricsRegistry, Histogram, dump_metrics, instrumentation_callbacks, metrics_plugin, start_stage_timer, stop_stage_timer
@@ -0,0 +1,238 @@
+import bisect
+import json
+import time
+from typing import TYPE_CHECKING, Any, Optional, Tuple
+
+# Only needed for annotations; importing ADK here would slow down every entry point
+if TYPE_CHECKING:
+    from google.adk.agents.callback_context import CallbackContext
+    from google.adk.models import LlmRequest, LlmResponse
+    from google.adk.plugins.base_plugin import BasePlugin
+    from google.adk.tools.base_tool import BaseTool
+    from google.adk.tools.tool_context import ToolContext
+
+
+METRIC_PREFIX = "github_agent_"
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+TOKEN_BUCKETS = (100, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000, 1000000)
+
+
+class Histogram:
+    """Cumulative histogram with fixed upper bounds, as in Prometheus."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": {str(bound): total for bound, total in self.cumulative()},
+        }
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: tuple, extra: Optional[dict] = None) -> str:
+    items = list(labels) + list((extra or {}).items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in items) + "}"
+
+
+class MetricsRegistry:
+    """In-process counters and histograms, exportable as JSON or Prometheus text."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+    def increment(self, name: str, amount: float = 1, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        self._counters[key] = self._counters.get(key, 0) + amount
+
+    def reset(self) -> None:
+        self._histograms.clear()
+        self._counters.clear()
+
+    def to_dict(self) -> dict:
+        result = {"counters": {}, "histograms": {}}
+        for (name, labels), value in sorted(self._counters.items()):
+            result["counters"].setdefault(name, []).append({"labels": dict(labels), "value": value})
+        for (name, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+            result["histograms"].setdefault(name, []).append(dict(histogram.to_dict(), labels=dict(labels)))
+        return result
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self) -> str:
+        lines = []
+        typed = set()
+        for (name, labels), value in sorted(self._counters.items()):
+            metric = METRIC_PREFIX + name
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_format_labels(labels)} {value}")
+
+        for (name, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+            metric = METRIC_PREFIX + name
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            for bound, total in histogram.cumulative():
+                lines.append(f"{metric}_bucket{_format_labels(labels, {'le': bound})} {total}")
+            lines.append(f"{metric}_bucket{_format_labels(labels, {'le': '+Inf'})} {histogram.count}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {histogram.sum}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+# Start times of in-flight stages, model calls and tool calls
+_timers = {}
+
+
+def dump_metrics(path: str) -> None:
+    """Write the metrics to `path`; Prometheus text for .prom/.txt files, JSON otherwise."""
+    text = metrics.to_prometheus() if path.endswith((".prom", ".txt")) else metrics.to_json()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def start_stage_timer(callback_context: "CallbackContext") -> None:
+    _timers[("stage", callback_context.invocation_id, callback_context.agent_name)] = time.monotonic()
+    return None
+
+
+def stop_stage_timer(callback_context: "CallbackContext") -> None:
+    started = _timers.pop(("stage", callback_context.invocation_id, callback_context.agent_name), None)
+    if started is not None:
+        metrics.observe("stage_duration_seconds", time.monotonic() - started, stage=callback_context.agent_name)
+    return None
+
+
+def _before_model(callback_context: "CallbackContext", llm_request: "LlmRequest") -> None:
+    _timers[("model", callback_context.invocation_id, callback_context.agent_name)] = time.monotonic()
+    return None
+
+
+def _after_model(callback_context: "CallbackContext", llm_response: "LlmResponse") -> None:
+    # Streamed chunks are followed by one aggregated response; count only that
+    if llm_response.partial:
+        return None
+
+    stage = callback_context.agent_name
+    started = _timers.pop(("model", callback_context.invocation_id, stage), None)
+
+    # Served from the response cache: no model call, no tokens spent
+    if (llm_response.custom_metadata or {}).get("cache_hit"):
+        metrics.increment("llm_cache_hits_total", stage=stage)
+        return None
+
+    if started is not None:
+        metrics.observe("llm_latency_seconds", time.monotonic() - started, stage=stage)
+
+    metrics.increment("llm_calls_total", stage=stage)
+    if llm_response.error_code:
+        metrics.increment("llm_errors_total", stage=stage, code=llm_response.error_code)
+
+    usage = llm_response.usage_metadata
+    if usage is not None:
+        input_tokens = usage.prompt_token_count or 0
+        output_tokens = (usage.candidates_token_count or 0) + (usage.thoughts_token_count or 0)
+        metrics.observe("llm_input_tokens", input_tokens, buckets=TOKEN_BUCKETS, stage=stage)
+        metrics.observe("llm_output_tokens", output_tokens, buckets=TOKEN_BUCKETS, stage=stage)
+        metrics.increment("llm_input_tokens_total", input_tokens, stage=stage)
+        metrics.increment("llm_output_tokens_total", output_tokens, stage=stage)
+        # Part of the input served from the provider's prompt prefix cache (implicit or explicit)
+        cached_tokens = usage.cached_content_token_count or 0
+        metrics.increment("llm_cached_input_tokens_total", cached_tokens, stage=stage)
+        metrics.increment("llm_prefix_cache_total", stage=stage, outcome="hit" if cached_tokens else "miss")
+    return None
+
+
+def _on_model_error(callback_context: "CallbackContext", llm_request: "LlmRequest", error: Exception) -> None:
+    stage = callback_context.agent_name
+    _timers.pop(("model", callback_context.invocation_id, stage), None)
+    metrics.increment("llm_calls_total", stage=stage)
+    metrics.increment("llm_errors_total", stage=stage, code=type(error).__name__)
+    # Let the error propagate as before
+    return None
+
+
+def _before_tool(tool: "BaseTool", args: dict, tool_context: "ToolContext") -> None:
+    _timers[("tool", tool_context.function_call_id)] = time.monotonic()
+    return None
+
+
+def _after_tool(tool: "BaseTool", args: dict, tool_context: "ToolContext", tool_response: Any) -> None:
+    stage = tool_context.agent_name
+    started = _timers.pop(("tool", tool_context.function_call_id), None)
+    if started is not None:
+        metrics.observe("tool_latency_seconds", time.monotonic() - started, stage=stage, tool=tool.name)
+
+    metrics.increment("tool_calls_total", stage=stage, tool=tool.name)
+    if isinstance(tool_response, dict) and tool_response.get("isError"):
+        metrics.increment("tool_errors_total", stage=stage, tool=tool.name)
+    return None
+
+
+def _on_tool_error(tool: "BaseTool", args: dict, tool_context: "ToolContext", error: Exception) -> None:
+    _timers.pop(("tool", tool_context.function_call_id), None)
+    metrics.increment("tool_errors_total", stage=tool_context.agent_name, tool=tool.name)
+    # Let the error propagate as before
+    return None
+
+
+# Model and tool hooks shared by every LlmAgent
+instrumentation_callbacks = dict(
+    before_model_callback=_before_model,
+    after_model_callback=_after_model,
+    before_tool_callback=_before_tool,
+    after_tool_callback=_after_tool,
+    on_tool_error_callback=_on_tool_error,
+)
+
+
+def metrics_plugin() -> "BasePlugin":
+    """
+    Runner plugin for the hooks ADK only offers runner-wide: a model call that
+    raises never reaches after_model_callback, so its timer is dropped here.
+    """
+    from google.adk.plugins.base_plugin import BasePlugin
+
+    class MetricsPlugin(BasePlugin):
+        async def on_model_error_callback(self, *, callback_context, llm_request, error):
+            return _on_model_error(callback_context, llm_request, error)
+
+    return MetricsPlugin(name="metrics")
@@ -0,0 +1 @@
+from .main import PatchApplyError, apply_hunks, parse_patch_output
@@ -0,0 +1,77 @@
+from typing import List, Optional, Tuple, Union
+
+from github_agent.functions import parse_agent_json
+from github_agent.schemas import CodeFixHunk, CodeFixPatchOutput
+
+
+class PatchApplyError(ValueError):
+    """Raised when a code fix hunk cannot be applied to the original file."""
+
+
+def parse_patch_output(value) -> CodeFixPatchOutput:
+    """Validate the Code Fix Agent's patch-mode output against CodeFixPatchOutput."""
+    return CodeFixPatchOutput.model_validate(parse_agent_json(value))
+
+
+def _locate_loose(text: str, search: str) -> Optional[Tuple[int, int]]:
+    """Find `search` in `text` ignoring trailing whitespace on every line."""
+    lines = text.splitlines(keepends=True)
+    needle = [line.rstrip() for line in search.strip("\n").splitlines()]
+    if not needle:
+        return None
+
+    stripped = [line.rstrip() for line in lines]
+    matches = [
+        i for i in range(len(lines) - len(needle) + 1)
+        if stripped[i:i + len(needle)] == needle
+    ]
+    if len(matches) != 1:
+        return None
+
+    start = sum(len(line) for line in lines[:matches[0]])
+    end = start + sum(len(line) for line in lines[matches[0]:matches[0] + len(needle)])
+    # Keep the line terminator of the last matched line
+    last = lines[matches[0] + len(needle) - 1]
+    end -= len(last) - len(last.rstrip("\r\n"))
+    return start, end
+
+
+def apply_hunks(original: str, hunks: List[Union[CodeFixHunk, dict]]) -> str:
+    """
+    Apply search/replace hunks to `original` in order and return the new file.
+
+    Each search block must match exactly one location, either verbatim or
+    after ignoring trailing whitespace. Anything else raises PatchApplyError
+    so a bad patch never silently produces a half-edited file.
+    """
+    newline = "\r\n" if "\r\n" in original else "\n"
+    updated = original
+
+    for index, hunk in enumerate(hunks, start=1):
+        if isinstance(hunk, dict):
+            hunk = CodeFixHunk.model_validate(hunk)
+
+        search, replace = hunk.search, hunk.replace
+        if newline == "\r\n":
+            search = search.replace("\r\n", "\n").replace("\n", newline)
+            replace = replace.replace("\r\n", "\n").replace("\n", newline)
+
+        if not search.strip():
+            raise PatchApplyError(f"Hunk {index} has an empty search block")
+
+        count = updated.count(search)
+        if count == 1:
+            updated = updated.replace(search, replace, 1)
+            continue
+        if count > 1:
+            raise PatchApplyError(f"Hunk {index} matches {count} locations; add more context lines")
+
+        located = _locate_loose(updated, search)
+        if located is None:
+            raise PatchApplyError(f"Hunk {index} does not match full_file:\n{hunk.search}")
+
+        start, end = located
+        replace = replace.strip("\r\n")
+        updated = updated[:start] + replace + updated[end:]
+
+    return updated
@@ -0,0 +1 @@
+from .main import AGENT_TOKEN_BUDGETS, count_tokens, digest, excerpt, unified_diff, assemble_state, condense_fix_state, replace_handoff_contents
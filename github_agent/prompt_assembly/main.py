@@ -0,0 +1,252 @@
+import difflib
+import hashlib
+import json
+import math
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from github_agent.functions import parse_agent_json
+
+if TYPE_CHECKING:
+    from google.adk.agents.callback_context import CallbackContext
+    from google.adk.models import LlmRequest
+
+
+# Rough average for English prose and source code with Gemini/GPT tokenizers
+CHARS_PER_TOKEN = 4
+
+# First text part of a previous agent's reply as ADK passes it on
+HANDOFF_PREFIX = "For context:"
+
+# Token budget for the session state injected into each agent's instruction
+AGENT_TOKEN_BUDGETS = {
+    "repo_navigator_agent": 6000,
+    "code_fix_agent": 32000,
+    "summary_agent_agent": 8000,
+}
+DEFAULT_TOKEN_BUDGET = 8000
+
+# Strings shorter than this are never deduplicated or shrunk
+MIN_BLOB_TOKENS = 64
+
+# Smallest excerpt worth keeping before a blob is replaced by its digest
+MIN_EXCERPT_TOKENS = 256
+
+
+def count_tokens(text: str) -> int:
+    """Estimate the number of tokens in `text`."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def digest(text: str) -> str:
+    """Short stand-in for a large blob that still identifies it."""
+    sha = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+    return f"<omitted: {len(text.splitlines())} lines, ~{count_tokens(text)} tokens, sha256:{sha}>"
+
+
+def unified_diff(before: str, after: str, path: str = "file") -> str:
+    """Unified diff between two versions of a file."""
+    return "".join(difflib.unified_diff(
+        before.splitlines(keepends=True),
+        after.splitlines(keepends=True),
+        fromfile=f"a/{path}",
+        tofile=f"b/{path}",
+    ))
+
+
+def excerpt(text: str, max_tokens: int, anchors: Optional[List[str]] = None, context_lines: int = 20) -> str:
+    """
+    Cut `text` down to roughly `max_tokens`, keeping the lines around any
+    anchor (function names, snippet lines, error strings). Without an anchor
+    hit the head and tail of the text are kept.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    lines = text.splitlines()
+    keep = set()
+    for anchor in anchors or []:
+        anchor = anchor.strip()
+        if not anchor:
+            continue
+        for index, line in enumerate(lines):
+            if anchor in line:
+                keep.update(range(max(0, index - context_lines), min(len(lines), index + context_lines + 1)))
+
+    if not keep:
+        half = max(1, max_tokens * CHARS_PER_TOKEN // 2)
+        return f"{text[:half]}\n... [{count_tokens(text) - max_tokens} tokens omitted] ...\n{text[-half:]}"
+
+    parts = []
+    budget = max_tokens * CHARS_PER_TOKEN
+    previous = -1
+    for index in sorted(keep):
+        if budget <= 0:
+            break
+        if index != previous + 1:
+            parts.append(f"... [{index - previous - 1} lines omitted] ...")
+        parts.append(lines[index])
+        budget -= len(lines[index]) + 1
+        previous = index
+    if previous < len(lines) - 1:
+        parts.append(f"... [{len(lines) - previous - 1} lines omitted] ...")
+
+    return "\n".join(parts)
+
+
+def _collect_blobs(value: Any, path: str, blobs: List[Tuple[str, Any, Any]]) -> None:
+    """Collect (path, container, key) for every string leaf of a state value."""
+    items = value.items() if isinstance(value, dict) else enumerate(value)
+    for key, item in items:
+        item_path = f"{path}.{key}"
+        if isinstance(item, str):
+            blobs.append((item_path, value, key))
+        elif isinstance(item, (dict, list)):
+            _collect_blobs(item, item_path, blobs)
+
+
+def _default_anchors(fragments: Dict[str, Any]) -> List[str]:
+    """Pick excerpt anchors from navigation/issue fields present in the state."""
+    anchors = []
+    for value in fragments.values():
+        if not isinstance(value, dict):
+            continue
+        if isinstance(value.get("target_function"), str):
+            anchors.append(value["target_function"])
+        if isinstance(value.get("code_snippet"), str):
+            anchors.extend(line for line in value["code_snippet"].splitlines()[:3] if line.strip())
+        for message in value.get("error_messages") or []:
+            if isinstance(message, str):
+                anchors.append(message)
+    return anchors
+
+
+def condense_fix_state(repo_navigation: Any, code_fix: Any) -> Tuple[Any, Any]:
+    """
+    Replace the two copies of the fixed file with one diff: `updated_file`
+    becomes a unified diff against `full_file`, and `full_file` a digest.
+    """
+    try:
+        repo_navigation = parse_agent_json(repo_navigation)
+        code_fix = parse_agent_json(code_fix)
+    except ValueError:
+        return repo_navigation, code_fix
+
+    if not isinstance(repo_navigation, dict) or not isinstance(code_fix, dict):
+        return repo_navigation, code_fix
+
+    full_file = repo_navigation.get("full_file")
+    updated_file = code_fix.get("updated_file")
+    if isinstance(full_file, str) and isinstance(updated_file, str):
+        repo_navigation = dict(repo_navigation, full_file=digest(full_file))
+        code_fix = {key: value for key, value in code_fix.items() if key not in ("updated_file", "hunks")}
+        code_fix["updated_file_diff"] = unified_diff(full_file, updated_file, repo_navigation.get("target_file") or "file")
+
+    return repo_navigation, code_fix
+
+
+def _render(fragments: Dict[str, Any]) -> Dict[str, str]:
+    return {
+        name: value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, indent=1)
+        for name, value in fragments.items()
+    }
+
+
+def assemble_state(
+    agent_name: str,
+    fragments: Dict[str, Any],
+    anchors: Optional[List[str]] = None,
+    budget: Optional[int] = None,
+    keep: Iterable[str] = (),
+) -> Dict[str, str]:
+    """
+    Render session state fragments for an agent's instruction within its
+    token budget.
+
+    Fragments are parsed as agent JSON where possible. Large strings that
+    repeat an earlier one are replaced by a reference to it; if the total is
+    still over budget, the largest strings are cut to excerpts around
+    `anchors` (by default the target function, snippet and error messages
+    found in the state) and, as a last resort, to digests. Strings named in
+    `keep` ("code_details.full_file") are always sent whole, even over budget.
+    """
+    budget = budget or AGENT_TOKEN_BUDGETS.get(agent_name, DEFAULT_TOKEN_BUDGET)
+
+    parsed = {}
+    for name, value in fragments.items():
+        if value is None:
+            continue
+        try:
+            parsed[name] = parse_agent_json(value)
+        except ValueError:
+            parsed[name] = str(value)
+
+    if anchors is None:
+        anchors = _default_anchors(parsed)
+
+    # Raw string fragments are wrapped so they can be shrunk like any other leaf
+    holder = {"state": parsed}
+    blobs: List[Tuple[str, Any, Any]] = []
+    _collect_blobs(holder, "", blobs)
+
+    keep = {f".state.{name}" for name in keep}
+    seen: Dict[str, str] = {}
+    for path, container, key in blobs:
+        text = container[key]
+        if count_tokens(text) < MIN_BLOB_TOKENS or path in keep:
+            continue
+        sha = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if sha in seen:
+            container[key] = f"<same content as {seen[sha]}>"
+        else:
+            seen[sha] = path.removeprefix(".state.")
+
+    rendered = _render(parsed)
+    total = sum(count_tokens(text) for text in rendered.values())
+
+    shrunk = set()
+    while total > budget:
+        candidates = [
+            (count_tokens(container[key]), path, container, key)
+            for path, container, key in blobs
+            if path not in shrunk and path not in keep and count_tokens(container[key]) >= MIN_BLOB_TOKENS
+        ]
+        if not candidates:
+            break
+
+        size, path, container, key = max(candidates, key=lambda candidate: candidate[0])
+        target = size - (total - budget)
+        if target >= MIN_EXCERPT_TOKENS:
+            container[key] = excerpt(container[key], target, anchors)
+        else:
+            container[key] = digest(container[key])
+        shrunk.add(path)
+
+        rendered = _render(parsed)
+        total = sum(count_tokens(text) for text in rendered.values())
+
+    if total > budget:
+        print(f"Warning: {agent_name} state is ~{total} tokens, over its {budget} token budget")
+
+    return rendered
+
+
+def replace_handoff_contents(callback_context: "CallbackContext", llm_request: "LlmRequest") -> None:
+    """
+    before_model_callback for stages that get all session state through their
+    instruction and run with include_contents="none": the previous stage's
+    reply, which ADK passes on as context and which can carry a whole file,
+    is replaced by the user's original request. The State message rendered
+    from the dynamic instruction is left in place.
+    """
+    user_content = callback_context.user_content
+    contents = llm_request.contents
+    if not contents or user_content is None:
+        return None
+
+    for index, content in enumerate(contents):
+        parts = content.parts or []
+        # ADK opens other agents' replies with a "For context:" part
+        if content.role == "user" and parts and parts[0].text == HANDOFF_PREFIX:
+            contents[index] = user_content
+            return None
+    return None
@@ -0,0 +1 @@
+from .main import TokenBucket, get_limiter, backoff_delay, stage_priority, error_status, error_retry_after, RETRYABLE_STATUS_CODES
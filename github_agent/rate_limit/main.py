@@ -0,0 +1,232 @@
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import re
+import time
+from typing import Any, Dict, Mapping, Optional
+
+from github_agent.metrics import metrics
+
+
+# Lower runs first: stages closer to a finished issue go ahead of new work,
+# so in-flight issues complete instead of every issue advancing slowly
+STAGE_PRIORITIES = {
+    "orchestrator_agent": 0,
+    "summary_agent_agent": 1,
+    "code_fix_agent": 2,
+    "repo_navigator_agent": 3,
+    "issue_reader_agent": 4,
+}
+DEFAULT_PRIORITY = 5
+
+# Status codes worth retrying after a backoff
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+
+# Below this share of the hourly quota, spread the rest evenly until the reset
+GITHUB_LOW_QUOTA_FRACTION = 0.2
+
+
+def stage_priority(agent_name: Optional[str]) -> int:
+    return STAGE_PRIORITIES.get(agent_name, DEFAULT_PRIORITY)
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP) -> float:
+    """Capped exponential backoff with full jitter: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class TokenBucket:
+    """
+    Token-bucket limiter with priority scheduling.
+
+    Waiters are served lowest priority value first (FIFO within a priority)
+    as tokens refill at `rate` per second, up to `capacity` tokens of burst.
+    The rate can be changed at runtime, and `pause_until` holds every waiter
+    until a quota reset.
+    """
+
+    def __init__(self, name: str, rate: float, capacity: float, min_rate: float = 0.05):
+        self.name = name
+        self.max_rate = rate
+        self.min_rate = min_rate
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters: list = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        # _updated is in the future while paused
+        if now > self._updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def _dispatch(self) -> None:
+        self._timer = None
+        self._refill()
+        now = time.monotonic()
+
+        while self._waiters and now >= self._paused_until and self.tokens >= 1:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self.tokens -= 1
+            future.set_result(None)
+
+        # Drop cancelled waiters at the head so they don't hold the timer
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+
+        if self._waiters:
+            delay = max(self._paused_until - now, (1 - self.tokens) / self.rate, 0.0)
+            self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    async def acquire(self, priority: int = DEFAULT_PRIORITY) -> float:
+        """Wait for a token; returns the seconds spent waiting."""
+        loop = asyncio.get_running_loop()
+        # Waiters and timers belong to one event loop; start over on a new one
+        if self._loop is not loop:
+            self._loop = loop
+            self._waiters = []
+            self._timer = None
+
+        started = time.monotonic()
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        if self._timer is None:
+            self._dispatch()
+        await future
+
+        waited = time.monotonic() - started
+        if waited > 0.001:
+            metrics.observe("rate_limit_wait_seconds", waited, resource=self.name)
+        return waited
+
+    def set_rate(self, rate: float) -> None:
+        self._refill()
+        self.rate = max(self.min_rate, min(self.max_rate, rate))
+
+    def pause_until(self, deadline: float) -> None:
+        """Hold all requests until the monotonic `deadline`, then restart from an empty bucket."""
+        if deadline <= self._paused_until:
+            return
+        self._paused_until = deadline
+        self._refill()
+        # No burst right after the pause: every client would stampede the reset
+        self.tokens = 0.0
+        self._updated = deadline
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._waiters:
+            self._dispatch()
+
+    def penalize(self, factor: float = 0.5) -> None:
+        """Multiplicative decrease after a rate-limit answer."""
+        self.set_rate(self.rate * factor)
+
+    def reward(self, step: Optional[float] = None) -> None:
+        """Additive increase after a success, back towards max_rate."""
+        if self.rate < self.max_rate:
+            self.set_rate(self.rate + (step if step is not None else self.max_rate / 20))
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> bool:
+        """
+        Adapt to GitHub's quota headers: pause on Retry-After or an exhausted
+        X-RateLimit-Remaining until X-RateLimit-Reset (plus jitter, so clients
+        don't all resume at once), and spread a low remaining quota evenly
+        over the time left until the reset. Returns whether the headers paused
+        the limiter.
+        """
+        now_wall = time.time()
+        now = time.monotonic()
+        paused = False
+
+        retry_after = headers.get("retry-after") or headers.get("Retry-After")
+        if retry_after:
+            try:
+                self.pause_until(now + float(retry_after) + random.uniform(0, 1))
+                paused = True
+            except ValueError:
+                pass
+
+        remaining = headers.get("x-ratelimit-remaining") or headers.get("X-RateLimit-Remaining")
+        reset = headers.get("x-ratelimit-reset") or headers.get("X-RateLimit-Reset")
+        limit = headers.get("x-ratelimit-limit") or headers.get("X-RateLimit-Limit")
+        if remaining is None or reset is None:
+            return paused
+
+        try:
+            remaining, reset = int(remaining), float(reset)
+            limit = int(limit) if limit else None
+        except ValueError:
+            return paused
+
+        seconds_to_reset = max(1.0, reset - now_wall)
+        if remaining <= 0:
+            self.pause_until(now + seconds_to_reset + random.uniform(0, min(5.0, seconds_to_reset / 10)))
+            paused = True
+        elif limit and remaining < limit * GITHUB_LOW_QUOTA_FRACTION:
+            self.set_rate(remaining / seconds_to_reset)
+        else:
+            self.set_rate(self.max_rate)
+        return paused
+
+
+_limiters: Dict[str, TokenBucket] = {}
+
+
+def get_limiter(name: str) -> TokenBucket:
+    """
+    Shared limiter per quota: "github" covers REST and MCP calls made with the
+    same token; "llm:<model>" is one per model.
+    """
+    if name not in _limiters:
+        if name == "github":
+            # GitHub's secondary limit is about 900 points/minute for REST
+            rate = float(os.getenv("GITHUB_RATE_LIMIT_PER_SEC", "15"))
+            capacity = float(os.getenv("GITHUB_RATE_LIMIT_BURST", "30"))
+        else:
+            rate = float(os.getenv("LLM_RATE_LIMIT_PER_SEC", "10"))
+            capacity = float(os.getenv("LLM_RATE_LIMIT_BURST", "20"))
+        _limiters[name] = TokenBucket(name, rate=rate, capacity=capacity)
+    return _limiters[name]
+
+
+RETRY_DELAY_PATTERN = re.compile(r'"?retryDelay"?\s*:\s*"?(\d+(?:\.\d+)?)s')
+
+
+def error_status(error: BaseException) -> Optional[int]:
+    """HTTP status of a google-genai, LiteLLM or httpx error, if it has one."""
+    for attribute in ("code", "status_code"):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def error_retry_after(error: BaseException) -> Optional[float]:
+    """Server-suggested delay: Gemini's RetryInfo.retryDelay or a Retry-After header."""
+    response = getattr(error, "response", None)
+    headers: Any = getattr(response, "headers", None) or {}
+    retry_after = headers.get("retry-after") if hasattr(headers, "get") else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+
+    match = RETRY_DELAY_PATTERN.search(str(getattr(error, "details", None) or error))
+    return float(match.group(1)) if match else None
@@ -0,0 +1 @@
+from .main import render_report, change_summary, render_report_callback, add_report_prose_callback
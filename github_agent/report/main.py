@@ -0,0 +1,189 @@
+import re
+from typing import TYPE_CHECKING, Any, List, Optional
+
+from github_agent.functions import parse_agent_json
+from github_agent.metrics import metrics, stop_stage_timer
+from github_agent.prompt_assembly import unified_diff
+from github_agent.sessions import record_completed_stage
+
+if TYPE_CHECKING:
+    from google.adk.agents.callback_context import CallbackContext
+    from google.genai import types
+
+
+NOT_AVAILABLE = "Not available"
+
+# Longer diffs (e.g. a model that reformatted the whole file) are cut in the report
+MAX_DIFF_LINES = 400
+
+# Issue bodies are quoted up to this length when there is no problem summary
+MAX_DESCRIPTION_CHARS = 600
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+def _parse(value: Any) -> dict:
+    try:
+        parsed = parse_agent_json(value)
+    except ValueError:
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def _field(data: dict, key: str) -> str:
+    value = data.get(key)
+    if isinstance(value, str):
+        value = value.strip()
+    return str(value) if value else NOT_AVAILABLE
+
+
+def _description(issue: dict) -> str:
+    summary = (issue.get("problem_summary") or "").strip()
+    if summary:
+        return summary
+    body = " ".join((issue.get("body") or "").split())
+    if len(body) > MAX_DESCRIPTION_CHARS:
+        body = body[:MAX_DESCRIPTION_CHARS].rsplit(" ", 1)[0] + " …"
+    return body or NOT_AVAILABLE
+
+
+def change_summary(diff: str) -> List[str]:
+    """One line per diff hunk: the updated-file lines it touches and how many lines it adds and removes."""
+    changes = []
+    hunk = None
+    for line in diff.splitlines() + ["@@"]:
+        if line.startswith("@@"):
+            if hunk is not None:
+                first, last, added, removed = hunk[1:]
+                span = f"Line {first}" if first == last else f"Lines {first}-{last}"
+                changes.append(f"{span}: {added} added, {removed} removed")
+            match = HUNK_HEADER.match(line)
+            # [next line number in the updated file, first changed, last changed, added, removed]
+            hunk = [int(match.group(3)), None, None, 0, 0] if match else None
+        elif hunk is None or line.startswith(("+++", "---")):
+            continue
+        elif line.startswith("+"):
+            hunk[1] = hunk[1] or hunk[0]
+            hunk[2] = hunk[0]
+            hunk[3] += 1
+            hunk[0] += 1
+        elif line.startswith("-"):
+            hunk[1] = hunk[1] or hunk[0]
+            hunk[2] = hunk[0]
+            hunk[4] += 1
+        else:
+            hunk[0] += 1
+    return changes
+
+
+def _code_block(text: str, language: str = "") -> str:
+    fence = "```"
+    while fence in text:
+        fence += "`"
+    return f"{fence}{language}\n{text.rstrip()}\n{fence}"
+
+
+def render_report(issue: Any, repo_navigation: Any, code_fix: Any, overview: Optional[str] = None) -> str:
+    """
+    Markdown Issue Resolution Report built from the chain's session state,
+    with the code change as a unified diff of `full_file` against
+    `updated_file`. `overview` is an optional prose paragraph put under the
+    title.
+    """
+    issue, navigation, fix = _parse(issue), _parse(repo_navigation), _parse(code_fix)
+    target_file = _field(navigation, "target_file")
+    issue_number = _field(issue, "issue_number")
+
+    lines = ["# 📝 Issue Resolution Report", ""]
+    if overview and overview.strip():
+        lines += [overview.strip(), ""]
+
+    lines += [
+        "## 1. 🚨 Issue Overview",
+        f"- **Title:** {_field(issue, 'title')}",
+        f"- **Issue Number:** {'#' + issue_number if issue_number != NOT_AVAILABLE else NOT_AVAILABLE}",
+        f"- **Description:** {_description(issue)}",
+    ]
+    errors = [str(error).strip() for error in issue.get("error_messages") or [] if str(error).strip()]
+    if errors:
+        lines.append("- **Error Messages:**")
+        lines += [f"  - `{error}`" for error in errors]
+
+    lines += [
+        "",
+        "## 2. 🔍 Diagnosis & Root Cause",
+        f"- **Affected File:** {'`' + target_file + '`' if target_file != NOT_AVAILABLE else NOT_AVAILABLE}",
+        f"- **Function:** {_field(navigation, 'target_function')}",
+        f"- **Root Cause:** {_field(navigation, 'reasoning')}",
+        "",
+        "## 3. 🛠️ Solution Applied",
+        f"- **Fix Summary:** {_field(fix, 'code_fix_summary')}",
+    ]
+
+    full_file, updated_file = navigation.get("full_file"), fix.get("updated_file")
+    diff = ""
+    if isinstance(full_file, str) and isinstance(updated_file, str):
+        diff = unified_diff(full_file, updated_file, target_file if target_file != NOT_AVAILABLE else "file")
+
+    if diff:
+        lines.append("- **Code Changes:**")
+        lines += [f"  - {change}" for change in change_summary(diff)]
+        diff_lines = diff.splitlines()
+        if len(diff_lines) > MAX_DIFF_LINES:
+            diff_lines = diff_lines[:MAX_DIFF_LINES] + [f"... {len(diff_lines) - MAX_DIFF_LINES} more diff lines omitted ..."]
+        lines += ["- **Code Diff:**", "", _code_block("\n".join(diff_lines), "diff")]
+    else:
+        lines.append(f"- **Code Changes:** {'No changes to the file' if updated_file == full_file and full_file else NOT_AVAILABLE}")
+
+    lines += ["", "## 4. ✅ Status"]
+    if fix.get("patch_error"):
+        lines += [
+            f"- The fix could not be applied: {fix['patch_error']}",
+            "- Needs manual follow-up.",
+        ]
+    elif diff:
+        lines += ["- The fix has been generated and applied.", "- Ready for review."]
+    else:
+        lines += ["- No fix was produced.", "- Needs manual follow-up."]
+
+    return "\n".join(lines) + "\n"
+
+
+def _state_report(callback_context: "CallbackContext", overview: Optional[str] = None) -> str:
+    state = callback_context.state
+    return render_report(
+        state.get("issue"),
+        state.get("repo_navigation") or state.get("repo_navigator"),
+        state.get("code_fix"),
+        overview=overview,
+    )
+
+
+def render_report_callback(callback_context: "CallbackContext") -> Optional["types.Content"]:
+    """
+    before_agent_callback for summary_agent in template mode: write the
+    report to `summary` and skip the model call.
+    """
+    from google.genai import types
+
+    report = _state_report(callback_context)
+    callback_context.state["summary"] = report
+    metrics.increment("summary_report_total", mode="template")
+    # Returning content skips the after-agent callbacks, so run them here
+    record_completed_stage(callback_context)
+    stop_stage_timer(callback_context)
+    return types.Content(role="model", parts=[types.Part(text=report)])
+
+
+def add_report_prose_callback(callback_context: "CallbackContext") -> Optional["types.Content"]:
+    """
+    after_agent_callback for summary_agent in prose mode: the model wrote
+    only the overview paragraph, so wrap it in the rendered report.
+    """
+    from google.genai import types
+
+    overview = callback_context.state.get("summary")
+    report = _state_report(callback_context, overview=overview if isinstance(overview, str) else None)
+    callback_context.state["summary"] = report
+    metrics.increment("summary_report_total", mode="prose")
+    return types.Content(role="model", parts=[types.Part(text=report)])
@@ -0,0 +1 @@
+from .main import ResolutionIndex, embed_issue, issue_fingerprint, get_resolution_index, resolution_prior_callback, record_resolution_callback
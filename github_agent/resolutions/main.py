@@ -0,0 +1,395 @@
+import hashlib
+import json
+import math
+import os
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from github_agent.code_index import code_indexes
+from github_agent.code_index.main import blob_sha
+from github_agent.functions import parse_agent_json
+from github_agent.issue_parser import parse_issue_request
+from github_agent.metrics import metrics, stop_stage_timer
+from github_agent.rate_limit import stage_priority
+from github_agent.sessions import mark_stage_completed, record_completed_stage
+
+if TYPE_CHECKING:
+    import numpy as np
+    from google.adk.agents.callback_context import CallbackContext
+    from google.genai import types
+
+
+# Width of the hashed feature vectors; changing it starts a new index
+EMBEDDING_DIM = int(os.getenv("RESOLUTION_INDEX_DIM", "1024"))
+
+# Hits below this cosine similarity are not worth showing the navigator
+MIN_SIMILARITY = float(os.getenv("RESOLUTION_MIN_SIMILARITY", "0.35"))
+TOP_K = int(os.getenv("RESOLUTION_TOP_K", "3"))
+
+# A stored fix is replayed for an identical issue only while it is this recent (seconds),
+# since the target file may have moved on since
+DUPLICATE_MAX_AGE = float(os.getenv("RESOLUTION_DUPLICATE_MAX_AGE", str(7 * 24 * 3600)))
+
+# State key the navigator prompt reads its prior from
+PRIOR_STATE_KEY = "similar_resolutions"
+
+WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+CAMEL_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+# Fields that describe the bug, with how much each one counts in the embedding
+ISSUE_FIELD_WEIGHTS = {
+    "title": 2.0,
+    "problem_summary": 2.0,
+    "error_messages": 3.0,
+    "referenced_files": 2.0,
+    "body": 1.0,
+}
+
+
+def _words(text: str) -> List[str]:
+    words = []
+    for word in WORD.findall(text):
+        lowered = word.lower()
+        words.append(lowered)
+        parts = [part.lower() for part in CAMEL_BOUNDARY.sub("_", word).split("_") if part]
+        if len(parts) > 1:
+            words.extend(parts)
+    return words
+
+
+def _features(issue: dict) -> Counter:
+    features: Counter = Counter()
+    for name, weight in ISSUE_FIELD_WEIGHTS.items():
+        value = issue.get(name)
+        if isinstance(value, list):
+            value = "\n".join(str(item) for item in value)
+        if not value:
+            continue
+        words = _words(str(value))
+        for word in words:
+            features[word] += weight
+        # Word pairs keep error messages and call chains apart from the same words in any order
+        for first, second in zip(words, words[1:]):
+            features[f"{first} {second}"] += weight / 2
+    return features
+
+
+def embed_issue(issue: dict, dim: int = EMBEDDING_DIM) -> "np.ndarray":
+    """
+    L2-normalized hashed bag of words and word pairs over the issue fields
+    (signed feature hashing with sublinear term weights), so it needs no
+    model call and is stable across processes.
+    """
+    import numpy as np
+
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature, weight in _features(issue).items():
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dim
+        sign = 1.0 if digest[4] & 1 else -1.0
+        vector[bucket] += sign * (1.0 + math.log(weight))
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+def issue_fingerprint(owner: str, repo: str, issue: dict) -> str:
+    """Identity of an issue's content in one repository, ignoring whitespace and case."""
+    text = "\n".join(" ".join(str(issue.get(name) or "").split()).lower() for name in ("title", "body"))
+    return hashlib.sha256(f"{owner}/{repo}".lower().encode("utf-8") + b"\0" + text.encode("utf-8")).hexdigest()
+
+
+def _parse(value: Any) -> dict:
+    try:
+        parsed = parse_agent_json(value)
+    except ValueError:
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+@dataclass
+class Resolution:
+    """What the index keeps in memory per row; the stage outputs stay on disk."""
+
+    fingerprint: str
+    owner: str
+    repo: str
+    issue_number: str
+    title: str
+    target_file: str
+    target_function: str
+    code_fix_summary: str
+    created_at: float
+    offset: int
+
+    def to_prior(self, score: float) -> dict:
+        return {
+            "repository": f"{self.owner}/{self.repo}",
+            "issue_number": self.issue_number,
+            "title": self.title,
+            "target_file": self.target_file,
+            "target_function": self.target_function,
+            "code_fix_summary": self.code_fix_summary,
+            "similarity": round(score, 3),
+        }
+
+
+class ResolutionIndex:
+    """
+    Append-only store of past resolutions (the `issue`, `repo_navigation` and
+    `code_fix` state of finished runs) with vectorized cosine top-k search.
+
+    Records are JSON lines in records.jsonl and their embeddings are raw
+    float32 rows in vectors.f32, so adding a resolution appends to both
+    files; the matrix in memory grows by doubling.
+    """
+
+    def __init__(self, directory: str, dim: int = EMBEDDING_DIM):
+        import numpy as np
+
+        self.directory = directory
+        self.dim = dim
+        self.records_path = os.path.join(directory, "records.jsonl")
+        self.vectors_path = os.path.join(directory, f"vectors-{dim}.f32")
+        self.resolutions: List[Resolution] = []
+        self._by_fingerprint: Dict[str, int] = {}
+        self._matrix = np.zeros((0, dim), dtype=np.float32)
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self.resolutions)
+
+    def _load(self) -> None:
+        import numpy as np
+
+        resolutions = []
+        rows = []
+        offset = 0
+        try:
+            with open(self.records_path, "rb") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A torn last line from a crash mid-append
+                        break
+                    resolutions.append(self._resolution(record, offset))
+                    rows.append(record)
+                    offset += len(line)
+        except FileNotFoundError:
+            pass
+
+        vectors = np.zeros((0, self.dim), dtype=np.float32)
+        if os.path.exists(self.vectors_path):
+            vectors = np.fromfile(self.vectors_path, dtype=np.float32)
+            vectors = vectors[: len(vectors) // self.dim * self.dim].reshape(-1, self.dim)
+
+        # Rows without a vector (crash between the two appends, or a new dimension) are re-embedded
+        if len(vectors) < len(resolutions):
+            missing = np.stack([embed_issue(record["issue"], self.dim) for record in rows[len(vectors):]])
+            vectors = np.concatenate([vectors, missing])
+            vectors.tofile(self.vectors_path)
+        elif len(vectors) > len(resolutions):
+            vectors = vectors[: len(resolutions)]
+            vectors.tofile(self.vectors_path)
+
+        with open(self.records_path, "ab") as f:
+            f.truncate(offset)
+
+        self._matrix = np.array(vectors, dtype=np.float32)
+        for resolution in resolutions:
+            self._append(resolution)
+
+    @staticmethod
+    def _resolution(record: dict, offset: int) -> Resolution:
+        navigation = _parse(record.get("repo_navigation"))
+        code_fix = _parse(record.get("code_fix"))
+        return Resolution(
+            fingerprint=record["fingerprint"],
+            owner=record["owner"],
+            repo=record["repo"],
+            issue_number=str(record.get("issue_number", "")),
+            title=str(record["issue"].get("title", "")),
+            target_file=str(navigation.get("target_file", "")),
+            target_function=str(navigation.get("target_function", "")),
+            code_fix_summary=str(code_fix.get("code_fix_summary", "")),
+            created_at=float(record.get("created_at", 0.0)),
+            offset=offset,
+        )
+
+    def _append(self, resolution: Resolution) -> None:
+        self._by_fingerprint[resolution.fingerprint] = len(self.resolutions)
+        self.resolutions.append(resolution)
+
+    def _grow(self, rows: int) -> None:
+        import numpy as np
+
+        if rows <= len(self._matrix):
+            return
+        capacity = max(rows, 2 * len(self._matrix), 64)
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        matrix[: len(self.resolutions)] = self._matrix[: len(self.resolutions)]
+        self._matrix = matrix
+
+    def add(self, owner: str, repo: str, issue: dict, repo_navigation: Any, code_fix: Any) -> bool:
+        """Store a finished resolution; returns False when the same issue is already stored."""
+        fingerprint = issue_fingerprint(owner, repo, issue)
+        if fingerprint in self._by_fingerprint:
+            return False
+
+        record = {
+            "fingerprint": fingerprint,
+            "owner": owner,
+            "repo": repo,
+            "issue_number": str(issue.get("issue_number", "")),
+            "issue": issue,
+            "repo_navigation": repo_navigation,
+            "code_fix": code_fix,
+            "created_at": time.time(),
+        }
+        line = (json.dumps(record) + "\n").encode("utf-8")
+        vector = embed_issue(issue, self.dim)
+
+        with open(self.records_path, "ab") as f:
+            offset = f.tell()
+            f.write(line)
+        with open(self.vectors_path, "ab") as f:
+            f.write(vector.tobytes())
+
+        self._grow(len(self.resolutions) + 1)
+        self._matrix[len(self.resolutions)] = vector
+        self._append(self._resolution(record, offset))
+        return True
+
+    def search(self, issue: dict, k: int = TOP_K, min_similarity: float = MIN_SIMILARITY) -> List[tuple]:
+        """Top-k stored resolutions by cosine similarity to `issue`, as (Resolution, score), best first."""
+        import numpy as np
+
+        count = len(self.resolutions)
+        if not count or k <= 0:
+            return []
+        scores = self._matrix[:count] @ embed_issue(issue, self.dim)
+        k = min(k, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.resolutions[i], float(scores[i])) for i in top if scores[i] >= min_similarity]
+
+    def find_duplicate(self, owner: str, repo: str, issue: dict, max_age: float = DUPLICATE_MAX_AGE) -> Optional[dict]:
+        """The stored record for the same issue text in the same repository, if recent enough."""
+        position = self._by_fingerprint.get(issue_fingerprint(owner, repo, issue))
+        if position is None:
+            return None
+        resolution = self.resolutions[position]
+        if time.time() - resolution.created_at > max_age:
+            return None
+        with open(self.records_path, "rb") as f:
+            f.seek(resolution.offset)
+            return json.loads(f.readline())
+
+
+_index: Optional[ResolutionIndex] = None
+
+
+def get_resolution_index() -> Optional[ResolutionIndex]:
+    """The shared index under RESOLUTION_INDEX_DIR, or None when it is not configured."""
+    global _index
+    directory = os.getenv("RESOLUTION_INDEX_DIR")
+    if not directory:
+        return None
+    if _index is None or _index.directory != directory:
+        _index = ResolutionIndex(directory)
+    return _index
+
+
+def _issue_context(callback_context: "CallbackContext") -> Optional[tuple]:
+    """(owner, repo, issue) for the running request, once the issue stage has written `issue`."""
+    issue = _parse(callback_context.state.get("issue"))
+    content = callback_context.user_content
+    text = "".join(part.text or "" for part in content.parts or []) if content else ""
+    request = parse_issue_request(text, callback_context.state.get("github_user"))
+    if not issue or request is None:
+        return None
+    return request["owner"], request["repo"], issue
+
+
+async def _unchanged_at_head(owner: str, repo: str, repo_navigation: Any, priority: int) -> bool:
+    """Is the stored navigation's target file still byte for byte the file at the repository's current head?"""
+    navigation = _parse(repo_navigation)
+    target_file, full_file = navigation.get("target_file"), navigation.get("full_file")
+    if not isinstance(target_file, str) or not isinstance(full_file, str):
+        return False
+    try:
+        index = await code_indexes.get(owner, repo, None, priority=priority)
+    except Exception as e:
+        print(f"⚠️ Could not check the stored fix against the current head: {e}")
+        return False
+    current = index.files.get(target_file.strip().lstrip("/"))
+    return current is not None and current.blob_sha == blob_sha(full_file.encode("utf-8"))
+
+
+async def resolution_prior_callback(callback_context: "CallbackContext") -> Optional["types.Content"]:
+    """
+    before_agent_callback for repo_navigator_agent. An issue identical to a
+    recently resolved one replays the stored navigation and fix, skipping
+    the navigator and the fixer, as long as the fixed file has not changed
+    since; otherwise the most similar past resolutions go into state for
+    the navigator prompt to check first.
+    """
+    index = get_resolution_index()
+    context = _issue_context(callback_context) if index is not None else None
+    if context is None:
+        return None
+    owner, repo, issue = context
+    state = callback_context.state
+
+    duplicate = index.find_duplicate(owner, repo, issue)
+    if duplicate is not None and _parse(duplicate["code_fix"]).get("patch_error"):
+        duplicate = None
+    # A stored fix replayed onto a file that moved on would revert the newer commits
+    priority = stage_priority(callback_context.agent_name)
+    if duplicate is not None and not await _unchanged_at_head(owner, repo, duplicate["repo_navigation"], priority):
+        metrics.increment("resolution_index_total", outcome="stale_duplicate")
+        print(f"↷ Resolved {owner}/{repo}#{duplicate['issue_number']} changed since its fix; using it as a prior only")
+        duplicate = None
+
+    if duplicate is not None:
+        state["repo_navigation"] = duplicate["repo_navigation"]
+        state["code_fix"] = duplicate["code_fix"]
+        # The fixer's skip_completed_stage replays the stored fix
+        mark_stage_completed(callback_context, "code_fix_agent", duplicate["code_fix"])
+        record_completed_stage(callback_context)
+        stop_stage_timer(callback_context)
+        metrics.increment("resolution_index_total", outcome="duplicate")
+        from google.genai import types
+
+        print(f"⚡ Issue matches resolved {owner}/{repo}#{duplicate['issue_number']}: replaying its fix")
+        return types.Content(role="model", parts=[types.Part(text=str(duplicate["repo_navigation"]))])
+
+    hits = index.search(issue)
+    metrics.increment("resolution_index_total", outcome="prior" if hits else "miss")
+    if hits:
+        state[PRIOR_STATE_KEY] = json.dumps([resolution.to_prior(score) for resolution, score in hits])
+    elif state.get(PRIOR_STATE_KEY):
+        state[PRIOR_STATE_KEY] = None
+    return None
+
+
+def record_resolution_callback(callback_context: "CallbackContext") -> None:
+    """after_agent_callback for code_fix_agent: add a fix that applied cleanly to the index."""
+    index = get_resolution_index()
+    context = _issue_context(callback_context) if index is not None else None
+    if context is None:
+        return None
+    owner, repo, issue = context
+    state = callback_context.state
+
+    code_fix = state.get("code_fix")
+    fix = _parse(code_fix)
+    if not fix.get("updated_file") or fix.get("patch_error"):
+        return None
+    if index.add(owner, repo, issue, state.get("repo_navigation"), code_fix):
+        metrics.increment("resolution_index_records_total")
+    return None
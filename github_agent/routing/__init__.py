@@ -0,0 +1 @@
+from .main import DEFAULT_ROUTES, MODEL_PRICES, RoutedLlm, build_model, escalation_reason, estimate_cost, route_model, retry_config, response_cache
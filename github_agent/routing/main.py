@@ -0,0 +1,280 @@
+import asyncio
+import json
+import os
+import time
+from typing import AsyncGenerator, Dict, List, Optional, Type
+
+from dotenv import load_dotenv
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.google_llm import Gemini
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from pydantic import BaseModel
+
+from github_agent.agent_output import parse_agent_output
+from github_agent.cache import LlmResponseCache, llm_request_key
+from github_agent.metrics import metrics
+from github_agent.rate_limit import (
+    RETRYABLE_STATUS_CODES,
+    backoff_delay,
+    error_retry_after,
+    error_status,
+    get_limiter,
+    stage_priority,
+)
+
+
+load_dotenv()
+
+# Cheap and fast everywhere except the code fix, which gets the stronger model up front
+DEFAULT_ROUTES = {
+    "orchestrator_agent": "gemini-2.5-flash-lite",
+    "issue_reader_agent": "gemini-2.5-flash-lite",
+    "repo_navigator_agent": "gemini-2.5-flash-lite",
+    "code_fix_agent": "gemini-2.5-flash",
+    "summary_agent_agent": "gemini-2.5-flash-lite",
+}
+
+# Next model to try when a stage's answer fails validation or looks unsure
+DEFAULT_ESCALATIONS = {
+    "gemini-2.5-flash-lite": "gemini-2.5-flash",
+    "gemini-2.5-flash": "gemini-2.5-pro",
+}
+
+# USD per million (input, output) tokens, used to estimate the cost of each routing decision
+MODEL_PRICES = {
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+
+# Input tokens served from a context cache are billed at this fraction of the input price
+CACHED_INPUT_PRICE_FACTOR = 0.25
+
+# Mean token log-probability below which an answer counts as low confidence
+MIN_AVG_LOGPROB = float(os.getenv("MODEL_MIN_AVG_LOGPROB", "-1.0"))
+
+# Attempts per model call on 429/5xx; RoutedLlm retries through the model's rate
+# limiter with jittered, capped backoff, so the SDK itself must not retry
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "5"))
+
+retry_config = types.HttpRetryOptions(attempts=1)
+
+_models: Dict[str, BaseLlm] = {}
+
+# Opt-in (LLM_CACHE=1): byte-identical requests for a stage reuse the stored final answer
+response_cache = (
+    LlmResponseCache(
+        max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", 32 * 1024 * 1024)),
+        cache_dir=os.getenv("LLM_CACHE_DIR"),
+        ttl=float(os.getenv("LLM_CACHE_TTL", 24 * 3600)),
+        max_disk_bytes=int(os.getenv("LLM_CACHE_MAX_DISK_BYTES", 256 * 1024 * 1024)),
+    )
+    if os.getenv("LLM_CACHE", "").lower() in ("1", "true", "yes")
+    else None
+)
+
+
+def _env_json(name: str) -> dict:
+    value = os.getenv(name)
+    return json.loads(value) if value else {}
+
+
+# e.g. MODEL_ROUTES='{"code_fix_agent": "gemini-2.5-pro"}', MODEL_ESCALATIONS='{"gemini-2.5-flash": null}'
+model_routes = {**DEFAULT_ROUTES, **_env_json("MODEL_ROUTES")}
+model_escalations = {**DEFAULT_ESCALATIONS, **_env_json("MODEL_ESCALATIONS")}
+
+
+def build_model(name: str) -> BaseLlm:
+    """One shared client per model name; names with a provider prefix (openrouter/...) go through LiteLLM."""
+    if name not in _models:
+        if "/" in name:
+            # Imported lazily: LiteLLM is slow to import and only needed for non-Gemini routes
+            from google.adk.models.lite_llm import LiteLlm
+
+            _models[name] = LiteLlm(model=name, api_key=os.getenv("OPENROUTER_API_KEY"))
+        else:
+            _models[name] = Gemini(model=name, retry_options=retry_config)
+    return _models[name]
+
+
+def escalation_chain(name: str) -> List[str]:
+    chain = [name]
+    while model_escalations.get(chain[-1]) and model_escalations[chain[-1]] not in chain:
+        chain.append(model_escalations[chain[-1]])
+    return chain
+
+
+def estimate_cost(model: str, usage: Optional[types.GenerateContentResponseUsageMetadata]) -> float:
+    if usage is None or model not in MODEL_PRICES:
+        return 0.0
+    input_price, output_price = MODEL_PRICES[model]
+    output_tokens = (usage.candidates_token_count or 0) + (usage.thoughts_token_count or 0)
+    cached_tokens = usage.cached_content_token_count or 0
+    input_cost = ((usage.prompt_token_count or 0) - cached_tokens + cached_tokens * CACHED_INPUT_PRICE_FACTOR) * input_price
+    return (input_cost + output_tokens * output_price) / 1_000_000
+
+
+def escalation_reason(response: LlmResponse, schema: Optional[Type[BaseModel]]) -> Optional[str]:
+    """Why a final answer should be retried on a larger model, or None if it is good enough."""
+    if response.error_code:
+        return "error"
+
+    parts = response.content.parts if response.content else []
+    # Tool calls are intermediate steps, not the stage's answer
+    if any(part.function_call for part in parts or []):
+        return None
+
+    if response.finish_reason == types.FinishReason.MAX_TOKENS:
+        return "truncated"
+
+    text = "".join(part.text or "" for part in parts or [] if not part.thought)
+    if not text.strip():
+        return "empty"
+
+    if schema is not None:
+        try:
+            output = parse_agent_output(text, schema)
+        except ValueError:
+            return "schema"
+        # Required text fields left blank
+        for name, field in schema.model_fields.items():
+            if field.is_required() and getattr(output, name) in ("", None):
+                return "low_confidence"
+
+    if response.avg_logprobs is not None and response.avg_logprobs < MIN_AVG_LOGPROB:
+        return "low_confidence"
+    return None
+
+
+def combined_answer(responses: List[LlmResponse]) -> LlmResponse:
+    """
+    The non-partial responses of one model call as a single answer. With
+    streaming, ADK yields the aggregated text and then the closing chunk
+    (finish reason, usage, function calls) as separate final responses.
+    """
+    parts = [part for response in responses if response.content for part in response.content.parts or []]
+    return LlmResponse(
+        content=types.Content(role="model", parts=parts),
+        error_code=next((response.error_code for response in responses if response.error_code), None),
+        finish_reason=next((response.finish_reason for response in reversed(responses) if response.finish_reason), None),
+        avg_logprobs=next((response.avg_logprobs for response in responses if response.avg_logprobs is not None), None),
+        usage_metadata=next((response.usage_metadata for response in reversed(responses) if response.usage_metadata), None),
+    )
+
+
+def _cache_payload(responses: List[LlmResponse]) -> dict:
+    """Final responses as stored in the response cache: no usage, no per-run function call ids."""
+    payloads = []
+    for response in responses:
+        payload = response.model_dump(mode="json", exclude_none=True, exclude={"usage_metadata"})
+        for part in (payload.get("content") or {}).get("parts") or []:
+            if "function_call" in part:
+                part["function_call"].pop("id", None)
+        payloads.append(payload)
+    return {"responses": payloads}
+
+
+class RoutedLlm(BaseLlm):
+    """
+    Model assigned to one stage by the router. Calls the stage's model and,
+    when the final answer fails validation or looks unsure, replays the same
+    request on the next model of the escalation chain. Latency, estimated
+    cost and escalations are recorded per stage and model; with LLM_CACHE
+    on, answers to identical requests are served from the response cache.
+    Every call takes a token from the model's rate limiter; quota errors
+    slow the limiter down and are retried after a jittered backoff.
+    Stages with an output schema hold back the streamed chunks of an answer
+    that may still be escalated, so callers never see two answers for one
+    request; other stages stream as the model writes, and an answer that
+    already went out is kept rather than escalated.
+    """
+
+    stage: str
+    output_schema: Optional[Type[BaseModel]] = None
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        cache_key = llm_request_key(self.model, llm_request) if response_cache is not None else None
+        if cache_key is not None:
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                for payload in cached.get("responses", [cached]):
+                    response = LlmResponse.model_validate(payload)
+                    response.custom_metadata = {**(response.custom_metadata or {}), "cache_hit": True}
+                    yield response
+                return
+
+        chain = escalation_chain(self.model)
+
+        for attempt, name in enumerate(chain):
+            request = llm_request.model_copy(update={"model": name})
+            limiter = get_limiter(f"llm:{name}")
+            started = time.monotonic()
+            # While a larger model may still replace a structured answer, its partial
+            # chunks are held back and only released once the answer is accepted
+            hold_partials = self.output_schema is not None and attempt < len(chain) - 1
+            partials: List[LlmResponse] = []
+            finals: List[LlmResponse] = []
+
+            for retry in range(LLM_MAX_ATTEMPTS):
+                await limiter.acquire(stage_priority(self.stage))
+                streamed = False
+                partials = []
+                finals = []
+                try:
+                    async for response in build_model(name).generate_content_async(request, stream=stream):
+                        if response.partial:
+                            if hold_partials:
+                                partials.append(response)
+                                continue
+                            streamed = True
+                            yield response
+                            continue
+                        finals.append(response)
+                except Exception as e:
+                    status = error_status(e)
+                    # Partials already went out to the caller; a replay would duplicate them
+                    if streamed or status not in RETRYABLE_STATUS_CODES or retry == LLM_MAX_ATTEMPTS - 1:
+                        raise
+                    if status == 429:
+                        limiter.penalize()
+                        retry_after = error_retry_after(e)
+                        if retry_after is not None:
+                            limiter.pause_until(time.monotonic() + retry_after)
+                    metrics.increment("rate_limit_retries_total", resource=limiter.name, reason=str(status))
+                    metrics.increment("llm_retries_total", stage=self.stage, model=name, reason=str(status))
+                    print(f"↷ {self.stage}: {name} returned {status}, retrying")
+                    await asyncio.sleep(backoff_delay(retry))
+                    continue
+                limiter.reward()
+                break
+
+            if not finals:
+                return
+
+            answer = combined_answer(finals)
+            cost = estimate_cost(name, answer.usage_metadata)
+            metrics.observe("route_latency_seconds", time.monotonic() - started, stage=self.stage, model=name)
+            metrics.increment("route_calls_total", stage=self.stage, model=name)
+            metrics.increment("route_cost_usd_total", cost, stage=self.stage, model=name)
+
+            reason = escalation_reason(answer, self.output_schema)
+            if reason is None or attempt == len(chain) - 1 or streamed:
+                # Answers that still failed validation are retried on the next run, not cached
+                if cache_key is not None and reason is None:
+                    response_cache.put(cache_key, _cache_payload(finals))
+                for response in partials + finals:
+                    yield response
+                return
+
+            metrics.increment("route_escalations_total", stage=self.stage, model=name, to=chain[attempt + 1], reason=reason)
+            print(f"⤴ {self.stage}: escalating {name} → {chain[attempt + 1]} ({reason})")
+
+
+def route_model(stage: str, output_schema: Optional[Type[BaseModel]] = None) -> RoutedLlm:
+    """The routed model for `stage`, validated against `output_schema` when given."""
+    name = model_routes.get(stage) or DEFAULT_ROUTES["orchestrator_agent"]
+    return RoutedLlm(model=name, stage=stage, output_schema=output_schema)
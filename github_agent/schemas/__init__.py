@@ -1 +1 @@
-from .main import IssueReaderAgentOutput, RepoNavigatorAgentOutput, CodeFixAgentOutput
\ No newline at end of file
+from .main import IssueReaderAgentOutput, RepoNavigatorAgentOutput, CodeFixAgentOutput, CodeFixHunk, CodeFixPatchOutput, AgentStreamEvent
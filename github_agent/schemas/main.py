@@ -1,5 +1,5 @@
 from pydantic import Field, BaseModel
-from typing import Optional, List
+from typing import Any, Optional, List
 
 
 class IssueReaderAgentOutput(BaseModel):
@@ -24,3 +24,25 @@ class CodeFixAgentOutput(BaseModel):
     updated_file: str = Field(..., description="The updated file content with the fix applied.")
     code_fix_summary: str = Field(..., description="A brief summary of the changes made.")
 
+
+
+class CodeFixHunk(BaseModel):
+    search: str = Field(..., description="Exact lines copied from full_file that need to change.")
+    replace: str = Field(..., description="The lines that replace the search block.")
+
+
+class CodeFixPatchOutput(BaseModel):
+    hunks: List[CodeFixHunk] = Field(..., description="Search/replace edits that apply the fix to full_file.")
+    code_fix_summary: str = Field(..., description="A brief summary of the changes made.")
+
+
+class AgentStreamEvent(BaseModel):
+    type: str = Field(..., description="One of 'stage', 'text', 'field', 'tool_start', 'tool_end' or 'final'.")
+    author: str = Field(..., description="Name of the agent that produced the event.")
+    stage: Optional[str] = Field(None, description="Pipeline stage label, e.g. reader, navigator, fixer, summary.")
+    text: Optional[str] = Field(None, description="Model text; partial chunks for 'text', the full response for 'final'.")
+    tool_name: Optional[str] = Field(None, description="Tool being called, for tool events.")
+    tool_args: Optional[dict] = Field(None, description="Arguments of the tool call, for 'tool_start'.")
+    elapsed: Optional[float] = Field(None, description="Seconds since the run started, or the tool call duration for 'tool_end'.")
+    field: Optional[str] = Field(None, description="Output field completed while streaming, for 'field'.")
+    value: Optional[Any] = Field(None, description="Parsed value of the completed field, for 'field'.")
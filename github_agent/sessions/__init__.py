@@ -0,0 +1 @@
+from .main import create_session_service, skip_completed_stage, record_completed_stage, mark_stage_completed
@@ -0,0 +1,129 @@
+import hashlib
+import os
+import time
+from typing import TYPE_CHECKING, Any, Optional
+
+from github_agent.agent_output import stage_output_error
+from github_agent.metrics import metrics, stop_stage_timer
+
+if TYPE_CHECKING:
+    from google.adk.agents.callback_context import CallbackContext
+    from google.adk.sessions import BaseSessionService
+    from google.genai import types
+
+
+# State key holding {run_key: {"started": unix time, "stages": {agent name: output}}}
+CHECKPOINT_STATE_KEY = "checkpoints"
+
+# A request repeated after this many seconds runs again instead of replaying its checkpoints
+CHECKPOINT_TTL = float(os.getenv("CHECKPOINT_TTL", str(24 * 3600)))
+
+DEFAULT_SESSION_DB_URL = "sqlite:///github_agent_sessions.db"
+
+
+def create_session_service(db_url: Optional[str] = None) -> "BaseSessionService":
+    """
+    Build the session service used by the runners.
+
+    Sessions are stored in SQLite by default so every state write, including
+    each stage's output_key, survives a crash. Pass "memory" to keep them in
+    process only.
+    """
+    db_url = db_url or DEFAULT_SESSION_DB_URL
+    if db_url == "memory":
+        from google.adk.sessions import InMemorySessionService
+
+        return InMemorySessionService()
+
+    # Imported lazily: it pulls in SQLAlchemy
+    from google.adk.sessions.database_session_service import DatabaseSessionService
+
+    return DatabaseSessionService(db_url=db_url)
+
+
+def _run_key(callback_context: "CallbackContext") -> str:
+    """Identify a pipeline run by the user message that started it."""
+    content = callback_context.user_content
+    text = ""
+    if content and content.parts:
+        text = "".join(part.text or "" for part in content.parts)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _live_checkpoints(state) -> dict:
+    """The session's checkpoints without the runs that have expired."""
+    now = time.time()
+    return {
+        run_key: run
+        for run_key, run in (state.get(CHECKPOINT_STATE_KEY) or {}).items()
+        if isinstance(run, dict) and now - run.get("started", 0) <= CHECKPOINT_TTL
+    }
+
+
+def skip_completed_stage(callback_context: "CallbackContext") -> Optional["types.Content"]:
+    """
+    before_agent_callback for chain stages: if this stage already finished
+    for the same request in this session, restore the output it produced
+    for that request and replay it instead of running the model and tools
+    again.
+    """
+    agent = callback_context._invocation_context.agent
+    state = callback_context.state
+    run_key = _run_key(callback_context)
+    stages = _live_checkpoints(state).get(run_key, {}).get("stages", {})
+
+    if agent.name not in stages:
+        _forget_later_stages(callback_context, run_key)
+        return None
+
+    from google.genai import types
+
+    output = stages[agent.name]
+    if agent.output_key:
+        state[agent.output_key] = output
+    print(f"↷ Skipping {agent.name}: '{agent.output_key}' restored from checkpoint")
+    metrics.increment("stage_replays_total", stage=agent.name)
+    # Returning content skips the after-agent callbacks, so the stage timer is stopped here
+    stop_stage_timer(callback_context)
+    return types.Content(role="model", parts=[types.Part(text=str(output))])
+
+
+def _forget_later_stages(callback_context: "CallbackContext", run_key: str) -> None:
+    """A stage that runs again may answer differently, so the checkpoints of the stages after it are dropped."""
+    agent = callback_context._invocation_context.agent
+    siblings = [sibling.name for sibling in agent.parent_agent.sub_agents] if agent.parent_agent else []
+    later = siblings[siblings.index(agent.name) + 1:] if agent.name in siblings else []
+
+    checkpoints = _live_checkpoints(callback_context.state)
+    run = checkpoints.get(run_key)
+    if run is None or not any(name in run["stages"] for name in later):
+        return
+    checkpoints[run_key] = {**run, "stages": {name: output for name, output in run["stages"].items() if name not in later}}
+    callback_context.state[CHECKPOINT_STATE_KEY] = checkpoints
+
+
+def mark_stage_completed(callback_context: "CallbackContext", agent_name: str, output: Any) -> None:
+    """Checkpoint `agent_name` with `output` for the running request, e.g. when another stage produced its output."""
+    state = callback_context.state
+    run_key = _run_key(callback_context)
+    checkpoints = _live_checkpoints(state)
+    run = checkpoints.get(run_key) or {"started": time.time(), "stages": {}}
+    checkpoints[run_key] = {**run, "stages": {**run["stages"], agent_name: output}}
+    state[CHECKPOINT_STATE_KEY] = checkpoints
+
+
+def record_completed_stage(callback_context: "CallbackContext") -> None:
+    """
+    after_agent_callback for chain stages: checkpoint a stage once its
+    output_key is written. Outputs that failed validation or whose fix did
+    not apply are not checkpointed, so a rerun retries the stage.
+    """
+    agent = callback_context._invocation_context.agent
+    state = callback_context.state
+    if not agent.output_key or state.get(agent.output_key) is None:
+        return None
+    if stage_output_error(agent.output_key, state.get(agent.output_key)):
+        return None
+
+    mark_stage_completed(callback_context, agent.name, state.get(agent.output_key))
+    return None
@@ -0,0 +1 @@
+from .main import CodeSlice, SliceSpliceError, register_slicer, slice_source, slice_python, slice_navigation, slice_code_details
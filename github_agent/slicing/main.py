@@ -0,0 +1,329 @@
+import ast
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from github_agent.agent_output import loads_agent_json
+
+
+# Files shorter than this are sent to the fixer whole
+MIN_SLICE_LINES = int(os.getenv("CODE_SLICE_MIN_LINES", "200"))
+
+# A slice keeping more than this share of the file is not worth the markers
+MAX_SLICE_FRACTION = 0.8
+
+# Levels of called helpers pulled in after the target (helpers of helpers, ...)
+HELPER_DEPTH = 1
+
+# Gaps up to this many lines are kept rather than replaced by a marker
+MIN_GAP_LINES = 3
+
+# "# ... lines 12-340 omitted ..." (1-based, inclusive); the comment prefix depends on the language
+OMITTED_MARKER = re.compile(r"^\s*(?:#|//|--) \.\.\. lines (\d+)-(\d+) omitted \.\.\.\s*$")
+
+# (source, target) -> 0-based [start, end) line ranges to keep, or None when the target is not found
+Slicer = Callable[[str, str], Optional[List[Tuple[int, int]]]]
+
+
+class SliceSpliceError(ValueError):
+    """Raised when an edited slice cannot be put back into the full file."""
+
+
+@dataclass
+class CodeSlice:
+    """
+    The parts of a file the fixer needs. `ranges` are sorted, disjoint
+    0-based [start, end) line ranges of `source`; every run of lines between
+    them is shown as one marker comment naming the lines it stands for.
+    """
+
+    source: str
+    ranges: List[Tuple[int, int]]
+    comment: str = "#"
+
+    def _gaps(self) -> List[Tuple[int, int]]:
+        total = len(self.source.splitlines())
+        gaps = []
+        previous = 0
+        for start, end in self.ranges:
+            if start > previous:
+                gaps.append((previous, start))
+            previous = end
+        if previous < total:
+            gaps.append((previous, total))
+        return gaps
+
+    @property
+    def kept_lines(self) -> int:
+        return sum(end - start for start, end in self.ranges)
+
+    @property
+    def total_lines(self) -> int:
+        return len(self.source.splitlines())
+
+    @property
+    def text(self) -> str:
+        lines = self.source.splitlines(keepends=True)
+        newline = "\r\n" if "\r\n" in self.source else "\n"
+        parts = []
+        previous = 0
+        for start, end in self.ranges:
+            if start > previous:
+                parts.append(f"{self.comment} ... lines {previous + 1}-{start} omitted ...{newline}")
+            parts.extend(lines[start:end])
+            previous = end
+        if previous < len(lines):
+            if parts and not parts[-1].endswith("\n"):
+                parts.append(newline)
+            parts.append(f"{self.comment} ... lines {previous + 1}-{len(lines)} omitted ...{newline}")
+        return "".join(parts)
+
+    def splice(self, edited: str) -> str:
+        """
+        Put an edited copy of `text` back into the full file: every marker is
+        replaced by the lines it stands for, everything else is taken from
+        `edited`. The markers must come back unchanged and in order.
+        """
+        lines = self.source.splitlines(keepends=True)
+        newline = "\r\n" if "\r\n" in self.source else "\n"
+        pieces: List[List[str]] = [[]]
+        gaps = []
+        for line in edited.splitlines(keepends=True):
+            match = OMITTED_MARKER.match(line)
+            if match:
+                gaps.append((int(match[1]) - 1, int(match[2])))
+                pieces.append([])
+            else:
+                pieces[-1].append(line)
+
+        if gaps != self._gaps():
+            raise SliceSpliceError("The edited slice added, removed or changed an omitted-lines marker")
+
+        out = list(pieces[0])
+        for (start, end), piece in zip(gaps, pieces[1:]):
+            if out and not out[-1].endswith("\n"):
+                out[-1] += newline
+            out.extend(lines[start:end])
+            out.extend(piece)
+        return "".join(out)
+
+
+SLICERS: Dict[str, Tuple[Slicer, str]] = {}
+
+
+def register_slicer(extensions: Iterable[str], slicer: Slicer, comment: str = "#") -> None:
+    """Use `slicer` for files with these extensions; markers are written as `comment` lines."""
+    for extension in extensions:
+        SLICERS[extension.lower().lstrip(".")] = (slicer, comment)
+
+
+def _merge(ranges: Iterable[Tuple[int, int]], lines: List[str]) -> List[Tuple[int, int]]:
+    """Sort and merge ranges, absorbing short or blank gaps between them."""
+    merged: List[List[int]] = []
+    for start, end in sorted(ranges):
+        if merged:
+            gap = lines[merged[-1][1]:start]
+            if start <= merged[-1][1] or len(gap) < MIN_GAP_LINES or not any(line.strip() for line in gap):
+                merged[-1][1] = max(merged[-1][1], end)
+                continue
+        merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def slice_source(source: str, path: str, target: str, min_lines: Optional[int] = None) -> Optional[CodeSlice]:
+    """
+    Slice `source` down to `target` and what it needs, using the slicer
+    registered for the file's extension. Returns None when the file is
+    short, the language has no slicer, the target cannot be found, or the
+    slice would keep most of the file anyway.
+    """
+    min_lines = MIN_SLICE_LINES if min_lines is None else min_lines
+    lines = source.splitlines()
+    extension = path.rsplit(".", 1)[-1].lower() if "." in path else ""
+    if len(lines) < min_lines or extension not in SLICERS or not target.strip():
+        return None
+
+    slicer, comment = SLICERS[extension]
+    ranges = slicer(source, target)
+    if not ranges:
+        return None
+
+    code_slice = CodeSlice(source=source, ranges=_merge(ranges, lines), comment=comment)
+    if code_slice.kept_lines > len(lines) * MAX_SLICE_FRACTION:
+        return None
+    return code_slice
+
+
+def slice_navigation(repo_navigation: Any) -> Optional[CodeSlice]:
+    """The slice of the navigator's `full_file` around its `target_function`, if one applies."""
+    try:
+        repo_navigation = loads_agent_json(repo_navigation)
+    except ValueError:
+        return None
+    if not isinstance(repo_navigation, dict) or not isinstance(repo_navigation.get("full_file"), str):
+        return None
+    return slice_source(
+        repo_navigation["full_file"],
+        str(repo_navigation.get("target_file") or ""),
+        str(repo_navigation.get("target_function") or ""),
+    )
+
+
+def slice_code_details(repo_navigation: Any) -> Any:
+    """Navigator output with `full_file` replaced by its slice, for the fixer's instruction."""
+    code_slice = slice_navigation(repo_navigation)
+    if code_slice is None:
+        return repo_navigation
+    return dict(loads_agent_json(repo_navigation), full_file=code_slice.text)
+
+
+# Words around the name in a navigator's target_function ("method verify_token of class Auth")
+TARGET_FILLER_WORDS = {"def", "async", "class", "function", "method", "and", "of", "in", "the"}
+
+def _target_names(target: str) -> List[List[str]]:
+    """'AuthService.verify_token()', 'def foo, bar' -> [['AuthService', 'verify_token'], ['foo'], ['bar']]"""
+    names = []
+    for part in re.split(r"[,\s]+", re.sub(r"\([^)]*\)", "", target)):
+        part = part.strip("`'\":")
+        if part and part.lower() not in TARGET_FILLER_WORDS:
+            names.append([name for name in re.split(r"\.|::", part) if name])
+    return [name for name in names if name]
+
+
+def _start_line(node: ast.AST, lines: List[str]) -> int:
+    """0-based first line of a definition, including decorators and the comments right above it."""
+    start = min([node.lineno] + [decorator.lineno for decorator in getattr(node, "decorator_list", [])]) - 1
+    while start > 0 and lines[start - 1].lstrip().startswith("#"):
+        start -= 1
+    return start
+
+
+def _span(node: ast.AST, lines: List[str]) -> Tuple[int, int]:
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return _start_line(node, lines), node.end_lineno
+    return node.lineno - 1, node.end_lineno
+
+
+def _is_import_block(node: ast.AST) -> bool:
+    """try/if blocks that only import, e.g. `try: import ujson as json except ImportError: import json`."""
+    if not isinstance(node, (ast.Try, ast.If)):
+        return False
+    bodies = [node.body, node.orelse] + [handler.body for handler in getattr(node, "handlers", [])]
+    return all(
+        isinstance(statement, (ast.Import, ast.ImportFrom, ast.Pass)) or _is_import_block(statement)
+        for body in bodies for statement in body
+    )
+
+
+def _index_definitions(
+    body: List[ast.stmt], prefix: str, parents: Tuple[ast.ClassDef, ...], index: Dict[str, Tuple[ast.AST, Tuple[ast.ClassDef, ...]]]
+) -> None:
+    """qualified name -> (definition, enclosing classes) for module- and class-level definitions."""
+    for node in body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            name = f"{prefix}{node.name}"
+            index.setdefault(name, (node, parents))
+            if isinstance(node, ast.ClassDef):
+                _index_definitions(node.body, f"{name}.", parents + (node,), index)
+
+
+def _find_targets(tree: ast.Module, index: dict, target: str) -> List[Tuple[ast.AST, Tuple[ast.ClassDef, ...]]]:
+    found = []
+    for names in _target_names(target):
+        dotted = ".".join(names)
+        matches = [value for name, value in index.items() if name == dotted or name.endswith("." + dotted)]
+        if not matches:
+            # A module path in front ("pkg.auth.verify_token") or a function nested in another one
+            matches = [value for name, value in index.items() if name.rsplit(".", 1)[-1] == names[-1]]
+        if not matches:
+            for top in tree.body:
+                if isinstance(top, (ast.FunctionDef, ast.AsyncFunctionDef)) and any(
+                    isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and node.name == names[-1]
+                    for node in ast.walk(top)
+                ):
+                    matches.append((top, ()))
+        for match in matches:
+            if match not in found:
+                found.append(match)
+    return found
+
+
+def _referenced_names(node: ast.AST) -> Tuple[Set[str], Set[str]]:
+    """Bare names loaded in `node`, and attributes accessed on self/cls."""
+    names, attributes = set(), set()
+    for child in ast.walk(node):
+        if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Load):
+            names.add(child.id)
+        elif isinstance(child, ast.Attribute) and isinstance(child.value, ast.Name) and child.value.id in ("self", "cls"):
+            attributes.add(child.attr)
+    return names, attributes
+
+
+def _module_assignments(tree: ast.Module) -> Dict[str, ast.stmt]:
+    assignments = {}
+    for node in tree.body:
+        targets = node.targets if isinstance(node, ast.Assign) else [node.target] if isinstance(node, ast.AnnAssign) else []
+        for target in targets:
+            for name in ast.walk(target):
+                if isinstance(name, ast.Name):
+                    assignments.setdefault(name.id, node)
+    return assignments
+
+
+def slice_python(source: str, target: str) -> Optional[List[Tuple[int, int]]]:
+    """
+    Keep the target function/class/method with its module imports, the
+    header and class-level attributes of every enclosing class, the
+    module-level constants it reads, and the functions, classes and
+    methods it calls (HELPER_DEPTH levels deep).
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return None
+
+    lines = source.splitlines()
+    index: Dict[str, Tuple[ast.AST, Tuple[ast.ClassDef, ...]]] = {}
+    _index_definitions(tree.body, "", (), index)
+    targets = _find_targets(tree, index, target)
+    if not targets:
+        return None
+
+    top_level = {node.name: node for node in tree.body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))}
+    assignments = _module_assignments(tree)
+    ranges = [_span(node, lines) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)) or _is_import_block(node)]
+
+    seen: Set[int] = set()
+    queue = [(node, parents, 0) for node, parents in targets]
+    while queue:
+        node, parents, depth = queue.pop(0)
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        ranges.append(_span(node, lines))
+
+        for parent in parents:
+            # Class line, docstring and class-level attributes, but not the other methods
+            first = next((child for child in parent.body if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))), None)
+            ranges.append((_start_line(parent, lines), _start_line(first, lines) if first else parent.end_lineno))
+            ranges.extend(
+                _span(child, lines) for child in parent.body
+                if not isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+            )
+
+        names, attributes = _referenced_names(node)
+        for name in names:
+            if name in assignments:
+                ranges.append(_span(assignments[name], lines))
+            if depth < HELPER_DEPTH and name in top_level:
+                queue.append((top_level[name], (), depth + 1))
+        if depth < HELPER_DEPTH and parents:
+            for child in parents[-1].body:
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)) and child.name in attributes:
+                    queue.append((child, parents, depth + 1))
+
+    return ranges
+
+
+register_slicer(["py", "pyi"], slice_python)
@@ -1 +1 @@
-from .main import issue_reader_agent_prompt, orchestrator_agent_prompt, repo_navigator_agent_prompt, code_fix_agent_prompt, summary_agent_prompt
\ No newline at end of file
+from .main import issue_reader_agent_static_prompt, issue_reader_agent_prompt, orchestrator_agent_prompt, repo_navigator_agent_static_prompt, repo_navigator_agent_prompt, code_fix_agent_static_prompt, code_fix_agent_prompt, code_fix_agent_patch_static_prompt, code_fix_agent_patch_prompt, summary_agent_static_prompt, summary_agent_prompt
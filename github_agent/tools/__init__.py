@@ -1 +1 @@
-from .main import get_github_owner, github_mcp
+from .main import get_github_owner, get_github_mcp, get_github_tools, close_github_mcp, get_github_token, tool_cache, tool_flights
@@ -1,55 +1,270 @@
+import asyncio
 import os
 from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset
 from google.adk.tools.mcp_tool.mcp_session_manager import StreamableHTTPConnectionParams
-import httpx
 from dotenv import load_dotenv
 from google.adk.tools.tool_context import ToolContext
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.base_toolset import BaseToolset
+from google.adk.agents.readonly_context import ReadonlyContext
+from typing import Optional, List
+
+from github_agent.cache import ToolResultCache
+from github_agent.coalescing import COALESCABLE_TOOLS, SingleFlight, coalesce_key
+from github_agent.git_mirror import MIRROR_TOOLS, GitMirror, GitMirrorError, close_git_mirror, get_git_mirror
+from github_agent.metrics import metrics
+from github_agent.github_api import fetch_authenticated_user
+from github_agent.rate_limit import backoff_delay, get_limiter, stage_priority
 
 
 load_dotenv()
 
-# Get your GitHub PAT from environment
-github_token = os.getenv("GITHUB_PERSONAL_ACCESS_TOKEN")
-if not github_token:
-    raise ValueError("Set GITHUB_PERSONAL_ACCESS_TOKEN in env")
-
-
-# Create MCPToolset for GitHub MCP server
-github_mcp = MCPToolset(
-    connection_params=StreamableHTTPConnectionParams(
-        url="https://api.githubcopilot.com/mcp/",
-        headers={
-            "Authorization": f"Bearer {github_token}"
-        }
-    ),
-    tool_filter=[
-        "search_repositories",
-        "get_file_contents",
-        "list_commits",
-        "get_commit",
-        "create_or_update_file",
-        "create_branch",
-        "delete_file",
-        "list_issues",
-        "list_pull_requests",
-        "create_pull_request",
-        "update_pull_request",
-        "get_me"
-    ]
+# Attempts for a read-only MCP call the server answered with a rate-limit error
+MCP_MAX_ATTEMPTS = 4
+
+# The GitHub MCP tools the chain uses; all read-only, the agents only suggest fixes
+GITHUB_TOOLS = [
+    "search_repositories",
+    "get_file_contents",
+    "list_commits",
+    "get_commit",
+    "list_issues",
+    "list_pull_requests",
+    "get_me",
+]
+
+# Tools each chain stage is offered; stages not listed get none
+AGENT_TOOLS = {
+    "issue_reader_agent": ["list_issues", "get_file_contents", "search_repositories", "list_commits", "get_commit", "list_pull_requests"],
+    "repo_navigator_agent": ["search_repositories", "get_file_contents", "list_commits", "get_commit", "list_pull_requests", "get_me"],
+}
+
+
+def _is_rate_limit_error(result) -> bool:
+    """An MCP error result whose text reports GitHub's primary or secondary rate limit."""
+    if not isinstance(result, dict) or not result.get("isError"):
+        return False
+    text = " ".join(str(item.get("text", "")) for item in result.get("content") or [] if isinstance(item, dict))
+    return "rate limit" in text.lower()
+
+
+class RateLimitedMCPTool(BaseTool):
+    """
+    Wraps an MCP tool so every upstream call takes a token from the shared
+    "github" limiter, ordered by the calling stage's priority. Read-only
+    tools are retried with jittered backoff when GitHub reports a rate limit;
+    writes are never replayed.
+    """
+
+    def __init__(self, tool: BaseTool, retry: bool):
+        super().__init__(name=tool.name, description=tool.description)
+        self._tool = tool
+        self._retry = retry
+
+    def _get_declaration(self):
+        return self._tool._get_declaration()
+
+    async def run_async(self, *, args: dict, tool_context: ToolContext):
+        limiter = get_limiter("github")
+        priority = stage_priority(tool_context.agent_name if tool_context is not None else None)
+        attempts = MCP_MAX_ATTEMPTS if self._retry else 1
+
+        for attempt in range(attempts):
+            await limiter.acquire(priority)
+            result = await self._tool.run_async(args=args, tool_context=tool_context)
+            if not _is_rate_limit_error(result):
+                limiter.reward()
+                return result
+
+            limiter.penalize()
+            if attempt < attempts - 1:
+                metrics.increment("rate_limit_retries_total", resource="github", reason="mcp_rate_limited")
+                metrics.increment("tool_retries_total", stage=tool_context.agent_name if tool_context is not None else "none", tool=self.name)
+                await asyncio.sleep(backoff_delay(attempt + 1))
+        return result
+
+
+class CachedMCPTool(BaseTool):
+    """
+    Wraps a read-only MCP tool: serves it from the tool result cache when
+    possible and coalesces identical in-flight calls into one request.
+    """
+
+    def __init__(self, tool: BaseTool, cache: ToolResultCache, flights: SingleFlight):
+        super().__init__(name=tool.name, description=tool.description)
+        self._tool = tool
+        self._cache = cache
+        self._flights = flights
+
+    def _get_declaration(self):
+        return self._tool._get_declaration()
+
+    async def run_async(self, *, args: dict, tool_context: ToolContext):
+        cacheable = self._cache.is_cacheable(self.name)
+        if cacheable:
+            cached = self._cache.get(self.name, args)
+            if cached is not None:
+                return cached
+
+        async def call():
+            result = await self._tool.run_async(args=args, tool_context=tool_context)
+            if cacheable:
+                self._cache.put(self.name, args, result)
+            return result
+
+        key = coalesce_key(self.name, args)
+        if self._flights.in_flight(key):
+            metrics.increment("tool_calls_coalesced_total", tool=self.name)
+        return await self._flights.do(key, call)
+
+
+class GitMirrorTool(BaseTool):
+    """
+    Answers a repository read (file contents, commit history) from the local
+    git mirror under the MCP tool's own name and declaration. Anything the
+    mirror cannot serve (clone failure, unknown ref, unsupported argument)
+    goes to the remote tool instead.
+    """
+
+    def __init__(self, tool: BaseTool, mirror: GitMirror, fallback: BaseTool):
+        super().__init__(name=tool.name, description=tool.description)
+        self._tool = tool
+        self._mirror = mirror
+        self._fallback = fallback
+
+    def _get_declaration(self):
+        return self._tool._get_declaration()
+
+    async def run_async(self, *, args: dict, tool_context: ToolContext):
+        try:
+            text = await self._mirror.call(self.name, args)
+        except GitMirrorError as e:
+            metrics.increment("git_mirror_reads_total", tool=self.name, outcome="fallback")
+            print(f"⚠️ git mirror could not serve {self.name}, using the MCP server: {e}")
+            return await self._fallback.run_async(args=args, tool_context=tool_context)
+
+        metrics.increment("git_mirror_reads_total", tool=self.name, outcome="local")
+        return {"content": [{"type": "text", "text": text}], "isError": False}
+
+
+class CachedMCPToolset(MCPToolset):
+    """
+    MCPToolset whose tools all go through the shared GitHub rate limiter;
+    read-only tools are also cached and coalesced. With GIT_MIRROR_DIR set,
+    file and commit reads are served from local mirror clones first.
+    """
+
+    def __init__(self, *, cache: ToolResultCache, flights: Optional[SingleFlight] = None, **kwargs):
+        super().__init__(**kwargs)
+        self._cache = cache
+        self._flights = flights or SingleFlight()
+        self._tools: Optional[List[BaseTool]] = None
+        self._tools_lock = asyncio.Lock()
+
+    async def get_tools(self, readonly_context: Optional[ReadonlyContext] = None) -> List[BaseTool]:
+        """The wrapped tools; the server is asked for its tool list once, not on every model request."""
+        if self._tools is None:
+            async with self._tools_lock:
+                if self._tools is None:
+                    self._tools = await self._list_tools(readonly_context)
+                    metrics.increment("mcp_list_tools_total")
+        return list(self._tools)
+
+    async def _list_tools(self, readonly_context: Optional[ReadonlyContext]) -> List[BaseTool]:
+        mirror = get_git_mirror()
+        wrapped = []
+        for tool in await super().get_tools(readonly_context):
+            read_only = self._cache.is_cacheable(tool.name) or tool.name in COALESCABLE_TOOLS
+            # The limiter sits below the cache and flights: only real upstream calls take a token
+            remote = RateLimitedMCPTool(tool, retry=read_only)
+            if read_only:
+                remote = CachedMCPTool(remote, self._cache, self._flights)
+            wrapped.append(GitMirrorTool(tool, mirror, fallback=remote) if mirror and tool.name in MIRROR_TOOLS else remote)
+        return wrapped
+
+    async def close(self) -> None:
+        await super().close()
+        self._tools = None
+
+
+class GitHubToolView(BaseToolset):
+    """
+    One agent's subset of the shared GitHub toolset. Views share its MCP
+    connection, cache and tool list; only the declarations sent to the
+    model differ.
+    """
+
+    def __init__(self, toolset: CachedMCPToolset, tool_names: List[str]):
+        super().__init__(tool_filter=list(tool_names))
+        self._toolset = toolset
+
+    async def get_tools(self, readonly_context: Optional[ReadonlyContext] = None) -> List[BaseTool]:
+        return [tool for tool in await self._toolset.get_tools(readonly_context) if self._is_tool_selected(tool, readonly_context)]
+
+    async def close(self) -> None:
+        # The shared toolset owns the connection, see close_github_mcp
+        return None
+
+
+# Shared cache for file contents and commit listings fetched over MCP
+tool_cache = ToolResultCache(
+    max_bytes=int(os.getenv("GITHUB_AGENT_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+    cache_dir=os.getenv("GITHUB_AGENT_CACHE_DIR"),
 )
 
+# Identical read-only MCP calls in flight at the same time share one request
+tool_flights = SingleFlight()
+
+_github_mcp: Optional[CachedMCPToolset] = None
+
+
+def get_github_token() -> str:
+    # Get your GitHub PAT from environment
+    github_token = os.getenv("GITHUB_PERSONAL_ACCESS_TOKEN")
+    if not github_token:
+        raise ValueError("Set GITHUB_PERSONAL_ACCESS_TOKEN in env")
+    return github_token
+
+
+def get_github_mcp() -> CachedMCPToolset:
+    """The process-wide MCPToolset for the GitHub MCP server, created on first use."""
+    global _github_mcp
+    if _github_mcp is not None:
+        return _github_mcp
+
+    _github_mcp = CachedMCPToolset(
+        cache=tool_cache,
+        flights=tool_flights,
+        connection_params=StreamableHTTPConnectionParams(
+            url=os.getenv("GITHUB_MCP_URL", "https://api.githubcopilot.com/mcp/"),
+            headers={
+                "Authorization": f"Bearer {get_github_token()}"
+            }
+        ),
+        tool_filter=GITHUB_TOOLS,
+    )
+    return _github_mcp
+
+
+def get_github_tools(agent_name: str) -> List[BaseToolset]:
+    """The tools offered to a chain stage: a view of the shared GitHub toolset, or nothing."""
+    tool_names = AGENT_TOOLS.get(agent_name)
+    return [GitHubToolView(get_github_mcp(), tool_names)] if tool_names else []
+
+
+async def close_github_mcp() -> None:
+    """Close the MCP sessions of the shared toolset, if it was ever created."""
+    global _github_mcp
+    if _github_mcp is not None:
+        await _github_mcp.close()
+    _github_mcp = None
+    await close_git_mirror()
+
 
 async def get_github_owner(tool_context: ToolContext) -> str:
     """Fetch GitHub username from API"""
 
-    async with httpx.AsyncClient() as client:
-        r = await client.get(
-            "https://api.github.com/user",
-            headers={"Authorization": f"Bearer {github_token}"}
-        )
-
-        r.raise_for_status()
-        user = r.json()["login"]
+    user = await fetch_authenticated_user(get_github_token())
 
     # Update session state only when called as a tool
     if tool_context is not None:
@@ -0,0 +1 @@
+from .main import create_webhook_app, verify_signature, TriageQueue, TriageJob, QueueFullError
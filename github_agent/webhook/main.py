@@ -0,0 +1,306 @@
+import argparse
+import asyncio
+import collections
+import hashlib
+import hmac
+import json
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional, Tuple
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from github_agent.agent import create_runner, get_app
+from github_agent.batch import triage_issue
+from github_agent.github_api import close_http_client
+from github_agent.metrics import dump_metrics, metrics
+
+if TYPE_CHECKING:
+    from google.adk.runners import Runner
+
+
+# Issue actions that start a triage; edits, labels, comments etc. are ignored
+TRIAGE_ACTIONS = {"opened", "reopened"}
+
+# Finished jobs kept for the status endpoint, and delivery ids remembered for redelivery dedup
+JOB_HISTORY = 500
+DELIVERY_HISTORY = 5000
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    """Check GitHub's X-Hub-Signature-256 header (HMAC-SHA256 of the raw body) in constant time."""
+    if not signature or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature.removeprefix("sha256="))
+
+
+def issue_event_ref(payload: dict) -> Optional[dict]:
+    """owner/repo/issue_number of an `issues` event, or None when the payload lacks them."""
+    issue, repository = payload.get("issue"), payload.get("repository")
+    if not isinstance(issue, dict) or not isinstance(repository, dict) or not isinstance(repository.get("owner"), dict):
+        return None
+    owner, repo, number = repository["owner"].get("login"), repository.get("name"), issue.get("number")
+    if not isinstance(owner, str) or not isinstance(repo, str) or not isinstance(number, int) or isinstance(number, bool):
+        return None
+    return {"owner": owner, "repo": repo, "issue_number": str(number)}
+
+
+@dataclass
+class TriageJob:
+    owner: str
+    repo: str
+    issue_number: str
+    delivery: Optional[str] = None
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    status: str = "queued"
+    enqueued_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.owner}/{self.repo}#{self.issue_number}".lower()
+
+    @property
+    def ref(self) -> dict:
+        return {"owner": self.owner, "repo": self.repo, "issue_number": self.issue_number}
+
+    def to_dict(self) -> dict:
+        return dict(asdict(self), key=self.key)
+
+
+class QueueFullError(Exception):
+    """Raised when the triage queue is at capacity."""
+
+
+class TriageQueue:
+    """
+    Bounded queue of triage jobs drained by a pool of async workers.
+
+    An issue that is already queued or running is not enqueued again, and a
+    redelivered webhook (same X-GitHub-Delivery id) is ignored. When the
+    queue is full, `submit` raises QueueFullError so the caller can push
+    back instead of buffering without limit.
+    """
+
+    def __init__(self, max_size: int = 100, workers: int = 4, timeout: float = 600.0, output_path: Optional[str] = None):
+        self.max_size = max_size
+        self.worker_count = workers
+        self.timeout = timeout
+        self.output_path = output_path
+        self._queue: "asyncio.Queue[TriageJob]" = asyncio.Queue(maxsize=max_size)
+        self._active: Dict[str, TriageJob] = {}
+        self._history: Deque[TriageJob] = collections.deque(maxlen=JOB_HISTORY)
+        self._deliveries: Dict[str, str] = {}
+        self._workers: List[asyncio.Task] = []
+
+    def submit(self, ref: dict, delivery: Optional[str] = None) -> Tuple[TriageJob, bool]:
+        """Enqueue a triage of `ref`; returns (job, created), where an existing job for the issue is reused."""
+        job = TriageJob(owner=ref["owner"], repo=ref["repo"], issue_number=str(ref["issue_number"]), delivery=delivery)
+
+        if delivery and delivery in self._deliveries:
+            previous = self.get(self._deliveries[delivery])
+            if previous is not None:
+                return previous, False
+        if job.key in self._active:
+            return self._active[job.key], False
+
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError(f"Triage queue is full ({self.max_size} jobs)")
+
+        self._active[job.key] = job
+        if delivery:
+            self._deliveries[delivery] = job.id
+            if len(self._deliveries) > DELIVERY_HISTORY:
+                self._deliveries.pop(next(iter(self._deliveries)))
+        return job, True
+
+    def get(self, job_id: str) -> Optional[TriageJob]:
+        for job in list(self._active.values()) + list(self._history):
+            if job.id == job_id:
+                return job
+        return None
+
+    def status(self) -> dict:
+        finished = collections.Counter(job.status for job in self._history)
+        return {
+            "workers": self.worker_count,
+            "capacity": self.max_size,
+            "queued": self._queue.qsize(),
+            "running": sum(1 for job in self._active.values() if job.status == "running"),
+            "finished": dict(finished),
+            "active_jobs": [job.to_dict() for job in self._active.values()],
+            "recent_jobs": [job.to_dict() for job in list(self._history)[-20:]],
+        }
+
+    def start(self, runner: "Runner") -> None:
+        self._workers = [asyncio.create_task(self._work(runner)) for _ in range(self.worker_count)]
+
+    async def stop(self) -> None:
+        """Cancel the workers; interrupted issues resume from their checkpoints on the next delivery."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _work(self, runner: "Runner") -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(runner, job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, runner: "Runner", job: TriageJob) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        metrics.observe("webhook_queue_wait_seconds", job.started_at - job.enqueued_at)
+
+        try:
+            record = await triage_issue(runner, job.ref, self.timeout)
+            job.status = record["status"]
+            job.error = record.get("error")
+        except Exception as e:
+            record = dict(job.ref, status="error", error=str(e))
+            job.status, job.error = "error", str(e)
+        finally:
+            job.finished_at = time.time()
+            self._active.pop(job.key, None)
+            self._history.append(job)
+
+        metrics.increment("webhook_jobs_total", status=job.status)
+        print(f"[{job.status}] {job.key} ({job.finished_at - job.started_at:.1f}s)")
+        if self.output_path:
+            with open(self.output_path, "a", encoding="utf-8") as output:
+                output.write(json.dumps(dict(record, job_id=job.id), default=str) + "\n")
+
+
+def create_webhook_app(
+    secret: Optional[str] = None,
+    workers: int = 4,
+    queue_size: int = 100,
+    timeout: float = 600.0,
+    output_path: Optional[str] = None,
+) -> Starlette:
+    """
+    Starlette app serving POST /webhook (GitHub `issues` events), GET /status
+    and GET /status/{job_id}. Workers run chain_agent on each queued issue in
+    its own session, as in batch triage.
+    """
+    secret = secret or os.getenv("GITHUB_WEBHOOK_SECRET")
+    if not secret:
+        raise ValueError("Set GITHUB_WEBHOOK_SECRET in env")
+
+    queue = TriageQueue(max_size=queue_size, workers=workers, timeout=timeout, output_path=output_path)
+
+    async def webhook(request: Request) -> JSONResponse:
+        body = await request.body()
+        if not verify_signature(secret, body, request.headers.get("x-hub-signature-256")):
+            metrics.increment("webhook_deliveries_total", outcome="bad_signature")
+            return JSONResponse({"error": "invalid signature"}, status_code=401)
+
+        event = request.headers.get("x-github-event")
+        if event == "ping":
+            return JSONResponse({"status": "pong"})
+
+        try:
+            payload = json.loads(body)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            payload = None
+        if not isinstance(payload, dict):
+            metrics.increment("webhook_deliveries_total", outcome="malformed")
+            return JSONResponse({"error": "invalid JSON payload"}, status_code=400)
+
+        action = payload.get("action")
+        issue = payload.get("issue")
+        # Pull requests are issues too, but there is nothing to triage
+        if event != "issues" or action not in TRIAGE_ACTIONS or (isinstance(issue, dict) and "pull_request" in issue):
+            metrics.increment("webhook_deliveries_total", outcome="ignored")
+            return JSONResponse({"status": "ignored", "event": event, "action": action}, status_code=202)
+
+        ref = issue_event_ref(payload)
+        if ref is None:
+            metrics.increment("webhook_deliveries_total", outcome="malformed")
+            return JSONResponse({"error": "issues event without issue number or repository"}, status_code=400)
+        try:
+            job, created = queue.submit(ref, delivery=request.headers.get("x-github-delivery"))
+        except QueueFullError as e:
+            metrics.increment("webhook_deliveries_total", outcome="rejected")
+            return JSONResponse({"error": str(e)}, status_code=503, headers={"Retry-After": "60"})
+
+        metrics.increment("webhook_deliveries_total", outcome="queued" if created else "duplicate")
+        return JSONResponse({"status": "queued" if created else "duplicate", "job": job.to_dict()}, status_code=202)
+
+    async def status(request: Request) -> JSONResponse:
+        return JSONResponse(queue.status())
+
+    async def job_status(request: Request) -> JSONResponse:
+        job = queue.get(request.path_params["job_id"])
+        if job is None:
+            return JSONResponse({"error": "unknown job"}, status_code=404)
+        return JSONResponse(job.to_dict())
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        from github_agent.tools import close_github_mcp
+
+        runner = create_runner(get_app().chain_agent)
+        queue.start(runner)
+        print(f"✓ Webhook server ready: {workers} workers, queue of {queue_size}")
+        try:
+            yield
+        finally:
+            await queue.stop()
+            await close_github_mcp()
+            await close_http_client()
+
+    app = Starlette(
+        routes=[
+            Route("/webhook", webhook, methods=["POST"]),
+            Route("/status", status, methods=["GET"]),
+            Route("/status/{job_id}", job_status, methods=["GET"]),
+        ],
+        lifespan=lifespan,
+    )
+    app.state.queue = queue
+    return app
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Triage GitHub issues as their webhooks arrive.")
+    parser.add_argument("--host", default=os.getenv("WEBHOOK_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("WEBHOOK_PORT", "8080")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEBHOOK_WORKERS", "4")), help="Issues triaged at once")
+    parser.add_argument("--queue-size", type=int, default=int(os.getenv("WEBHOOK_QUEUE_SIZE", "100")), help="Queued issues before deliveries get 503")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Per-issue timeout in seconds")
+    parser.add_argument("--output", help="Append every finished job's result here (JSON lines)")
+    parser.add_argument("--metrics-output", help="Write latency/token metrics here on shutdown (.prom for Prometheus text, else JSON)")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    app = create_webhook_app(
+        workers=args.workers,
+        queue_size=args.queue_size,
+        timeout=args.timeout,
+        output_path=args.output,
+    )
+    try:
+        uvicorn.run(app, host=args.host, port=args.port, log_level="info")
+    finally:
+        if args.metrics_output:
+            dump_metrics(args.metrics_output)
+
+
+if __name__ == "__main__":
+    main()
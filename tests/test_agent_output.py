@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from github_agent.agent_output import IncrementalJSONParser, loads_agent_json, repair_json
+
+
+def test_repair_json_fixes_common_model_mistakes():
+    text = 'Here you go:\n```json\n{"a": "line one\nline two", "b": True, "c": None, "d": "C:\\dir",}\n```\nThanks'
+
+    assert json.loads(repair_json(text)) == {"a": "line one\nline two", "b": True, "c": None, "d": "C:\\dir"}
+
+
+def test_repair_json_escapes_stray_quotes_and_triple_quoted_blocks():
+    text = '{"title": "say "hi" twice", "full_file": """def f():\n    return "x"\n"""}'
+
+    assert json.loads(repair_json(text)) == {"title": 'say "hi" twice', "full_file": 'def f():\n    return "x"\n'}
+
+
+def test_repair_json_closes_truncated_output():
+    assert json.loads(repair_json('{"a": [1, 2, {"b": "unfinished')) == {"a": [1, 2, {"b": "unfinished"}]}
+
+
+def test_loads_agent_json_rejects_output_without_an_object():
+    with pytest.raises(ValueError):
+        loads_agent_json("no json here")
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+def test_incremental_parser_reports_each_field_once_whatever_the_chunking(size):
+    document = json.dumps({
+        "target_file": "src/app.py",
+        "tags": ["a", "b"],
+        "nested": {"x": 1, "y": [2, 3]},
+        "count": 42,
+        "flag": False,
+        "full_file": 'print("a, b: {c}")\n',
+    })
+    parser = IncrementalJSONParser()
+    reported = []
+    for start in range(0, len(document), size):
+        reported.extend(parser.feed(document[start:start + size]).items())
+
+    assert dict(reported) == json.loads(document)
+    assert len(reported) == len(json.loads(document))
+    assert parser.result() == json.loads(document)
+
+
+def test_incremental_parser_reports_a_field_before_the_object_ends():
+    parser = IncrementalJSONParser()
+
+    assert parser.feed('{"target_file": "src/app.py", "full_file": "partial') == {"target_file": "src/app.py"}
+    assert parser.fields == {"target_file": "src/app.py"}
+    assert parser.result() == {"target_file": "src/app.py", "full_file": "partial"}
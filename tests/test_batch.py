@@ -0,0 +1,35 @@
+import asyncio
+from types import SimpleNamespace
+
+from github_agent.batch import dedupe_issue_refs, parse_issue_ref
+from github_agent.batch import main as batch
+
+
+def test_duplicate_refs_are_dropped_case_insensitively():
+    refs = [
+        parse_issue_ref("octo/app#1"),
+        parse_issue_ref('{"owner": "Octo", "repo": "App", "issue_number": 1}'),
+        parse_issue_ref("octo/app#2"),
+    ]
+
+    assert dedupe_issue_refs(refs) == [refs[0], refs[2]]
+
+
+def test_run_batch_triages_each_issue_once(monkeypatch, tmp_path):
+    triaged = []
+
+    async def triage_issue(runner, ref, timeout):
+        triaged.append(ref["issue_number"])
+        await asyncio.sleep(0)
+        return {"ref": ref, "status": "ok", "elapsed_s": 0.0}
+
+    monkeypatch.setattr(batch, "get_app", lambda: SimpleNamespace(chain_agent=None))
+    monkeypatch.setattr(batch, "create_runner", lambda agent: None)
+    monkeypatch.setattr(batch, "triage_issue", triage_issue)
+
+    refs = [parse_issue_ref("octo/app#1"), parse_issue_ref("octo/app#2"), parse_issue_ref("OCTO/app#1")]
+    records = asyncio.run(batch.run_batch(refs, output_path=str(tmp_path / "results.jsonl")))
+
+    assert sorted(triaged) == ["1", "2"]
+    assert len(records) == 2
+    assert len((tmp_path / "results.jsonl").read_text().splitlines()) == 2
@@ -0,0 +1,112 @@
+import json
+
+from github_agent.cache import LlmResponseCache, ToolResultCache, llm_request_key
+from github_agent.cache import main as cache
+
+SHA_A = "a" * 40
+SHA_B = "b" * 40
+
+
+def _result(text: str) -> dict:
+    return {"content": [{"type": "text", "text": text}], "isError": False}
+
+
+def _commits(head: str) -> dict:
+    return _result(json.dumps([{"sha": head}, {"sha": "c" * 40}]))
+
+
+def _file_args(ref: str = "main", path: str = "src/app.py") -> dict:
+    return {"owner": "Octo", "repo": "App", "path": path, "ref": ref}
+
+
+def test_branch_entries_are_dropped_when_the_head_moves():
+    tools = ToolResultCache()
+    tools.put("list_commits", {"owner": "octo", "repo": "app", "sha": "main"}, _commits(SHA_A))
+    tools.put("get_file_contents", _file_args(), _result("v1"))
+
+    assert tools.get("get_file_contents", _file_args()) == _result("v1")
+
+    tools.put("list_commits", {"owner": "octo", "repo": "app", "sha": "main"}, _commits(SHA_B))
+
+    assert tools.get("get_file_contents", _file_args()) is None
+    assert tools.stats()["entries"] == 1
+
+
+def test_branch_entries_without_a_known_head_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    tools = ToolResultCache(branch_ttl=300)
+    tools.put("get_file_contents", _file_args(), _result("v1"))
+    tools.put("get_file_contents", _file_args(ref=SHA_A), _result("pinned"))
+
+    now[0] += 301
+
+    assert tools.get("get_file_contents", _file_args()) is None
+    assert tools.get("get_file_contents", _file_args(ref=SHA_A)) == _result("pinned")
+
+
+def test_lru_eviction_keeps_within_the_byte_budget():
+    entry_size = len(json.dumps(_result("x" * 100)).encode("utf-8"))
+    tools = ToolResultCache(max_bytes=entry_size * 2)
+    for path in ("a.py", "b.py"):
+        tools.put("get_file_contents", _file_args(SHA_A, path), _result("x" * 100))
+
+    tools.get("get_file_contents", _file_args(SHA_A, "a.py"))
+    tools.put("get_file_contents", _file_args(SHA_A, "c.py"), _result("x" * 100))
+
+    assert tools.get("get_file_contents", _file_args(SHA_A, "b.py")) is None
+    assert tools.get("get_file_contents", _file_args(SHA_A, "a.py")) is not None
+    assert tools.get("get_file_contents", _file_args(SHA_A, "c.py")) is not None
+    assert tools.stats()["bytes"] <= entry_size * 2
+
+
+def test_pinned_results_survive_on_disk_and_branch_results_do_not(tmp_path):
+    tools = ToolResultCache(cache_dir=str(tmp_path))
+    tools.put("get_file_contents", _file_args(SHA_A), _result("pinned"))
+    tools.put("get_file_contents", _file_args(), _result("branch"))
+    tools.put("get_file_contents", _file_args(SHA_B), {"content": [], "isError": True})
+
+    restarted = ToolResultCache(cache_dir=str(tmp_path))
+
+    assert restarted.get("get_file_contents", _file_args(SHA_A)) == _result("pinned")
+    assert restarted.get("get_file_contents", _file_args()) is None
+    assert restarted.get("get_file_contents", _file_args(SHA_B)) is None
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def _llm_request(call_id: str = "adk-1", text: str = "fix issue #1", temperature: float = 0.0):
+    from google.adk.models.llm_request import LlmRequest
+    from google.genai import types
+
+    return LlmRequest(
+        contents=[
+            types.Content(role="user", parts=[types.Part(text=text)]),
+            types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(id=call_id, name="get_file_contents", args={"path": "a.py"}))]),
+            types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(id=call_id, name="get_file_contents", response={"text": "x"}))]),
+        ],
+        config=types.GenerateContentConfig(temperature=temperature, system_instruction="You fix code."),
+    )
+
+
+def test_llm_request_key_ignores_function_call_ids_only():
+    key = llm_request_key("gemini-2.5-flash", _llm_request())
+
+    assert llm_request_key("gemini-2.5-flash", _llm_request(call_id="adk-2")) == key
+    assert llm_request_key("gemini-2.5-pro", _llm_request()) != key
+    assert llm_request_key("gemini-2.5-flash", _llm_request(text="fix issue #2")) != key
+    assert llm_request_key("gemini-2.5-flash", _llm_request(temperature=0.5)) != key
+
+
+def test_llm_responses_expire_and_survive_a_restart(monkeypatch, tmp_path):
+    # Disk entries age by file mtime, so the clock starts at the real time
+    now = [cache.time.time()]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    responses = LlmResponseCache(cache_dir=str(tmp_path), ttl=60)
+    responses.put("key", {"responses": [{"content": {"parts": [{"text": "ok"}]}}]})
+
+    restarted = LlmResponseCache(cache_dir=str(tmp_path), ttl=60)
+    assert restarted.get("key") == {"responses": [{"content": {"parts": [{"text": "ok"}]}}]}
+
+    now[0] += 61
+    assert responses.get("key") is None
+    assert LlmResponseCache(cache_dir=str(tmp_path), ttl=60).get("key") is None
@@ -0,0 +1,61 @@
+import pytest
+
+from github_agent.candidates import resolve_referenced, score_candidate
+
+KNOWN = ["src/auth.py", "lib/vendor/auth.py", "src/app/views.py", "README.md", "setup.py"]
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("/app/src/auth.py", ["src/auth.py"]),
+    ("./src/app/views.py", ["src/app/views.py"]),
+    ("C:\\work\\proj\\src\\app\\views.py", ["src/app/views.py"]),
+    ("/srv/deploy/other/auth.py", []),
+    ("auth.py", []),
+    ("setup.py", ["setup.py"]),
+    ("src/missing.py", []),
+])
+def test_referenced_paths_resolve_by_suffix(path, expected):
+    assert resolve_referenced([path], KNOWN) == expected
+
+
+def test_referenced_paths_without_a_file_list_are_normalized():
+    assert resolve_referenced(["./src/auth.py", "/src/auth.py", " ", "lib\\util.py"]) == ["src/auth.py", "lib/util.py"]
+
+
+ISSUE = {"error_messages": ["KeyError: token has expired", "ValueError: invalid signature header"]}
+SOURCE = """import jwt
+
+
+def verify_token(token):
+    raise KeyError("token has expired")
+
+
+def parse_header(value):
+    return value.split()
+"""
+
+
+def test_every_signal_counts_towards_the_score():
+    scored = score_candidate("src/auth.py", SOURCE, ISSUE, ["verify_token", "parse_header", "missing"], referenced=True, search_score=0.5, churn=3)
+
+    assert set(scored["signals"]) == {"referenced", "search", "error_match", "definitions", "churn"}
+    assert scored["signals"]["referenced"] == 3.0
+    assert scored["signals"]["search"] == 1.0
+    assert scored["definitions"] == ["parse_header", "verify_token"]
+    assert scored["score"] == pytest.approx(sum(scored["signals"].values()), abs=0.01)
+    assert [line["line"] for line in scored["lines"]] == [4, 5, 8]
+
+
+def test_unrelated_file_scores_nothing():
+    scored = score_candidate("docs/notes.py", "x = 1\n", ISSUE, ["verify_token"], referenced=False, search_score=0.0, churn=0)
+
+    assert scored["score"] == 0
+    assert scored["signals"] == {}
+    assert scored["lines"] == []
+
+
+def test_exact_error_phrase_beats_scattered_words():
+    exact = score_candidate("a.py", 'raise KeyError("token has expired")\n', ISSUE, [], False, 0.0, 0)
+    scattered = score_candidate("b.py", "token = None  # expired\n", ISSUE, [], False, 0.0, 0)
+
+    assert exact["signals"]["error_match"] > scattered["signals"].get("error_match", 0)
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from github_agent.coalescing import SingleFlight
+
+
+def test_concurrent_calls_share_one_call_in_the_first_callers_task():
+    flights = SingleFlight()
+    calls = []
+
+    async def run():
+        async def call():
+            calls.append(asyncio.current_task())
+            await asyncio.sleep(0.01)
+            return "result"
+
+        first = asyncio.ensure_future(flights.do("key", call))
+        await asyncio.sleep(0)
+        results = await asyncio.gather(first, flights.do("key", call), flights.do("key", call))
+        return first, results
+
+    first, results = asyncio.run(run())
+
+    assert results == ["result"] * 3
+    assert calls == [first]
+    assert flights.stats() == {"started": 1, "shared": 2, "in_flight": 0}
+
+
+def test_errors_reach_every_caller():
+    flights = SingleFlight()
+
+    async def run():
+        async def call():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        return await asyncio.gather(flights.do("key", call), flights.do("key", call), return_exceptions=True)
+
+    results = asyncio.run(run())
+
+    assert [type(result) for result in results] == [ValueError, ValueError]
+
+
+def test_waiter_takes_over_when_the_first_caller_is_cancelled():
+    flights = SingleFlight()
+
+    async def run():
+        async def call():
+            await asyncio.sleep(0.01)
+            return "result"
+
+        first = asyncio.ensure_future(flights.do("key", call))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(flights.do("key", call))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "result"
+    assert flights.stats()["started"] == 2
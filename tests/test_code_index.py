@@ -0,0 +1,63 @@
+from github_agent.code_index import RepoIndex, query_terms
+from github_agent.code_index.main import blob_sha
+
+AUTH = b"def verify_token(token):\n    return decode(token)\n"
+VIEWS = b"from auth import verify_token\n\n\ndef login(request):\n    return verify_token(request.token)\n"
+README = b"Call verify_token before every request.\n"
+
+
+def _commit(index: RepoIndex, commit: str, files: dict, known: set = frozenset()) -> tuple:
+    tree = {path: blob_sha(content) for path, content in files.items()}
+    read = {blob_sha(content): content for content in files.values() if blob_sha(content) not in known}
+    return index.apply(commit, tree, read)
+
+
+def test_search_ranks_the_definition_first():
+    index = RepoIndex()
+    _commit(index, "c1", {"src/auth.py": AUTH, "src/views.py": VIEWS, "README.md": README})
+
+    results = index.search(["verify_token"])
+
+    assert [result["path"] for result in results][0] == "src/auth.py"
+    assert results[0]["hits"][0] == {"line": 1, "kind": "definition", "term": "verify_token", "text": "def verify_token(token):"}
+    assert {result["path"] for result in results} == {"src/auth.py", "src/views.py", "README.md"}
+
+
+def test_apply_only_reads_changed_blobs_and_drops_removed_files():
+    index = RepoIndex()
+    assert _commit(index, "c1", {"src/auth.py": AUTH, "src/views.py": VIEWS}) == (2, 0)
+
+    known = {entry.blob_sha for entry in index.files.values()}
+    new_views = VIEWS.replace(b"login", b"sign_in")
+    assert _commit(index, "c2", {"src/views.py": new_views}, known) == (1, 1)
+
+    assert index.commit == "c2"
+    assert set(index.files) == {"src/views.py"}
+    assert index.search(["login"]) == []
+    assert [result["path"] for result in index.search(["sign_in"])] == ["src/views.py"]
+    assert "verify_token" not in index.symbol_postings
+
+
+def test_apply_reuses_the_entry_of_a_renamed_file():
+    index = RepoIndex()
+    _commit(index, "c1", {"src/auth.py": AUTH})
+
+    # The blob is already indexed, so nothing has to be read for the rename
+    changed, removed = index.apply("c2", {"lib/tokens.py": blob_sha(AUTH)}, {})
+
+    assert (changed, removed) == (1, 1)
+    assert [result["path"] for result in index.search(["verify_token"])] == ["lib/tokens.py"]
+    assert [result["path"] for result in index.search(["tokens"])] == ["lib/tokens.py"]
+
+
+def test_binary_files_are_not_indexed():
+    index = RepoIndex()
+    _commit(index, "c1", {"logo.png": b"\x89PNG\0verify_token"})
+
+    assert index.files == {}
+
+
+def test_query_terms_keeps_quoted_phrases_and_identifiers():
+    assert query_terms("Error: 'token expired' when calling verify_token from the login view") == [
+        "token expired", "calling", "verify_token", "login", "view",
+    ]
@@ -0,0 +1,60 @@
+import asyncio
+import json
+
+from google.adk.events import Event
+from google.genai import types
+
+from github_agent.functions import stream_agent
+
+
+class FakeRunner:
+    """Replays a fixed list of events, like Runner.run_async in SSE mode."""
+
+    def __init__(self, events):
+        self.events = events
+
+    async def run_async(self, **kwargs):
+        for event in self.events:
+            yield event
+
+
+def _text_event(author, text, partial):
+    return Event(author=author, partial=partial, content=types.Content(role="model", parts=[types.Part(text=text)]))
+
+
+def _collect(events):
+    async def run():
+        return [event async for event in stream_agent(FakeRunner(events), "user", "session", "query")]
+
+    return asyncio.run(run())
+
+
+def test_stream_agent_reports_fields_as_they_complete():
+    output = json.dumps({"target_file": "src/app.py", "target_function": "main", "full_file": "x = 1\n" * 50})
+    chunks = [output[:30], output[30:70], output[70:]]
+    events = [_text_event("repo_navigator_agent", chunk, partial=True) for chunk in chunks]
+    events.append(_text_event("repo_navigator_agent", output, partial=False))
+
+    streamed = _collect(events)
+
+    assert [event.type for event in streamed][0] == "stage"
+    assert streamed[0].stage == "navigator"
+    fields = [(event.field, event.value) for event in streamed if event.type == "field"]
+    assert fields[0] == ("target_file", "src/app.py")
+    assert ("target_function", "main") in fields
+    assert "".join(event.text for event in streamed if event.type == "text") == output
+    assert streamed[-1].type == "final"
+    assert json.loads(streamed[-1].text)["target_file"] == "src/app.py"
+
+
+def test_stream_agent_does_not_parse_prose_stages():
+    events = [
+        _text_event("summary_agent_agent", "The fix ", partial=True),
+        _text_event("summary_agent_agent", "adds the numbers.", partial=True),
+        _text_event("summary_agent_agent", "The fix adds the numbers.", partial=False),
+    ]
+
+    streamed = _collect(events)
+
+    assert not [event for event in streamed if event.type == "field"]
+    assert streamed[-1].text == "The fix adds the numbers."
@@ -0,0 +1,61 @@
+import asyncio
+import subprocess
+
+import pytest
+
+from github_agent.git_mirror.main import GitMirror, GitMirrorError, _CatFile
+
+
+def _repo(tmp_path, name="repo"):
+    path = tmp_path / name
+    subprocess.run(["git", "init", "-q", str(path)], check=True)
+    (path / "small.txt").write_text("small\n")
+    (path / "large.txt").write_text("x" * 4_000_000)
+    subprocess.run(["git", "add", "."], cwd=path, check=True)
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", "commit", "-q", "-m", "init"],
+        cwd=path, check=True,
+    )
+    return str(path)
+
+
+def test_cancelled_read_does_not_corrupt_the_next_one(tmp_path):
+    cat_file = _CatFile(_repo(tmp_path))
+
+    async def run():
+        assert (await cat_file.read("HEAD:small.txt"))[2] == b"small\n"
+
+        read = asyncio.ensure_future(cat_file.read("HEAD:large.txt"))
+        await asyncio.sleep(0)
+        read.cancel()
+        try:
+            await read
+        except asyncio.CancelledError:
+            pass
+
+        try:
+            return await cat_file.read("HEAD:small.txt")
+        finally:
+            await cat_file.close()
+
+    _, object_type, content = asyncio.run(run())
+    assert (object_type, content) == ("blob", b"small\n")
+
+
+def test_refs_that_look_like_options_are_rejected(tmp_path):
+    _repo(tmp_path / "remotes" / "octo", "app")
+    mirror = GitMirror(str(tmp_path / "mirrors"), remote=str(tmp_path / "remotes" / "{owner}" / "{repo}"))
+    target = tmp_path / "written.txt"
+
+    async def run():
+        try:
+            assert "init" in await mirror.list_commits("octo", "app")
+            with pytest.raises(GitMirrorError):
+                await mirror.list_commits("octo", "app", sha=f"--output={target}")
+            with pytest.raises(GitMirrorError):
+                await mirror.get_file_contents("octo", "app", "small.txt", ref="--output=x")
+        finally:
+            await mirror.close()
+
+    asyncio.run(run())
+    assert not target.exists()
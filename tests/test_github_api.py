@@ -0,0 +1,84 @@
+import asyncio
+
+import httpx
+
+from github_agent.github_api import main as github_api
+from github_agent.rate_limit import TokenBucket
+from github_agent.rate_limit import main as rate_limit
+
+
+def _request(monkeypatch, responses):
+    """Run github_request against canned responses; returns (final status, backoff attempts, limiter, calls)."""
+    calls = []
+    backoffs = []
+    limiter = TokenBucket("github", rate=1000, capacity=1000)
+
+    def handler(request):
+        calls.append(request)
+        return responses[min(len(calls), len(responses)) - 1]
+
+    monkeypatch.setattr(github_api, "get_limiter", lambda name: limiter)
+    monkeypatch.setattr(github_api, "backoff_delay", lambda attempt: backoffs.append(attempt) or 0)
+    monkeypatch.setattr(rate_limit.random, "uniform", lambda low, high: low)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="https://api.github.test") as client:
+            monkeypatch.setattr(github_api, "get_http_client", lambda: client)
+            return await github_api.github_request("GET", "/user")
+
+    response = asyncio.run(run())
+    return response.status_code, backoffs, limiter, calls
+
+
+def test_rate_limit_without_headers_backs_off_and_slows_down(monkeypatch):
+    status, backoffs, limiter, calls = _request(monkeypatch, [httpx.Response(429), httpx.Response(429), httpx.Response(200, json={})])
+
+    assert status == 200
+    assert len(calls) == 3
+    assert backoffs == [0, 1]
+    assert limiter.rate < limiter.max_rate
+
+
+def test_secondary_limit_message_counts_as_rate_limited(monkeypatch):
+    secondary = httpx.Response(403, json={"message": "You have exceeded a secondary rate limit."})
+    status, backoffs, _, calls = _request(monkeypatch, [secondary, httpx.Response(200, json={})])
+
+    assert (status, len(calls), backoffs) == (200, 2, [0])
+
+
+def test_retry_after_pauses_instead_of_backing_off(monkeypatch):
+    status, backoffs, limiter, calls = _request(
+        monkeypatch, [httpx.Response(429, headers={"Retry-After": "0"}), httpx.Response(200, json={})]
+    )
+
+    assert (status, len(calls), backoffs) == (200, 2, [])
+
+
+def test_other_client_errors_are_not_retried(monkeypatch):
+    status, backoffs, _, calls = _request(monkeypatch, [httpx.Response(404, json={"message": "Not Found"})])
+
+    assert (status, len(calls), backoffs) == (404, 1, [])
+
+
+def test_authenticated_user_is_memoized_and_revalidated(monkeypatch):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, json={"login": "octocat"}, headers={"ETag": '"v1"'})
+
+    monkeypatch.setattr(github_api, "_owner_cache", {})
+    monkeypatch.setattr(github_api, "get_limiter", lambda name: TokenBucket("github", rate=1000, capacity=1000))
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="https://api.github.test") as client:
+            monkeypatch.setattr(github_api, "get_http_client", lambda: client)
+            logins = [await github_api.fetch_authenticated_user("token") for _ in range(2)]
+            monkeypatch.setattr(github_api, "OWNER_CACHE_TTL", 0)
+            logins.append(await github_api.fetch_authenticated_user("token"))
+            return logins
+
+    assert asyncio.run(run()) == ["octocat"] * 3
+    assert [request.headers.get("If-None-Match") for request in calls] == [None, '"v1"']
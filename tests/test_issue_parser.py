@@ -0,0 +1,67 @@
+from github_agent.issue_parser import main as issue_parser
+from github_agent.issue_parser.main import extract_issue_details
+
+
+def test_traceback_with_error_reaches_threshold():
+    body = """Adding numbers gives the wrong result:
+
+```
+Traceback (most recent call last):
+  File "/usr/lib/python3.12/site-packages/pytest/main.py", line 10, in run
+  File "src/calc.py", line 3, in add_numbers
+AssertionError: expected 5, got -1
+```
+"""
+    details = extract_issue_details("add_numbers is wrong", body)
+
+    assert details["referenced_files"] == ["src/calc.py"]
+    assert details["error_messages"] == ["AssertionError: expected 5, got -1"]
+    assert details["frames"] == 1
+    assert details["confidence"] >= issue_parser.MIN_CONFIDENCE
+
+
+def test_file_and_error_without_frames_stays_below_threshold():
+    body = "Something in src/calc.py looks off.\n\n```\nValueError: bad input\n```\n"
+    details = extract_issue_details("Crash", body)
+
+    assert details["referenced_files"] == ["src/calc.py"]
+    assert details["error_messages"] == ["ValueError: bad input"]
+    assert details["confidence"] < issue_parser.MIN_CONFIDENCE
+
+
+def test_vendor_frames_are_not_referenced_files():
+    body = """
+    at handler (node_modules/express/lib/router.js:12:5)
+    at login (src/auth.js:42:7)
+TypeError: token is undefined
+"""
+    details = extract_issue_details("Login fails", body)
+
+    assert details["referenced_files"] == ["src/auth.js"]
+
+
+ABSOLUTE_TRACEBACK = """Login crashes on expired tokens:
+
+```
+Traceback (most recent call last):
+  File "/home/alice/work/{root}/app/auth.py", line 42, in login
+  File "C:\\Users\\alice\\{root}\\app\\tokens.py", line 7, in verify
+KeyError: 'exp'
+```
+"""
+
+
+def test_absolute_frames_are_made_relative_to_the_repository():
+    details = extract_issue_details("Login crash", ABSOLUTE_TRACEBACK.format(root="webapp"), repo="webapp")
+
+    assert details["referenced_files"] == ["app/auth.py", "app/tokens.py"]
+    assert details["frames"] == 2
+    assert details["confidence"] >= issue_parser.MIN_CONFIDENCE
+
+
+def test_absolute_frames_outside_the_repository_do_not_count():
+    details = extract_issue_details("Login crash", ABSOLUTE_TRACEBACK.format(root="proj"), repo="webapp")
+
+    assert details["referenced_files"] == []
+    assert details["frames"] == 0
+    assert details["confidence"] < issue_parser.MIN_CONFIDENCE
@@ -0,0 +1,41 @@
+import asyncio
+from typing import AsyncGenerator
+
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from github_agent.metrics import main as metrics_main
+from github_agent.metrics import instrumentation_callbacks, metrics, metrics_plugin
+
+
+class FailingLlm(BaseLlm):
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        raise ConnectionError("provider unavailable")
+        yield
+
+
+async def _run(runner: Runner) -> None:
+    session = await runner.session_service.create_session(app_name="test", user_id="user")
+    message = types.Content(role="user", parts=[types.Part(text="hello")])
+    async for _ in runner.run_async(user_id="user", session_id=session.id, new_message=message):
+        pass
+
+
+def test_failed_model_call_drops_its_timer(monkeypatch):
+    monkeypatch.setattr(metrics_main, "_timers", {})
+    metrics.reset()
+    agent = LlmAgent(name="stage", model=FailingLlm(model="failing"), instruction="Answer.", **instrumentation_callbacks)
+    runner = Runner(agent=agent, app_name="test", session_service=InMemorySessionService(), plugins=[metrics_plugin()])
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(_run(runner))
+
+    assert metrics_main._timers == {}
+    counters = metrics.to_dict()["counters"]["llm_errors_total"]
+    assert counters == [{"labels": {"stage": "stage", "code": "ConnectionError"}, "value": 1}]
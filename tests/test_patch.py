@@ -0,0 +1,37 @@
+import pytest
+
+from github_agent.patch import PatchApplyError, apply_hunks
+
+ORIGINAL = "def add(a, b):\n    return a - b\n\n\ndef sub(a, b):\n    return a - b\n"
+
+
+def test_exact_hunks_apply_in_order():
+    hunks = [
+        {"search": "def add(a, b):\n    return a - b\n", "replace": "def add(a, b):\n    return a + b\n"},
+        {"search": "def sub", "replace": "def subtract"},
+    ]
+
+    assert apply_hunks(ORIGINAL, hunks) == "def add(a, b):\n    return a + b\n\n\ndef subtract(a, b):\n    return a - b\n"
+
+
+def test_ambiguous_search_is_rejected():
+    with pytest.raises(PatchApplyError, match="matches 2 locations"):
+        apply_hunks(ORIGINAL, [{"search": "    return a - b\n", "replace": "    return 0\n"}])
+
+
+def test_loose_match_ignores_trailing_whitespace_and_keeps_line_endings():
+    original = "first   \nsecond\t\nthird\n"
+
+    assert apply_hunks(original, [{"search": "first\nsecond\n", "replace": "FIRST\nSECOND\n"}]) == "FIRST\nSECOND\nthird\n"
+
+
+def test_crlf_files_keep_crlf_line_endings():
+    original = "one\r\ntwo\r\nthree\r\n"
+
+    assert apply_hunks(original, [{"search": "two\n", "replace": "2\nTWO\n"}]) == "one\r\n2\r\nTWO\r\nthree\r\n"
+
+
+@pytest.mark.parametrize("search", ["missing line\n", "  \n"])
+def test_unmatched_or_empty_search_is_rejected(search):
+    with pytest.raises(PatchApplyError):
+        apply_hunks(ORIGINAL, [{"search": search, "replace": "x"}])
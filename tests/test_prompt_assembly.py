@@ -0,0 +1,32 @@
+import json
+from types import SimpleNamespace
+
+from github_agent.prompt_assembly import assemble_state
+from github_agent.system_prompts import code_fix_agent_prompt
+
+BIG_FILE = "".join(f"function helper{i}() {{ return {i}; }}\n" for i in range(8000))
+ISSUE = json.dumps({"title": "helper42 returns the wrong value", "body": "Details: " + "lorem ipsum " * 20000})
+NAVIGATION = json.dumps({"target_file": "src/helpers.js", "target_function": "helper42", "full_file": BIG_FILE})
+
+
+def test_oversized_state_is_cut_to_the_budget():
+    state = assemble_state("code_fix_agent", {"issue": ISSUE, "code_details": NAVIGATION}, budget=4000)
+
+    assert "lines omitted" in state["code_details"] or "omitted:" in state["code_details"]
+
+
+def test_kept_fields_are_never_excerpted():
+    state = assemble_state("code_fix_agent", {"issue": ISSUE, "code_details": NAVIGATION}, budget=4000, keep=["code_details.full_file"])
+
+    assert json.loads(state["code_details"])["full_file"] == BIG_FILE
+    assert "tokens omitted" in state["issue"] or "omitted:" in state["issue"]
+
+
+def test_fixer_gets_an_unsliceable_file_whole():
+    session = SimpleNamespace(state={"issue": ISSUE, "repo_navigation": NAVIGATION})
+    ctx = SimpleNamespace(agent_name="code_fix_agent", _invocation_context=SimpleNamespace(session=session))
+
+    prompt = code_fix_agent_prompt(ctx)
+
+    assert BIG_FILE.replace("\n", "\\n") in prompt
+    assert "lines omitted" not in prompt
@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+import pytest
+
+from github_agent.rate_limit import TokenBucket, backoff_delay
+from github_agent.rate_limit import main as rate_limit
+
+
+def test_waiters_are_served_by_priority_then_arrival():
+    bucket = TokenBucket("test", rate=200, capacity=1)
+    order = []
+
+    async def run():
+        # Take the only token so every request below has to queue
+        await bucket.acquire()
+
+        async def request(name, priority):
+            await bucket.acquire(priority)
+            order.append(name)
+
+        tasks = [asyncio.ensure_future(request(name, priority)) for name, priority in
+                 [("new issue", 4), ("summary", 1), ("fix a", 2), ("fix b", 2)]]
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+    assert order == ["summary", "fix a", "fix b", "new issue"]
+
+
+def test_retry_after_pauses_every_waiter(monkeypatch):
+    monkeypatch.setattr(rate_limit.random, "uniform", lambda low, high: low)
+    bucket = TokenBucket("test", rate=1000, capacity=10)
+
+    async def run():
+        assert bucket.update_from_headers({"Retry-After": "0.2"})
+        started = time.monotonic()
+        await bucket.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) >= 0.19
+
+
+def test_exhausted_quota_pauses_until_the_reset(monkeypatch):
+    monkeypatch.setattr(rate_limit.random, "uniform", lambda low, high: low)
+    bucket = TokenBucket("test", rate=10, capacity=10)
+
+    paused = bucket.update_from_headers({
+        "X-RateLimit-Remaining": "0",
+        "X-RateLimit-Reset": str(time.time() + 60),
+        "X-RateLimit-Limit": "5000",
+    })
+
+    assert paused
+    assert bucket._paused_until - time.monotonic() == pytest.approx(60, abs=1)
+    assert bucket.tokens == 0
+
+
+def test_low_remaining_quota_is_spread_until_the_reset():
+    bucket = TokenBucket("test", rate=10, capacity=10, min_rate=0.01)
+    headers = {"X-RateLimit-Limit": "5000", "X-RateLimit-Reset": str(time.time() + 100)}
+
+    assert not bucket.update_from_headers({**headers, "X-RateLimit-Remaining": "50"})
+    assert bucket.rate == pytest.approx(0.5, rel=0.05)
+
+    bucket.update_from_headers({**headers, "X-RateLimit-Remaining": "4000"})
+    assert bucket.rate == bucket.max_rate
+
+
+def test_penalize_and_reward_stay_within_bounds():
+    bucket = TokenBucket("test", rate=10, capacity=10, min_rate=1)
+
+    for _ in range(10):
+        bucket.penalize()
+    assert bucket.rate == 1
+
+    for _ in range(100):
+        bucket.reward()
+    assert bucket.rate == 10
+
+
+@pytest.mark.parametrize("attempt, ceiling", [(0, 1.0), (1, 2.0), (3, 8.0), (10, 30.0)])
+def test_backoff_is_jittered_below_the_capped_exponential(attempt, ceiling):
+    delays = [backoff_delay(attempt) for _ in range(200)]
+
+    assert all(0 <= delay <= ceiling for delay in delays)
+    assert max(delays) > ceiling / 2
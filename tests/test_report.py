@@ -0,0 +1,63 @@
+import json
+
+from github_agent.report import change_summary, render_report
+
+ORIGINAL = "".join(f"line {i}\n" for i in range(1, 21))
+UPDATED = ORIGINAL.replace("line 3\n", "line three\n").replace("line 15\n", "line 15\nline 15b\nline 15c\n").replace("line 18\n", "")
+
+ISSUE = json.dumps({
+    "issue_number": "42",
+    "title": "Crash on empty input",
+    "body": "It crashes.",
+    "problem_summary": "parse() fails on an empty string",
+    "error_messages": ["IndexError: list index out of range"],
+})
+NAVIGATION = json.dumps({"target_file": "src/parse.py", "target_function": "parse", "reasoning": "No length check", "full_file": ORIGINAL})
+FIX = json.dumps({"updated_file": UPDATED, "code_fix_summary": "Return early on empty input"})
+
+
+def test_change_summary_describes_each_hunk_in_updated_file_lines():
+    diff = (
+        "--- a/f\n+++ b/f\n"
+        "@@ -1,5 +1,5 @@\n line 1\n line 2\n-line 3\n+line three\n line 4\n line 5\n"
+        "@@ -13,8 +13,9 @@\n line 13\n line 14\n line 15\n+line 15b\n+line 15c\n line 16\n line 17\n-line 18\n line 19\n line 20\n"
+    )
+
+    assert change_summary(diff) == ["Line 3: 1 added, 1 removed", "Lines 16-20: 2 added, 1 removed"]
+
+
+def test_change_summary_of_an_empty_diff():
+    assert change_summary("") == []
+
+
+def test_report_shows_every_section_and_the_diff():
+    report = render_report(ISSUE, NAVIGATION, FIX, overview="Empty input is now handled.")
+
+    assert report.startswith("# 📝 Issue Resolution Report\n\nEmpty input is now handled.\n")
+    assert "- **Title:** Crash on empty input" in report
+    assert "- **Issue Number:** #42" in report
+    assert "- **Description:** parse() fails on an empty string" in report
+    assert "  - `IndexError: list index out of range`" in report
+    assert "- **Affected File:** `src/parse.py`" in report
+    assert "- **Root Cause:** No length check" in report
+    assert "  - Line 3: 1 added, 1 removed" in report
+    assert "```diff\n" in report and "+line three" in report and "-line 18" in report
+    assert report.endswith("- The fix has been generated and applied.\n- Ready for review.\n")
+
+
+def test_report_with_missing_or_broken_state():
+    report = render_report(None, "not json", None)
+
+    assert "- **Title:** Not available" in report
+    assert "- **Affected File:** Not available" in report
+    assert "- **Code Changes:** Not available" in report
+    assert report.endswith("- No fix was produced.\n- Needs manual follow-up.\n")
+
+
+def test_report_for_a_patch_that_did_not_apply():
+    fix = json.dumps({"updated_file": ORIGINAL, "code_fix_summary": "Tried", "patch_error": "Hunk 1 does not match"})
+
+    report = render_report(ISSUE, NAVIGATION, fix)
+
+    assert "- **Code Changes:** No changes to the file" in report
+    assert "- The fix could not be applied: Hunk 1 does not match" in report
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from github_agent.resolutions import ResolutionIndex
+
+LOGIN = {"issue_number": "7", "title": "Login fails with expired JWT token", "body": "verify_token raises KeyError on expired tokens"}
+EXPORT = {"issue_number": "9", "title": "CSV export drops the header row", "body": "export_csv skips the first line of the report"}
+NAVIGATION = json.dumps({"target_file": "src/auth.py", "target_function": "verify_token"})
+FIX = json.dumps({"code_fix_summary": "Catch expired tokens"})
+
+
+def _index(tmp_path) -> ResolutionIndex:
+    return ResolutionIndex(str(tmp_path), dim=256)
+
+
+def test_add_and_search(tmp_path):
+    index = _index(tmp_path)
+
+    assert index.add("octo", "app", LOGIN, NAVIGATION, FIX)
+    assert index.add("octo", "app", EXPORT, "{}", "{}")
+    assert not index.add("octo", "app", dict(LOGIN, body="  Verify_token raises KeyError   on expired tokens "), NAVIGATION, FIX)
+
+    results = index.search({"title": "Expired JWT token breaks login", "body": "verify_token KeyError"}, min_similarity=0.0)
+
+    assert len(index) == 2
+    assert results[0][0].title == LOGIN["title"]
+    assert results[0][0].target_function == "verify_token"
+    assert results[0][1] > results[1][1]
+
+
+def test_reload_restores_records_and_duplicates(tmp_path):
+    _index(tmp_path).add("octo", "app", LOGIN, NAVIGATION, FIX)
+
+    index = _index(tmp_path)
+    duplicate = index.find_duplicate("octo", "app", LOGIN)
+
+    assert len(index) == 1
+    assert duplicate["code_fix"] == FIX
+    assert index.find_duplicate("octo", "other", LOGIN) is None
+    assert index.find_duplicate("octo", "app", LOGIN, max_age=-1) is None
+
+
+def test_torn_last_line_is_dropped_and_appends_continue(tmp_path):
+    index = _index(tmp_path)
+    index.add("octo", "app", LOGIN, NAVIGATION, FIX)
+    size = os.path.getsize(index.records_path)
+    with open(index.records_path, "ab") as f:
+        f.write(b'{"fingerprint": "torn", "owner": "oc')
+
+    index = _index(tmp_path)
+    assert len(index) == 1
+    assert os.path.getsize(index.records_path) == size
+
+    index.add("octo", "app", EXPORT, "{}", "{}")
+    index = _index(tmp_path)
+    assert [resolution.issue_number for resolution in index.resolutions] == ["7", "9"]
+    assert index.find_duplicate("octo", "app", EXPORT)["issue"] == EXPORT
+
+
+def test_missing_vectors_are_rebuilt(tmp_path):
+    index = _index(tmp_path)
+    index.add("octo", "app", LOGIN, NAVIGATION, FIX)
+    expected = index.search(LOGIN)
+    os.remove(index.vectors_path)
+
+    index = _index(tmp_path)
+
+    assert [(resolution.title, round(score, 5)) for resolution, score in index.search(LOGIN)] == \
+        [(resolution.title, round(score, 5)) for resolution, score in expected]
+
+
+def _navigator_context(state: dict):
+    from types import SimpleNamespace
+
+    from google.genai import types
+
+    agent = SimpleNamespace(name="repo_navigator_agent", output_key="repo_navigation")
+    return SimpleNamespace(
+        _invocation_context=SimpleNamespace(agent=agent),
+        invocation_id="invocation",
+        agent_name=agent.name,
+        state=state,
+        user_content=types.Content(role="user", parts=[types.Part(text="octo/app#7")]),
+    )
+
+
+@pytest.mark.parametrize("head_content, replayed", [("def verify_token(token):\n    return token\n", True), ("def verify_token(token):\n    return None\n", False)])
+def test_duplicate_is_replayed_only_while_the_file_is_unchanged(monkeypatch, tmp_path, head_content, replayed):
+    from github_agent.code_index import RepoIndex
+    from github_agent.code_index.main import blob_sha
+    from github_agent.resolutions import main as resolutions
+
+    stored_file = "def verify_token(token):\n    return token\n"
+    navigation = json.dumps({"target_file": "src/auth.py", "target_function": "verify_token", "full_file": stored_file})
+    fix = json.dumps({"code_fix_summary": "Catch expired tokens", "updated_file": stored_file.replace("return token", "return check(token)")})
+    monkeypatch.setenv("RESOLUTION_INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(resolutions, "_index", None)
+    resolutions.get_resolution_index().add("octo", "app", LOGIN, navigation, fix)
+
+    head = RepoIndex()
+    head.add("src/auth.py", blob_sha(head_content.encode("utf-8")), head_content.encode("utf-8"))
+
+    async def get(owner, repo, ref=None, priority=0):
+        return head
+
+    monkeypatch.setattr(resolutions.code_indexes, "get", get)
+    state = {"issue": json.dumps(LOGIN)}
+
+    content = asyncio.run(resolutions.resolution_prior_callback(_navigator_context(state)))
+
+    assert (content is not None) == replayed
+    assert (state.get("code_fix") == fix) == replayed
+    assert (resolutions.PRIOR_STATE_KEY in state) != replayed
@@ -0,0 +1,119 @@
+import asyncio
+import json
+from typing import AsyncGenerator, List
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from github_agent.routing import main as routing
+from github_agent.schemas import RepoNavigatorAgentOutput
+
+
+class StreamingLlm(BaseLlm):
+    """
+    Streams a fixed answer in two partial chunks, then the aggregated
+    response and, with `trailer`, the closing chunk ADK yields after it.
+    """
+
+    answer: str
+    trailer: bool = False
+    log: List[str] = []
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        middle = len(self.answer) // 2
+        for chunk in (self.answer[:middle], self.answer[middle:]):
+            self.log.append(f"model: {chunk}")
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=chunk)]), partial=True)
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=self.answer)]))
+        if self.trailer:
+            yield LlmResponse(content=types.Content(role="model", parts=[]), finish_reason=types.FinishReason.STOP)
+
+
+GOOD = json.dumps({"target_file": "a.py", "target_function": "f", "reasoning": "r", "code_snippet": "s", "full_file": "x"})
+
+
+def _text(response: LlmResponse) -> str:
+    return "".join(part.text or "" for part in response.content.parts)
+
+
+def _collect(model: routing.RoutedLlm, log: List[str] = None) -> List[LlmResponse]:
+    async def run():
+        request = LlmRequest(contents=[types.Content(role="user", parts=[types.Part(text="find it")])])
+        responses = []
+        async for response in model.generate_content_async(request, stream=True):
+            if log is not None and response.partial:
+                log.append(f"caller: {_text(response)}")
+            responses.append(response)
+        return responses
+
+    return asyncio.run(run())
+
+
+def test_escalated_answer_is_streamed_once(monkeypatch):
+    good = GOOD
+    monkeypatch.setattr(routing, "_models", {
+        "small": StreamingLlm(model="small", answer="I am not sure which file it is."),
+        "large": StreamingLlm(model="large", answer=good),
+    })
+    monkeypatch.setattr(routing, "model_escalations", {"small": "large"})
+    model = routing.RoutedLlm(model="small", stage="repo_navigator_agent", output_schema=RepoNavigatorAgentOutput)
+
+    responses = _collect(model)
+
+    assert "".join(_text(response) for response in responses if response.partial) == good
+    assert [_text(response) for response in responses if not response.partial] == [good]
+
+
+def test_stage_without_schema_streams_chunks_as_they_arrive(monkeypatch):
+    small = StreamingLlm(model="small", answer="All done here.")
+    log = small.log
+    monkeypatch.setattr(routing, "_models", {
+        "small": small,
+        "large": StreamingLlm(model="large", answer="unused"),
+    })
+    monkeypatch.setattr(routing, "model_escalations", {"small": "large"})
+    model = routing.RoutedLlm(model="small", stage="summary_agent_agent")
+
+    responses = _collect(model, log)
+
+    assert log == ["model: All don", "caller: All don", "model: e here.", "caller: e here."]
+    assert [_text(response) for response in responses if not response.partial] == ["All done here."]
+
+
+def test_trailing_final_chunk_does_not_hide_the_answer(monkeypatch):
+    monkeypatch.setattr(routing, "_models", {
+        "small": StreamingLlm(model="small", answer=GOOD, trailer=True),
+        "large": StreamingLlm(model="large", answer="unused"),
+    })
+    monkeypatch.setattr(routing, "model_escalations", {"small": "large"})
+    model = routing.RoutedLlm(model="small", stage="repo_navigator_agent", output_schema=RepoNavigatorAgentOutput)
+
+    responses = _collect(model)
+
+    finals = [response for response in responses if not response.partial]
+    assert [_text(response) for response in finals] == [GOOD, ""]
+    assert finals[-1].finish_reason == types.FinishReason.STOP
+
+
+def test_only_accepted_answers_are_cached(monkeypatch):
+    from github_agent.cache import LlmResponseCache
+
+    monkeypatch.setattr(routing, "response_cache", LlmResponseCache())
+    monkeypatch.setattr(routing, "model_escalations", {})
+    model = routing.RoutedLlm(model="small", stage="repo_navigator_agent", output_schema=RepoNavigatorAgentOutput)
+
+    # Last model of the chain: the unsure answer is passed on, but not stored
+    monkeypatch.setattr(routing, "_models", {"small": StreamingLlm(model="small", answer="I am not sure.")})
+    assert [_text(response) for response in _collect(model) if not response.partial] == ["I am not sure."]
+    assert routing.response_cache.stats()["entries"] == 0
+
+    monkeypatch.setattr(routing, "_models", {"small": StreamingLlm(model="small", answer=GOOD, trailer=True)})
+    _collect(model)
+    monkeypatch.setattr(routing, "_models", {})
+
+    cached = _collect(model)
+
+    assert [_text(response) for response in cached] == [GOOD, ""]
+    assert all(response.custom_metadata == {"cache_hit": True} for response in cached)
@@ -0,0 +1,110 @@
+import json
+from types import SimpleNamespace
+
+from google.genai import types
+
+from github_agent.sessions import main as sessions
+from github_agent.sessions import record_completed_stage, skip_completed_stage
+
+
+ISSUE_A = json.dumps({"title": "A", "body": "a", "issue_number": "1"})
+ISSUE_B = json.dumps({"title": "B", "body": "b", "issue_number": "2"})
+NAVIGATION = json.dumps({
+    "target_file": "app.py", "target_function": "main", "reasoning": "r", "code_snippet": "s", "full_file": "x = 0\n",
+})
+FIX = json.dumps({"updated_file": "x = 1\n", "code_fix_summary": "Fixed."})
+
+
+def _chain(*names):
+    parent = SimpleNamespace(sub_agents=[])
+    output_keys = {"issue_reader_agent": "issue", "repo_navigator_agent": "repo_navigation", "code_fix_agent": "code_fix"}
+    for name in names:
+        parent.sub_agents.append(SimpleNamespace(name=name, output_key=output_keys[name], parent_agent=parent))
+    return {agent.name: agent for agent in parent.sub_agents}
+
+
+def _context(agent, state, query):
+    return SimpleNamespace(
+        _invocation_context=SimpleNamespace(agent=agent),
+        invocation_id="invocation",
+        agent_name=agent.name,
+        state=state,
+        user_content=types.Content(role="user", parts=[types.Part(text=query)]),
+    )
+
+
+def _complete(agent, state, query, output):
+    context = _context(agent, state, query)
+    assert skip_completed_stage(context) is None
+    state[agent.output_key] = output
+    record_completed_stage(context)
+
+
+def test_replays_the_output_of_the_same_request():
+    agents = _chain("issue_reader_agent", "repo_navigator_agent")
+    reader = agents["issue_reader_agent"]
+    state = {}
+
+    _complete(reader, state, "resolve issue A", ISSUE_A)
+    _complete(reader, state, "resolve issue B", ISSUE_B)
+
+    replay = skip_completed_stage(_context(reader, state, "resolve issue A"))
+    assert replay.parts[0].text == ISSUE_A
+    assert state["issue"] == ISSUE_A
+
+
+def test_rerunning_a_stage_forgets_the_stages_after_it():
+    agents = _chain("issue_reader_agent", "repo_navigator_agent", "code_fix_agent")
+    state = {}
+    for name, output in [("issue_reader_agent", ISSUE_A), ("repo_navigator_agent", NAVIGATION), ("code_fix_agent", FIX)]:
+        _complete(agents[name], state, "query", output)
+
+    # The navigator's checkpoint is lost, so it runs again and the fixer with it
+    run = next(iter(state[sessions.CHECKPOINT_STATE_KEY].values()))
+    del run["stages"]["repo_navigator_agent"]
+    assert skip_completed_stage(_context(agents["repo_navigator_agent"], state, "query")) is None
+    assert skip_completed_stage(_context(agents["code_fix_agent"], state, "query")) is None
+    assert skip_completed_stage(_context(agents["issue_reader_agent"], state, "query")) is not None
+
+
+def test_expired_checkpoints_are_not_replayed(monkeypatch):
+    reader = _chain("issue_reader_agent")["issue_reader_agent"]
+    state = {}
+    _complete(reader, state, "query", ISSUE_A)
+
+    monkeypatch.setattr(sessions, "CHECKPOINT_TTL", -1)
+    assert skip_completed_stage(_context(reader, state, "query")) is None
+
+
+def test_failed_fixes_are_not_checkpointed():
+    fixer = _chain("code_fix_agent")["code_fix_agent"]
+    state = {}
+    failed = '{"code_fix_summary": "Not available", "patch_error": "search block not found", "raw_output": "..."}'
+    _complete(fixer, state, "query", failed)
+    assert skip_completed_stage(_context(fixer, state, "query")) is None
+
+    _complete(fixer, state, "query", FIX)
+    assert skip_completed_stage(_context(fixer, state, "query")) is not None
+
+
+def test_outputs_that_fail_validation_are_not_checkpointed():
+    navigator = _chain("repo_navigator_agent")["repo_navigator_agent"]
+    state = {}
+    _complete(navigator, state, "query", "I could not find the file.")
+    assert skip_completed_stage(_context(navigator, state, "query")) is None
+
+
+def test_replayed_stage_stops_its_timer():
+    from github_agent.metrics import metrics, start_stage_timer
+
+    reader = _chain("issue_reader_agent")["issue_reader_agent"]
+    state = {}
+    _complete(reader, state, "query", ISSUE_A)
+
+    metrics.reset()
+    context = _context(reader, state, "query")
+    start_stage_timer(context)
+    assert skip_completed_stage(context) is not None
+
+    durations = metrics.to_dict()["histograms"]["stage_duration_seconds"]
+    assert [entry["labels"] for entry in durations] == [{"stage": "issue_reader_agent"}]
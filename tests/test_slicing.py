@@ -0,0 +1,60 @@
+import pytest
+
+from github_agent.slicing import SliceSpliceError, slice_source
+
+
+def _filler(name: str) -> str:
+    return f"def {name}():\n" + "".join(f"    value_{i} = {i}\n" for i in range(20)) + "    return value_0\n\n\n"
+
+
+SOURCE = (
+    "import os\n\n"
+    "LIMIT = 10\n\n\n"
+    + _filler("unrelated_one")
+    + "def helper(value):\n    return min(value, LIMIT)\n\n\n"
+    + _filler("unrelated_two")
+    + "def target(value):\n    return helper(value) + 1\n\n\n"
+    + _filler("unrelated_three")
+)
+
+
+def test_slice_keeps_the_target_and_what_it_needs():
+    code_slice = slice_source(SOURCE, "app.py", "target", min_lines=0)
+
+    assert code_slice is not None
+    assert "import os" in code_slice.text
+    assert "LIMIT = 10" in code_slice.text
+    assert "def helper(value):" in code_slice.text
+    assert "def target(value):" in code_slice.text
+    assert "unrelated" not in code_slice.text
+    assert "# ... lines " in code_slice.text
+
+
+def test_splice_round_trips_the_unedited_slice():
+    code_slice = slice_source(SOURCE, "app.py", "target", min_lines=0)
+
+    assert code_slice.splice(code_slice.text) == SOURCE
+
+
+def test_splice_puts_an_edit_back_into_the_full_file():
+    code_slice = slice_source(SOURCE, "app.py", "target", min_lines=0)
+    edited = code_slice.text.replace("return helper(value) + 1", "return helper(value) + 2")
+
+    assert code_slice.splice(edited) == SOURCE.replace("return helper(value) + 1", "return helper(value) + 2")
+
+
+def test_splice_rejects_a_dropped_marker():
+    code_slice = slice_source(SOURCE, "app.py", "target", min_lines=0)
+    edited = "".join(line for line in code_slice.text.splitlines(keepends=True) if "omitted" not in line)
+
+    with pytest.raises(SliceSpliceError):
+        code_slice.splice(edited)
+
+
+@pytest.mark.parametrize("path, target, min_lines", [
+    ("app.py", "target", 1000),
+    ("app.txt", "target", 0),
+    ("app.py", "missing_function", 0),
+])
+def test_no_slice_when_it_would_not_help(path, target, min_lines):
+    assert slice_source(SOURCE, path, target, min_lines=min_lines) is None
@@ -0,0 +1,56 @@
+import asyncio
+
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset
+
+from github_agent.tools import main as tools
+
+SERVER_TOOLS = tools.GITHUB_TOOLS + ["create_issue", "merge_pull_request"]
+
+
+def _server(monkeypatch):
+    """Stand in for the MCP server's tool listing; returns the list of list_tools calls."""
+    calls = []
+
+    async def get_tools(self, readonly_context=None):
+        calls.append(readonly_context)
+        await asyncio.sleep(0)
+        return [BaseTool(name=name, description=name) for name in SERVER_TOOLS if self._is_tool_selected(BaseTool(name=name, description=name), readonly_context)]
+
+    monkeypatch.setattr(MCPToolset, "get_tools", get_tools)
+    monkeypatch.setattr(tools, "_github_mcp", None)
+    monkeypatch.setenv("GITHUB_PERSONAL_ACCESS_TOKEN", "test")
+    monkeypatch.delenv("GIT_MIRROR_DIR", raising=False)
+    return calls
+
+
+def test_each_agent_sees_only_its_tools(monkeypatch):
+    _server(monkeypatch)
+
+    async def run():
+        return {
+            agent: [tool.name for toolset in tools.get_github_tools(agent) for tool in await toolset.get_tools()]
+            for agent in ("issue_reader_agent", "repo_navigator_agent", "code_fix_agent", "summary_agent_agent")
+        }
+
+    names = asyncio.run(run())
+
+    for agent in ("issue_reader_agent", "repo_navigator_agent"):
+        assert sorted(names[agent]) == sorted(tools.AGENT_TOOLS[agent])
+    assert names["code_fix_agent"] == names["summary_agent_agent"] == []
+
+
+def test_tool_list_is_fetched_once_for_all_agents(monkeypatch):
+    calls = _server(monkeypatch)
+    views = tools.get_github_tools("issue_reader_agent") + tools.get_github_tools("repo_navigator_agent")
+
+    async def run():
+        await asyncio.gather(*(view.get_tools() for view in views for _ in range(3)))
+        return await views[0].get_tools()
+
+    listed = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert views[0]._toolset is views[1]._toolset is tools.get_github_mcp()
+    # Every tool the agents are offered is read-only, so cached and coalesced
+    assert {type(tool) for tool in listed} == {tools.CachedMCPTool}
@@ -0,0 +1,72 @@
+import hashlib
+import hmac
+import json
+
+from starlette.testclient import TestClient
+
+from github_agent.webhook.main import create_webhook_app
+
+SECRET = "webhook-secret"
+
+
+def _issue_event(number: int, action: str = "opened") -> dict:
+    return {"action": action, "issue": {"number": number}, "repository": {"name": "app", "owner": {"login": "octo"}}}
+
+
+def _post(client: TestClient, payload, delivery: str = "d1", event: str = "issues", secret: str = SECRET):
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+    signature = "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    headers = {"X-Hub-Signature-256": signature, "X-GitHub-Event": event, "X-GitHub-Delivery": delivery}
+    return client.post("/webhook", content=body, headers=headers)
+
+
+def _client(queue_size: int = 10) -> TestClient:
+    # Without the lifespan no worker runs, so queued jobs stay queued
+    return TestClient(create_webhook_app(secret=SECRET, queue_size=queue_size))
+
+
+def test_signature_is_checked():
+    client = _client()
+
+    assert _post(client, _issue_event(1), secret="wrong").status_code == 401
+    assert client.post("/webhook", content=b"{}", headers={"X-GitHub-Event": "issues"}).status_code == 401
+
+    response = _post(client, _issue_event(1))
+    assert response.status_code == 202
+    assert response.json()["status"] == "queued"
+    assert response.json()["job"]["key"] == "octo/app#1"
+
+
+def test_redelivery_and_repeated_issue_are_not_queued_twice():
+    client = _client()
+    first = _post(client, _issue_event(1), delivery="d1").json()
+
+    redelivered = _post(client, _issue_event(1), delivery="d1").json()
+    reopened = _post(client, _issue_event(1, action="reopened"), delivery="d2").json()
+
+    assert redelivered["status"] == reopened["status"] == "duplicate"
+    assert redelivered["job"]["id"] == reopened["job"]["id"] == first["job"]["id"]
+    assert client.get("/status").json()["queued"] == 1
+
+
+def test_full_queue_pushes_back():
+    client = _client(queue_size=1)
+    assert _post(client, _issue_event(1), delivery="d1").status_code == 202
+
+    response = _post(client, _issue_event(2), delivery="d2")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "60"
+
+
+def test_irrelevant_and_malformed_events():
+    client = _client()
+
+    assert _post(client, {"zen": "hi"}, event="ping").json() == {"status": "pong"}
+    assert _post(client, _issue_event(1, action="labeled")).status_code == 202
+    assert _post(client, {"action": "opened", "issue": {"number": 3, "pull_request": {}}}).json()["status"] == "ignored"
+    assert _post(client, {"action": "opened"}).status_code == 400
+    assert _post(client, {"action": "opened", "issue": {"number": "3"}, "repository": {"name": "app"}}).status_code == 400
+    assert _post(client, [1, 2]).status_code == 400
+    assert _post(client, b"not json").status_code == 400
+    assert client.get("/status").json()["queued"] == 0